@@ -0,0 +1,235 @@
+"""
+Controle de admissão dos uploads da API do Data Sentinel.
+
+Antes de o corpo da requisição ser lido, o middleware:
+
+- rejeita com 411 uploads sem Content-Length e com 413 os maiores que o limite;
+- reserva o Content-Length em um orçamento global de bytes em trânsito e
+  rejeita com 503 (Retry-After) quando o orçamento está esgotado;
+- aplica o limite por solicitante (token bucket por e-mail) com 429
+  (Retry-After) quando o e-mail vem no cabeçalho X-Requester-Email ou no
+  parâmetro de query 'email'.
+
+Como o e-mail do formulário só é conhecido após a leitura do corpo, o endpoint
+cobra o token do e-mail validado quando o middleware ainda não o fez
+(ver AdmissionController.charge_requester).
+
+O backend é em memória, um por processo. Com vários workers no mesmo nó
+(gunicorn.conf.py), cada worker aplica a sua parte dos limites configurados
+(AdmissionController.share_among), de modo que a soma corresponda ao limite do nó.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from urllib.parse import parse_qs
+
+from lambda_functions.processor.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+UPLOAD_MAX_BYTES = 5 * 1024 * 1024
+# Margem para os cabeçalhos do multipart e o campo de e-mail
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_INFLIGHT_MAX_BYTES = int(os.environ.get('UPLOAD_INFLIGHT_MAX_BYTES', str(64 * 1024 * 1024)))
+UPLOAD_RATE_PER_MINUTE = float(os.environ.get('UPLOAD_RATE_PER_MINUTE', '10'))
+UPLOAD_BURST = int(os.environ.get('UPLOAD_BURST', '5'))
+UPLOAD_BUSY_RETRY_AFTER = int(os.environ.get('UPLOAD_BUSY_RETRY_AFTER', '1'))
+RATE_LIMIT_MAX_KEYS = 10000
+
+class RejectedError(Exception):
+    """Requisição rejeitada pelo controle de admissão."""
+
+    def __init__(self, status_code, detail, retry_after=None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class InFlightBudget:
+    """Orçamento global de bytes de upload em trânsito."""
+
+    def __init__(self, max_bytes=UPLOAD_INFLIGHT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, size):
+        """Reserva 'size' bytes; retorna False se o orçamento não comporta."""
+        with self._lock:
+            if self.in_flight + size > self.max_bytes:
+                return False
+            self.in_flight += size
+            return True
+
+    def release(self, size):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - size)
+
+class TokenBucketLimiter:
+    """Limite de taxa por chave (token bucket) em memória."""
+
+    def __init__(self, rate_per_minute=UPLOAD_RATE_PER_MINUTE, burst=UPLOAD_BURST,
+                 max_keys=RATE_LIMIT_MAX_KEYS, clock=time.monotonic):
+        """
+        Args:
+            rate_per_minute (float): Tokens repostos por minuto
+            burst (int): Capacidade do balde (rajada máxima)
+            max_keys (int): Baldes mantidos; acima disso os baldes cheios são descartados
+            clock (callable): Fonte de tempo (substituível em testes)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """
+        Consome um token da chave.
+
+        Returns:
+            float: 0 se admitido; caso contrário, segundos até haver um token
+        """
+        now = self.clock()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate if self.rate > 0 else 60.0
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return 0
+
+    def _prune(self, now):
+        # Baldes que já estariam cheios equivalem a chaves ausentes
+        for key, (tokens, last) in list(self._buckets.items()):
+            if tokens + (now - last) * self.rate >= self.burst:
+                del self._buckets[key]
+
+class AdmissionController:
+    """Aplica o orçamento global e o limite por solicitante."""
+
+    def __init__(self, budget=None, limiter=None, max_request_bytes=UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.budget = budget or InFlightBudget()
+        self.limiter = limiter or TokenBucketLimiter()
+        self.max_request_bytes = max_request_bytes
+
+    def share_among(self, workers):
+        """
+        Divide os limites configurados entre os workers do nó.
+
+        O orçamento de bytes nunca fica abaixo de um upload de tamanho máximo, e o
+        balde de cada solicitante mantém ao menos um token; como o balanceamento
+        entre workers não é exato, o limite do nó é aproximado.
+
+        Args:
+            workers (int): Quantidade de processos que atendem a API no nó
+        """
+        if workers <= 1:
+            return
+        self.budget.max_bytes = max(self.max_request_bytes, self.budget.max_bytes // workers)
+        self.limiter.rate /= workers
+        self.limiter.burst = max(1, math.ceil(self.limiter.burst / workers))
+        logger.info(f"Limites de admissão divididos entre {workers} workers: "
+                    f"{self.budget.max_bytes} bytes em trânsito, "
+                    f"{self.limiter.rate * 60:.2f} uploads/min por solicitante (rajada {self.limiter.burst})")
+
+    @staticmethod
+    def requester_key(email):
+        return email.strip().lower()
+
+    def charge_requester(self, email):
+        """
+        Consome o token do solicitante.
+
+        Raises:
+            RejectedError: 429 com Retry-After se o limite foi atingido
+        """
+        wait = self.limiter.acquire(self.requester_key(email))
+        if wait:
+            logger.warning(f"Upload de {email} rejeitado pelo limite de taxa")
+            raise RejectedError(429, "Limite de uploads atingido. Tente novamente mais tarde.", math.ceil(wait))
+
+    def admit(self, content_length, email=None):
+        """
+        Decide a admissão de um upload antes da leitura do corpo e reserva os bytes.
+
+        Args:
+            content_length (int): Content-Length da requisição (None se ausente)
+            email (str, optional): E-mail informado fora do corpo
+
+        Returns:
+            int: Bytes reservados (a liberar com release)
+
+        Raises:
+            RejectedError: 411, 413, 429 ou 503
+        """
+        if content_length is None:
+            raise RejectedError(411, "Content-Length obrigatório para uploads.")
+        if content_length > self.max_request_bytes:
+            raise RejectedError(413, "O arquivo deve ter no máximo 5MB")
+        if email:
+            self.charge_requester(email)
+        if not self.budget.try_acquire(content_length):
+            logger.warning(f"Upload rejeitado: {self.budget.in_flight} bytes em trânsito")
+            raise RejectedError(503, "Servidor ocupado. Tente novamente em instantes.", UPLOAD_BUSY_RETRY_AFTER)
+        return content_length
+
+    def release(self, reserved):
+        self.budget.release(reserved)
+
+class AdmissionControlMiddleware:
+    """Middleware ASGI que aplica o AdmissionController às rotas de upload."""
+
+    def __init__(self, app, controller=None, paths=('/arquivos',)):
+        self.app = app
+        self.controller = controller or AdmissionController()
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'POST' or scope['path'] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        email = headers.get('x-requester-email')
+        if not email:
+            email = (parse_qs(scope.get('query_string', b'').decode('latin-1')).get('email') or [None])[0]
+        try:
+            content_length = int(headers['content-length']) if 'content-length' in headers else None
+            if content_length is not None and content_length < 0:
+                # Um valor negativo reduziria o orçamento em trânsito reservado pelas demais requisições
+                raise ValueError(f"Content-Length negativo: {content_length}")
+            reserved = self.controller.admit(content_length, email)
+        except ValueError:
+            await self._reject(send, RejectedError(400, "Content-Length inválido."))
+            return
+        except RejectedError as e:
+            await self._reject(send, e)
+            return
+
+        # O endpoint não cobra de novo o solicitante já limitado aqui
+        scope.setdefault('state', {})['admission_requester'] = (
+            self.controller.requester_key(email) if email else None
+        )
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(reserved)
+
+    @staticmethod
+    async def _reject(send, error):
+        body = json.dumps({'detail': error.detail}).encode('utf-8')
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        if error.retry_after is not None:
+            headers.append((b'retry-after', str(error.retry_after).encode()))
+        # Connection: close evita que o cliente siga enviando o corpo rejeitado na mesma conexão
+        headers.append((b'connection', b'close'))
+        await send({'type': 'http.response.start', 'status': error.status_code, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
@@ -1,33 +1,81 @@
 import json
 import os
-import tempfile
 import uuid
 from datetime import datetime
 from dotenv import load_dotenv
 from email_validator import EmailNotValidError, validate_email
-from fastapi import FastAPI, File, Form, HTTPException, Query, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.responses import JSONResponse
 from lambda_functions.processor.dynamodb_handler import DynamoDBHandler
-from lambda_functions.processor.dados_auditoria_handler import DadosAuditoriaHandler
+from lambda_functions.processor.dados_auditoria_handler import DadosAuditoriaHandler, InvalidCursorError
+from lambda_functions.processor.counters_handler import AuditCountersHandler, period_key
 from lambda_functions.processor.s3_handler import S3Handler
+from lambda_functions.processor.work_queue import get_work_queue
+from lambda_functions.processor.findings_codec import FindingsStore
+from lambda_functions.processor.retention import retention_tags
+from lambda_functions.processor.tokenizer import get_tokenizer
+from lambda_functions.processor.file_readers import (
+    SUPPORTED_EXTENSIONS, detect_format, is_plain_text, is_supported, iter_rows, sniff_delimiter, sniff_encoding
+)
+from lambda_functions.processor.quick_scan import (
+    DEFAULT_ROW_BUDGET, DEFAULT_SAMPLE_SIZE, MODE_FIRST_K, MODE_FULL, MODE_SAMPLE, scan_rows, validate_mode
+)
 from lambda_functions.processor.utils.logger import setup_logger
+from admission_control import UPLOAD_MAX_BYTES, AdmissionControlMiddleware, AdmissionController, RejectedError
 import csv
 import io
+import itertools
 
 load_dotenv()
 
 app = FastAPI()
 
+# Controle de admissão dos uploads: orçamento de bytes em trânsito e limite por solicitante
+admission_controller = AdmissionController()
+app.add_middleware(AdmissionControlMiddleware, controller=admission_controller)
+
 # Configurações
 DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE')
 DYNAMODB_TABLE_RESULT = os.environ.get('DYNAMODB_TABLE_RESULT', 'dados-auditoria')
+DYNAMODB_TABLE_COUNTERS = os.environ.get('DYNAMODB_TABLE_COUNTERS', 'data-sentinel-audit-counters')
 S3_BUCKET = os.environ.get('S3_BUCKET')
 logger = setup_logger(__name__)
 
 # Inicialização de Handlers
 dynamodb_handler = DynamoDBHandler(DYNAMODB_TABLE)
 dados_auditoria_handler = DadosAuditoriaHandler(DYNAMODB_TABLE_RESULT)
+counters_handler = AuditCountersHandler(DYNAMODB_TABLE_COUNTERS)
 s3_handler = S3Handler(S3_BUCKET)
+work_queue = get_work_queue()
+# Tokenização determinística das amostras (MASKING_MODE=token); None mantém o mascaramento fixo
+masking_tokenizer = get_tokenizer()
+
+def aquecer_conexoes():
+    """
+    Abre as conexões com a AWS antes da primeira requisição.
+
+    Chamada por cada worker do gunicorn (gunicorn.conf.py, post_worker_init): com
+    preload_app, os handlers foram criados no processo mestre, mas clientes boto3 e
+    a conexão SQLite da fila local não podem ser compartilhados após o fork. Cada
+    worker recria os seus antes de abrir as conexões. Falhas no aquecimento apenas
+    geram aviso; o worker segue no ar.
+    """
+    global dynamodb_handler, dados_auditoria_handler, counters_handler, s3_handler, work_queue
+    dynamodb_handler = DynamoDBHandler(DYNAMODB_TABLE)
+    dados_auditoria_handler = DadosAuditoriaHandler(DYNAMODB_TABLE_RESULT)
+    counters_handler = AuditCountersHandler(DYNAMODB_TABLE_COUNTERS)
+    s3_handler = S3Handler(S3_BUCKET)
+    work_queue = get_work_queue()
+
+    aquecimentos = [("S3", lambda: s3_handler.s3_client.head_bucket(Bucket=S3_BUCKET))]
+    for nome, handler in (("DynamoDB", dynamodb_handler), ("DynamoDB (auditoria)", dados_auditoria_handler),
+                          ("DynamoDB (contadores)", counters_handler)):
+        aquecimentos.append((nome, handler.table.load))
+    for nome, aquecer in aquecimentos:
+        try:
+            aquecer()
+        except Exception as e:
+            logger.warning(f"Falha ao aquecer a conexão com {nome}: {str(e)}")
 
 def formatar_data_brasil(data_iso):
     if '.' in data_iso:
@@ -35,88 +83,165 @@ def formatar_data_brasil(data_iso):
     dt = datetime.strptime(data_iso, "%Y-%m-%dT%H:%M:%S")
     return dt.strftime("%d/%m/%Y %H:%M:%S")
 
-def mascarar_csv_text(text, n=2):
+def ler_linhas_csv_text(text):
     f = io.StringIO(text)
-    reader = csv.DictReader(f, delimiter=';')
+    reader = csv.DictReader(f, delimiter=sniff_delimiter(text[:64 * 1024]))
+    total = len(text) or 1
+    return reader, lambda: f.tell() / total
+
+def ler_linhas_auditoria(audit):
+    # CSV/TSV simples ficam no próprio item; os demais formatos são lidos do S3 sob demanda
+    # (GETs com Range), sem baixar o objeto inteiro nos modos first_k e sample
+    if audit.get("text") is not None:
+        return ler_linhas_csv_text(audit.get("text", ""))
+    f = s3_handler.open_stream(audit["s3_path"])
+    total = f.seek(0, io.SEEK_END) or 1
+    f.seek(0)
+    return iter_rows(f, audit.get("file_name") or audit["s3_path"]), lambda: f.tell() / total
+
+def mascarar_linhas(rows, n=2, tokenizer=None):
+    # Com tokenizador, o mesmo valor recebe o mesmo token em qualquer arquivo (permite cruzar amostras)
+    tokenizer = tokenizer or masking_tokenizer
     campos_sensiveis = {'cpf', 'email', 'cartao', 'telefone'}
     mascarado = []
-    for i, row in enumerate(reader):
+    for i, row in enumerate(rows):
         if i >= n:
             break
         for campo in campos_sensiveis:
             if campo in row:
-                row[campo] = "*****"
+                row[campo] = tokenizer.token(row[campo], campo) if tokenizer and row[campo] else "*****"
         mascarado.append(row)
     return mascarado
 
-def contar_dados_expostos_csv(text):
-    f = io.StringIO(text)
-    reader = csv.DictReader(f, delimiter=';')
+def mascarar_csv_text(text, n=2, tokenizer=None):
+    rows, _ = ler_linhas_csv_text(text)
+    return mascarar_linhas(rows, n, tokenizer)
+
+def contar_expostos_linha(row):
     campos_sensiveis = {'cpf', 'email', 'cartao', 'telefone'}
     expostos = 0
-    for row in reader:
-        for campo in campos_sensiveis:
-            valor = row.get(campo, "")
-            if isinstance(valor, str) and not valor.startswith("*****"):
-                expostos += 1
+    for campo in campos_sensiveis:
+        valor = row.get(campo, "")
+        if isinstance(valor, str) and not valor.startswith("*****"):
+            expostos += 1
     return expostos
 
+def contar_dados_expostos_csv(text):
+    return analisar_exposicao_csv(text)['exposed']
+
+def analisar_exposicao_linhas(rows, progress=None, modo=MODE_FULL, k=1, amostra=DEFAULT_SAMPLE_SIZE,
+                              limite_linhas=DEFAULT_ROW_BUDGET):
+    return scan_rows(
+        rows,
+        contar_expostos_linha,
+        mode=modo,
+        k=k,
+        sample_size=amostra,
+        row_budget=limite_linhas,
+        progress=progress
+    )
+
+def analisar_exposicao_csv(text, modo=MODE_FULL, k=1, amostra=DEFAULT_SAMPLE_SIZE, limite_linhas=DEFAULT_ROW_BUDGET):
+    rows, progress = ler_linhas_csv_text(text)
+    return analisar_exposicao_linhas(rows, progress, modo, k, amostra, limite_linhas)
+
+def descrever_exposicao(resultado):
+    if resultado['mode'] == MODE_SAMPLE and resultado.get('scope') == 'prefix':
+        return (f"- aproximadamente {resultado['exposed']} DADOS EXPOSTOS "
+                f"nas primeiras {resultado['rows_scanned']} linhas (arquivo não lido por inteiro)")
+    if resultado['mode'] == MODE_SAMPLE and not (resultado['lower'] == resultado['upper'] == resultado['exposed']):
+        confianca = int(resultado['confidence'] * 100)
+        return (f"- aproximadamente {resultado['exposed']} DADOS EXPOSTOS "
+                f"(IC {confianca}%: {resultado['lower']} a {resultado['upper']})")
+    if resultado['mode'] == MODE_FIRST_K and not resultado['complete']:
+        return f"- pelo menos {resultado['exposed']} DADOS EXPOSTOS"
+    return f"- {resultado['exposed']} DADOS EXPOSTOS"
+
 @app.post("/arquivos")
-async def upload_arquivo(file: UploadFile = File(...), email: str = Form(...)):
-    # Validar se o arquivo é um CSV
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Apenas arquivos CSV são permitidos.")
-    # Validar o tamanho do arquivo (máximo 5MB)
-    file_content = await file.read()
-    if len(file_content) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="O arquivo deve ter no máximo 5MB")
+async def upload_arquivo(request: Request, file: UploadFile = File(...), email: str = Form(...)):
+    # Validar o formato do arquivo (CSV/TSV, comprimidos com gzip/zstd, ou Parquet)
+    if not is_supported(file.filename):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato não permitido. Use: {', '.join(SUPPORTED_EXTENSIONS)}"
+        )
     # Validar o formato do e-mail
     try:
         valid = validate_email(email)
         email = valid.email
     except EmailNotValidError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    # Usar diretório temporário multiplataforma
-    tmp_dir = tempfile.gettempdir()
-    file_location = os.path.join(tmp_dir, file.filename)
-    with open(file_location, "wb") as buffer:
-        buffer.write(file_content)
-    s3_key = f"uploads/{file.filename}"
+    # Limite por solicitante, se o middleware ainda não o aplicou (e-mail só conhecido no formulário)
+    if getattr(request.state, 'admission_requester', None) != admission_controller.requester_key(email):
+        try:
+            admission_controller.charge_requester(email)
+        except RejectedError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail,
+                                headers={"Retry-After": str(e.retry_after)})
+    # Validar o tamanho do arquivo (máximo 5MB)
+    file_content = await file.read()
+    if len(file_content) > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=400, detail="O arquivo deve ter no máximo 5MB")
+    # Upload direto da memória (o arquivo já foi lido e tem no máximo 5MB), sem arquivo temporário.
+    # A chave leva o ID do upload: arquivos de mesmo nome de solicitantes diferentes não se sobrescrevem
+    upload_id = str(uuid.uuid4())
+    s3_key = f"uploads/{upload_id}/{file.filename}"
     try:
-        s3_handler.upload_file(file_location, s3_key)
+        s3_handler.upload_fileobj(io.BytesIO(file_content), s3_key, tags=retention_tags())
     except Exception as e:
         logger.error(f"Erro ao fazer upload do arquivo: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro ao fazer upload do arquivo.")
-    # Armazenar no DynamoDB com o e-mail e o CSV puro
+    # Armazenar no DynamoDB com o e-mail e, para CSV/TSV sem compressão, o texto puro
+    file_format, compression = detect_format(file.filename)
     audit_data = {
-        'audit_id': str(uuid.uuid4()),
+        'audit_id': upload_id,
         'created_at': datetime.utcnow().isoformat(),
         'timestamp': datetime.utcnow().isoformat(),
         'requester_email': email,
         'file_name': file.filename,
         's3_path': s3_key,
         'status': 'PENDING',
-        'text': file_content.decode()  # Salva o CSV puro como string
+        'file_format': file_format,
+        'compression': compression
     }
+    if is_plain_text(file.filename):
+        # Codificação detectada no início do arquivo; bytes inválidos adiante viram U+FFFD em vez de erro
+        audit_data['text'] = file_content.decode(sniff_encoding(file_content[:64 * 1024]), errors='replace')
     try:
         dados_auditoria_handler.save_audit_result(audit_data)
     except Exception as e:
         logger.error(f"Erro ao salvar resultado da auditoria: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro ao salvar resultado da auditoria.")
-    return {"filename": file.filename, "message": "Arquivo enviado com sucesso!", "email": email}
+    # Enfileirar a análise; o worker processa de forma assíncrona
+    try:
+        work_queue.enqueue({'file_key': s3_key, 'requester_email': email, 'upload_id': audit_data['audit_id'],
+                            'upload_timestamp': audit_data['timestamp']})
+    except Exception as e:
+        logger.error(f"Erro ao enfileirar auditoria: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao enfileirar auditoria.")
+    return {"filename": file.filename, "message": "Arquivo enviado com sucesso!", "email": email, "status": "PENDING"}
 
 @app.get("/sensitive-data/")
-def get_sensitive_data(email: str = Query(..., description="E-mail do solicitante para filtrar auditorias")):
+def get_sensitive_data(
+    email: str = Query(..., description="E-mail do solicitante para filtrar auditorias"),
+    modo: str = Query(MODE_FULL, description="Modo de análise: full, first_k ou sample"),
+    k: int = Query(1, ge=1, description="Achados que encerram a análise no modo first_k"),
+    amostra: int = Query(DEFAULT_SAMPLE_SIZE, ge=1, le=100000, description="Tamanho da amostra no modo sample"),
+    limite_linhas: int = Query(DEFAULT_ROW_BUDGET, ge=1, description="Orçamento de linhas lidas no modo sample")
+):
     try:
-        audits = dados_auditoria_handler.list_audits_by_requester(email)
-        audits = [a for a in audits if a.get("requester_email") == email]
-        if not audits:
+        modo = validate_mode(modo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        audit = dados_auditoria_handler.get_latest_audit_by_email(email)
+        if not audit:
             return JSONResponse(content={"detail": "Nenhuma auditoria encontrada para este e-mail."}, status_code=404)
-        audits_sorted = sorted(audits, key=lambda x: x.get('created_at', ''), reverse=True)
-        audit = audits_sorted[0]
-        text = audit.get("text", "")
-        dados_expostos = contar_dados_expostos_csv(text)
-        amostra = mascarar_csv_text(text)
+        # Uma única leitura: as primeiras linhas formam a amostra mascarada e seguem para a análise
+        rows, progress = ler_linhas_auditoria(audit)
+        primeiras = list(itertools.islice(rows, 2))
+        resultado = analisar_exposicao_linhas(itertools.chain(primeiras, rows), progress, modo, k, amostra, limite_linhas)
+        amostra_mascarada = mascarar_linhas(primeiras)
         audit_data_iso = audit.get("created_at", None)
         if audit_data_iso:
             data_formatada = formatar_data_brasil(audit_data_iso)
@@ -125,22 +250,108 @@ def get_sensitive_data(email: str = Query(..., description="E-mail do solicitant
         response = {
             "Olá": audit.get("nome", "Solicitante"),
             "A auditoria realizada em": data_formatada,
-            "identificou": f"- {dados_expostos} DADOS EXPOSTOS",
+            "identificou": descrever_exposicao(resultado),
             "Recomendamos": "o tratamento desses dados.",
             "Atenciosamente": "Equipe Data Sentinel",
-            "Amostra de Dados Mascarados": amostra
+            "Amostra de Dados Mascarados": amostra_mascarada
         }
+        if modo != MODE_FULL:
+            response["Análise"] = resultado
         return JSONResponse(content=response)
     except Exception as e:
         logger.error(f"Erro ao buscar auditorias: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro ao buscar auditorias.")
 
+def normalizar_limite_data(valor, fim=False):
+    if not valor:
+        return None
+    try:
+        dt = datetime.fromisoformat(valor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Data inválida: {valor}. Use AAAA-MM-DD ou ISO 8601.")
+    # Data sem horário no fim do intervalo inclui o dia inteiro
+    if fim and len(valor) == 10:
+        return dt.strftime("%Y-%m-%d") + "T23:59:59.999999"
+    return dt.isoformat()
+
+@app.get("/audits")
+def list_audits(
+    email: str = Query(..., description="E-mail do solicitante"),
+    limit: int = Query(20, ge=1, le=100, description="Quantidade de auditorias por página"),
+    cursor: str = Query(None, description="Cursor devolvido pela página anterior"),
+    inicio: str = Query(None, description="Data inicial (AAAA-MM-DD ou ISO 8601)"),
+    fim: str = Query(None, description="Data final (AAAA-MM-DD ou ISO 8601)")
+):
+    start = normalizar_limite_data(inicio)
+    end = normalizar_limite_data(fim, fim=True)
+    try:
+        items, next_cursor = dados_auditoria_handler.query_audits_page(email, limit, cursor, start, end)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro ao listar auditorias: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao listar auditorias.")
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/audits/{audit_id}/achados")
+def get_achados(
+    audit_id: str,
+    timestamp: str = Query(None, description="Timestamp (chave de ordenação) da auditoria"),
+    coluna: str = Query(None, description="Filtra os achados de uma coluna"),
+    tipo: str = Query(None, description="Filtra os achados de um tipo (ex.: cpf, email)"),
+    offset: int = Query(0, ge=0, description="Achados a pular"),
+    limit: int = Query(100, ge=1, le=1000, description="Quantidade de achados por página")
+):
+    try:
+        audit = dynamodb_handler.get_audit(audit_id, timestamp)
+        if not audit:
+            return JSONResponse(content={"detail": "Auditoria não encontrada."}, status_code=404)
+        # Total com os mesmos filtros da página (coluna/tipo)
+        achados, total = FindingsStore(s3_handler).findings_page(audit, coluna, tipo, offset, limit)
+    except Exception as e:
+        logger.error(f"Erro ao buscar achados: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao buscar achados.")
+    response = {
+        "audit_id": audit_id,
+        "total": total,
+        "offset": offset,
+        "items": achados
+    }
+    # Reauditoria incremental: linhas já auditadas entram só no resumo, não nos achados
+    if ((audit.get("analysis") or {}).get("incremental") or {}).get("details_scope") == "new_rows":
+        response["escopo"] = "linhas_novas"
+        response["observacao"] = ("Os achados cobrem apenas as linhas novas desde a auditoria anterior; "
+                                  "as linhas mantidas constam apenas no resumo (sensitive_data_count).")
+    return response
+
+@app.get("/contadores")
+def get_contadores(
+    email: str = Query(..., description="E-mail do solicitante"),
+    periodo: str = Query("total", description="'total', 'AAAA-MM' (mês) ou 'AAAA-MM-DD' (dia)")
+):
+    try:
+        period = period_key(periodo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return counters_handler.get_counters(email, period)
+    except Exception as e:
+        logger.error(f"Erro ao buscar contadores: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao buscar contadores.")
+
 @app.delete("/dados-sensiveis")
 def delete_dados_sensiveis(email: str = Query(..., description="E-mail do solicitante para deletar auditorias")):
     try:
         audits = dados_auditoria_handler.list_audits_by_requester(email)
         for audit in audits:
             dados_auditoria_handler.delete_audit(audit['HASH'], audit['RANGE'])
+        # Remove também os arquivos enviados (DeleteObjects em lotes de até 1.000 chaves), exceto
+        # os ainda referenciados por auditorias de outros solicitantes (uploads antigos, sem o ID na
+        # chave); apenas os arquivos removidos são consultados, no GSI por s3_path
+        s3_paths = {audit['s3_path'] for audit in audits if audit.get('s3_path')}
+        orfaos = [path for path in sorted(s3_paths) if not dados_auditoria_handler.is_s3_path_referenced(path)]
+        if orfaos:
+            s3_handler.delete_objects(orfaos)
         return {"message": "Auditoria Limpa com sucesso!"}
     except Exception as e:
         logger.error(f"Erro ao limpar a tabela: {str(e)}")
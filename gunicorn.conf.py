@@ -0,0 +1,54 @@
+"""
+Perfil de produção da API do Data Sentinel (gunicorn + workers uvicorn).
+
+- Um worker por núcleo disponível (WEB_CONCURRENCY sobrepõe), cada um com seu
+  próprio laço de eventos; uvloop e httptools são usados pelo UvicornWorker
+  quando instalados (uvicorn[standard]).
+- preload_app: app.py (load_dotenv, criação dos clientes boto3, modelos do
+  botocore) é carregado uma vez no processo mestre e compartilhado com os
+  workers por copy-on-write.
+- post_worker_init: cada worker recria os clientes boto3 e a fila (que não podem
+  ser compartilhados após o fork) e abre suas conexões com S3 e DynamoDB antes
+  da primeira requisição (app.aquecer_conexoes).
+- post_worker_init também divide os limites de admissão dos uploads
+  (UPLOAD_INFLIGHT_MAX_BYTES, UPLOAD_RATE_PER_MINUTE, UPLOAD_BURST) entre os
+  workers: cada um os mantém em memória, e os valores configurados são os do nó.
+- keepalive acima do tempo ocioso do balanceador (60s no ALB), para que a
+  conexão nunca seja fechada pelo servidor enquanto o balanceador a reutiliza.
+
+Uso:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+def _cpu_count():
+    # Respeita o conjunto de CPUs do contêiner, quando restrito
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', str(_cpu_count())))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '75'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+backlog = int(os.environ.get('GUNICORN_BACKLOG', '2048'))
+# Reciclagem periódica dos workers (desativada com 0): limita o crescimento de memória, mas cada
+# reinício fecha as conexões keep-alive do worker (ver teste de carga no guia); o jitter evita
+# reinícios simultâneos
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+loglevel = os.environ.get('LOG_LEVEL', 'INFO').lower()
+
+def post_worker_init(worker):
+    import app
+
+    app.aquecer_conexoes()
+    app.admission_controller.share_among(worker.cfg.workers)
+    worker.log.info(f"Worker {worker.pid} aquecido")
@@ -5,106 +5,275 @@ Formatador de e-mails para notificações de auditoria.
 import logging
 import os
 from datetime import datetime
+from html import escape
 
-from utils.logger import setup_logger
+from lambda_functions.notifier.utils.logger import setup_logger
 
 # Configuração de logging
 logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
 
+# Nomes amigáveis dos tipos de dados sensíveis
+DATA_TYPE_NAMES = {
+    'cpf': 'CPFs',
+    'email': 'E-mails',
+    'cartao_credito': 'Cartões de crédito',
+    'telefone': 'Telefones',
+    'rg': 'RGs',
+    'endereco': 'Endereços',
+    'nome_completo': 'Nomes completos'
+}
+
+DATE_FORMAT = '%d/%m/%Y %H:%M:%S'
+EMPTY_SUMMARY_TEXT = "- Nenhum dado sensível encontrado\n"
+
+
+def _format_timestamp(timestamp):
+    """
+    Converte um timestamp ISO para o formato legível.
+
+    Args:
+        timestamp (str): Timestamp no formato ISO
+
+    Returns:
+        str: Data formatada ou o próprio timestamp se não for ISO válido
+    """
+    try:
+        return datetime.fromisoformat(timestamp).strftime(DATE_FORMAT)
+    except (ValueError, TypeError):
+        return timestamp
+
+
+def _render_summary(summary):
+    """
+    Renderiza os fragmentos de texto e HTML de um resumo.
+
+    Args:
+        summary (dict): Contagem por tipo de dado sensível
+
+    Returns:
+        tuple: (texto, html) do resumo
+    """
+    text_lines = []
+    html_lines = []
+    for data_type, count in (summary or {}).items():
+        if count > 0:
+            data_type_name = DATA_TYPE_NAMES.get(data_type, data_type)
+            text_lines.append(f"- {count} {data_type_name} não mascarados\n")
+            html_lines.append(f"<li>{count} {escape(str(data_type_name))} não mascarados</li>\n")
+
+    if not text_lines:
+        return EMPTY_SUMMARY_TEXT, "<li>Nenhum dado sensível encontrado</li>\n"
+
+    return "".join(text_lines), "".join(html_lines)
+
+
 class EmailFormatter:
     """
     Classe responsável pela formatação de e-mails.
     """
-    
+
+    def __init__(self, include_html=False):
+        """
+        Inicializa o formatador.
+
+        Args:
+            include_html (bool): Se True, inclui a variante HTML do corpo
+        """
+        self.include_html = include_html
+
     def format_audit_notification(self, audit_data):
         """
         Formata uma notificação de auditoria para envio por e-mail.
-        
+
         Args:
             audit_data (dict): Dados da auditoria
-            
+
         Returns:
             dict: Mensagem formatada para e-mail
         """
         logger.info(f"Formatando e-mail de notificação para auditoria {audit_data.get('audit_id')}")
-        
+
         try:
-            # Extração de dados
-            audit_id = audit_data.get('audit_id')
-            requester_email = audit_data.get('requester_email')
-            summary = audit_data.get('summary', {})
-            timestamp = audit_data.get('timestamp')
-            
-            # Conversão do timestamp para formato legível
-            if timestamp:
-                try:
-                    dt = datetime.fromisoformat(timestamp)
-                    formatted_date = dt.strftime('%d/%m/%Y %H:%M:%S')
-                except (ValueError, TypeError):
-                    formatted_date = timestamp
-            else:
-                formatted_date = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
-            
-            # Formatação do resumo
-            summary_text = ""
-            if summary:
-                for data_type, count in summary.items():
-                    if count > 0:
-                        data_type_name = self._get_data_type_name(data_type)
-                        summary_text += f"- {count} {data_type_name} não mascarados\n"
-            
-            if not summary_text:
-                summary_text = "- Nenhum dado sensível encontrado\n"
-            
-            # Formatação do e-mail
-            subject = f"Resultado da Auditoria de Dados Sensíveis - {audit_id[:8]}"
-            
+            email = self._render(audit_data)
+            logger.info(f"E-mail formatado com sucesso")
+            return email
+
+        except Exception as e:
+            logger.error(f"Erro ao formatar e-mail de notificação: {str(e)}", exc_info=True)
+            raise
+
+    def format_many(self, audits):
+        """
+        Formata notificações de várias auditorias em lote (ex.: digest).
+
+        Ao contrário de format_audit_notification, não registra log por item.
+
+        Args:
+            audits (iterable): Dados das auditorias
+
+        Returns:
+            list: Mensagens formatadas para e-mail, na mesma ordem da entrada
+        """
+        audits = list(audits)
+        logger.info(f"Formatando {len(audits)} e-mails de notificação em lote")
+
+        try:
+            return [self._render(audit_data) for audit_data in audits]
+
+        except Exception as e:
+            logger.error(f"Erro ao formatar e-mails em lote: {str(e)}", exc_info=True)
+            raise
+
+    def format_digest(self, requester_email, notifications):
+        """
+        Formata um único e-mail de resumo (digest) para várias auditorias do mesmo solicitante.
+
+        Args:
+            requester_email (str): E-mail do solicitante
+            notifications (list): Notificações individuais (audit_id, summary, timestamp)
+
+        Returns:
+            dict: Mensagem formatada para e-mail, com o resumo agregado em 'summary'
+        """
+        logger.info(f"Formatando digest de {len(notifications)} auditorias para {requester_email}")
+
+        try:
+            summary = self.aggregate_summaries(n.get('summary') for n in notifications)
+            summary_text, _ = _render_summary(summary)
+
+            audit_lines = []
+            dates = []
+            for notification in notifications:
+                timestamp = notification.get('timestamp')
+                formatted_date = _format_timestamp(timestamp) if timestamp else "Data não informada"
+                if timestamp:
+                    dates.append(timestamp)
+                total = sum(notification.get('summary', {}).values())
+                file_name = notification.get('file_name', notification.get('audit_id'))
+                audit_lines.append(f"- {formatted_date} | {file_name} | {total} dados sensíveis | ID {notification.get('audit_id')}\n")
+
+            dates.sort()
+            now = datetime.now().strftime(DATE_FORMAT)
+            audit_count = len(notifications)
+            first_date = _format_timestamp(dates[0]) if dates else now
+            last_date = _format_timestamp(dates[-1]) if dates else now
+
             body = f"""Olá,
 
-A auditoria realizada em {formatted_date} identificou:
+As {audit_count} auditorias concluídas entre {first_date} e {last_date} identificaram, no total:
 
 {summary_text}
-Recomendamos o tratamento desses dados antes do uso em ambientes não produtivos.
+Auditorias incluídas neste resumo:
 
-Para acessar os detalhes completos da auditoria, incluindo a localização exata dos dados sensíveis, 
-acesse o portal Data Sentinel e autentique-se com suas credenciais.
+{"".join(audit_lines)}
+Recomendamos o tratamento desses dados antes do uso em ambientes não produtivos.
 
-ID da Auditoria: {audit_id}
+Para acessar os detalhes completos de cada auditoria, acesse o portal Data Sentinel
+e autentique-se com suas credenciais.
 
 Atenciosamente,
 Equipe Data Sentinel
 """
-            
-            logger.info(f"E-mail formatado com sucesso")
-            
+
+            logger.info(f"Digest formatado com sucesso")
+
             return {
-                'subject': subject,
+                'subject': f"Resumo das Auditorias de Dados Sensíveis - {audit_count} auditorias",
                 'body': body,
-                'recipient': requester_email
+                'recipient': requester_email,
+                'summary': summary
             }
-            
+
         except Exception as e:
-            logger.error(f"Erro ao formatar e-mail de notificação: {str(e)}", exc_info=True)
+            logger.error(f"Erro ao formatar digest de notificações: {str(e)}", exc_info=True)
             raise
-    
+
+    @staticmethod
+    def aggregate_summaries(summaries):
+        """
+        Soma as contagens por tipo de dado sensível de vários resumos.
+
+        Args:
+            summaries (iterable): Resumos (dict tipo -> quantidade)
+
+        Returns:
+            dict: Resumo agregado
+        """
+        aggregated = {}
+        for summary in summaries:
+            for data_type, count in (summary or {}).items():
+                aggregated[data_type] = aggregated.get(data_type, 0) + count
+        return aggregated
+
+    def _render(self, audit_data):
+        """
+        Renderiza a mensagem de uma auditoria.
+
+        Args:
+            audit_data (dict): Dados da auditoria
+
+        Returns:
+            dict: Mensagem formatada para e-mail
+        """
+        audit_id = audit_data.get('audit_id')
+        timestamp = audit_data.get('timestamp')
+
+        # Conversão do timestamp para formato legível
+        if timestamp:
+            formatted_date = _format_timestamp(timestamp)
+        else:
+            formatted_date = datetime.now().strftime(DATE_FORMAT)
+
+        summary_text, summary_html = _render_summary(audit_data.get('summary'))
+
+        body = f"""Olá,
+
+A auditoria realizada em {formatted_date} identificou:
+
+{summary_text}
+Recomendamos o tratamento desses dados antes do uso em ambientes não produtivos.
+
+Para acessar os detalhes completos da auditoria, incluindo a localização exata dos dados sensíveis, 
+acesse o portal Data Sentinel e autentique-se com suas credenciais.
+
+ID da Auditoria: {audit_id}
+
+Atenciosamente,
+Equipe Data Sentinel
+"""
+
+        email = {
+            'subject': f"Resultado da Auditoria de Dados Sensíveis - {audit_id[:8]}",
+            'body': body,
+            'recipient': audit_data.get('requester_email')
+        }
+
+        if self.include_html:
+            email['html_body'] = f"""<html>
+<body>
+<p>Olá,</p>
+<p>A auditoria realizada em {escape(str(formatted_date))} identificou:</p>
+<ul>
+{summary_html}</ul>
+<p>Recomendamos o tratamento desses dados antes do uso em ambientes não produtivos.</p>
+<p>Para acessar os detalhes completos da auditoria, incluindo a localização exata dos dados sensíveis,
+acesse o portal Data Sentinel e autentique-se com suas credenciais.</p>
+<p>ID da Auditoria: {escape(str(audit_id))}</p>
+<p>Atenciosamente,<br>Equipe Data Sentinel</p>
+</body>
+</html>
+"""
+
+        return email
+
     def _get_data_type_name(self, data_type):
         """
         Obtém o nome amigável para um tipo de dado sensível.
-        
+
         Args:
             data_type (str): Tipo de dado sensível
-            
+
         Returns:
             str: Nome amigável
         """
-        data_type_names = {
-            'cpf': 'CPFs',
-            'email': 'E-mails',
-            'cartao_credito': 'Cartões de crédito',
-            'telefone': 'Telefones',
-            'rg': 'RGs',
-            'endereco': 'Endereços',
-            'nome_completo': 'Nomes completos'
-        }
-        
-        return data_type_names.get(data_type, data_type)
+        return DATA_TYPE_NAMES.get(data_type, data_type)
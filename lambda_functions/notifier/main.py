@@ -8,9 +8,9 @@ import logging
 from datetime import datetime
 
 # Importação dos módulos internos
-from email_formatter import EmailFormatter
-from dynamodb_reader import DynamoDBReader
-from utils.logger import setup_logger
+from lambda_functions.notifier.email_formatter import EmailFormatter
+from lambda_functions.notifier.dynamodb_reader import DynamoDBReader
+from lambda_functions.notifier.utils.logger import setup_logger
 
 # Configuração de ambiente
 DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'data-sentinel-audit-results')
@@ -54,6 +54,19 @@ def lambda_handler(event, context):
         if not audit_id or not requester_email:
             raise ValueError("Dados de notificação incompletos")
         
+        # Digest: o e-mail agregado já foi entregue pelo SNS (protocolo email)
+        if notification_data.get('digest'):
+            logger.info(f"Digest de {len(notification_data.get('audit_ids', []))} auditorias processado para {requester_email}")
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'Digest processado com sucesso',
+                    'audit_id': audit_id,
+                    'audit_ids': notification_data.get('audit_ids', []),
+                    'requester_email': requester_email
+                })
+            }
+
         # Inicialização dos handlers
         dynamodb_reader = DynamoDBReader(DYNAMODB_TABLE)
         email_formatter = EmailFormatter()
@@ -0,0 +1,57 @@
+"""
+Máquina de estados das auditorias do Data Sentinel.
+
+Uma auditoria percorre PENDING -> PROCESSING -> COMPLETED/FAILED. O ID é derivado
+de forma determinística da chave S3 e do ETag do arquivo, de modo que uma nova
+tentativa da Lambda para o mesmo arquivo encontra o mesmo registro no DynamoDB.
+"""
+
+import uuid
+
+PENDING = 'PENDING'
+PROCESSING = 'PROCESSING'
+COMPLETED = 'COMPLETED'
+FAILED = 'FAILED'
+
+# Estados de origem permitidos para cada estado de destino.
+# PROCESSING -> PROCESSING só é aceito quando o lease da tentativa anterior expirou.
+ALLOWED_TRANSITIONS = {
+    PENDING: (),
+    PROCESSING: (PENDING, FAILED, PROCESSING),
+    COMPLETED: (PROCESSING,),
+    FAILED: (PROCESSING,),
+}
+
+# Namespace fixo para os UUIDs determinísticos das auditorias
+AUDIT_NAMESPACE = uuid.UUID('6f1b8a52-3c1e-4a7d-9a57-2d0c4e8f5b13')
+
+def make_audit_id(s3_key, etag, analysis_mode='full'):
+    """
+    Gera o ID determinístico de uma auditoria.
+
+    Args:
+        s3_key (str): Chave do objeto no S3
+        etag (str): ETag do objeto no S3
+        analysis_mode (str): Modo de análise; análises rápidas não reaproveitam
+            o registro da análise completa (e vice-versa)
+
+    Returns:
+        str: UUID (versão 5) derivado da chave, do ETag e do modo
+    """
+    name = f"{s3_key}#{etag}"
+    if analysis_mode != 'full':
+        name += f"#{analysis_mode}"
+    return str(uuid.uuid5(AUDIT_NAMESPACE, name))
+
+def can_transition(current_status, new_status):
+    """
+    Verifica se a transição de estado é permitida.
+
+    Args:
+        current_status (str): Estado atual
+        new_status (str): Estado desejado
+
+    Returns:
+        bool: True se a transição é permitida
+    """
+    return current_status in ALLOWED_TRANSITIONS.get(new_status, ())
@@ -0,0 +1,212 @@
+"""
+Contadores agregados de auditorias por solicitante no Data Sentinel.
+
+Cada auditoria concluída incrementa (ADD) três itens do solicitante, o total
+geral, o do mês e o do dia, em uma única transação (TransactWriteItems) com um
+item marcador 'AUDIT#<audit_id>': os três contadores mudam juntos, e uma nova
+entrega da mesma auditoria não conta duas vezes. Assim os totais do painel são
+lidos com um único GetItem, independentemente de quantas auditorias existam.
+
+Esquema da tabela: requester_email (HASH) e period (RANGE), onde period é
+'TOTAL', 'MONTH#AAAA-MM', 'DAY#AAAA-MM-DD' ou 'AUDIT#<audit_id>' (marcador).
+"""
+
+import boto3
+import os
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from datetime import datetime
+from decimal import Decimal
+from dotenv import load_dotenv
+
+from lambda_functions.notifier.utils.logger import setup_logger
+from lambda_functions.processor.retention import with_ttl
+
+load_dotenv()
+logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
+
+TOTAL_PERIOD = 'TOTAL'
+TYPE_PREFIX = 'type_'
+AUDIT_MARKER_PREFIX = 'AUDIT#'
+
+def period_keys(when):
+    """
+    Retorna as chaves de período afetadas por uma auditoria concluída em 'when'.
+
+    Args:
+        when (datetime): Momento da conclusão
+
+    Returns:
+        list: Chaves de período (total, mês e dia)
+    """
+    return [
+        TOTAL_PERIOD,
+        f"MONTH#{when.strftime('%Y-%m')}",
+        f"DAY#{when.strftime('%Y-%m-%d')}"
+    ]
+
+def period_key(periodo):
+    """
+    Converte o período informado na API para a chave de ordenação da tabela.
+
+    Args:
+        periodo (str): 'total', 'AAAA-MM' ou 'AAAA-MM-DD'
+
+    Returns:
+        str: Chave de período
+
+    Raises:
+        ValueError: Se o período não estiver em um dos formatos aceitos
+    """
+    if not periodo or periodo.lower() == 'total':
+        return TOTAL_PERIOD
+    for fmt, prefix in (('%Y-%m', 'MONTH'), ('%Y-%m-%d', 'DAY')):
+        try:
+            datetime.strptime(periodo, fmt)
+            return f"{prefix}#{periodo}"
+        except ValueError:
+            continue
+    raise ValueError("Período inválido: use 'total', 'AAAA-MM' ou 'AAAA-MM-DD'")
+
+class AuditCountersHandler:
+    """Classe responsável pelos contadores agregados de auditorias."""
+
+    def __init__(self, table_name):
+        """Inicializa o manipulador de contadores."""
+        self.table_name = table_name
+        self.dynamodb = boto3.resource('dynamodb')
+        self.table = self.dynamodb.Table(table_name)
+        logger.info(f"Inicializando AuditCountersHandler para a tabela: {table_name}")
+
+    def increment(self, requester_email, summary, when=None, audit_id=None):
+        """Incrementa os contadores do solicitante com o resumo de uma auditoria.
+
+        Args:
+            requester_email (str): E-mail do solicitante
+            summary (dict): Quantidade de dados expostos por tipo
+            when (datetime, optional): Momento da conclusão (padrão: agora, UTC)
+            audit_id (str, optional): Chave de idempotência; a auditoria é contada uma única vez
+
+        Returns:
+            bool: True se incrementado, False se a auditoria já havia sido contada
+        """
+        when = when or datetime.utcnow()
+        summary = {data_type: int(count) for data_type, count in (summary or {}).items() if count}
+
+        update_expression = "ADD audit_count :one, total_exposed :total"
+        expression_attribute_names = {'#updated_at': 'updated_at'}
+        expression_attribute_values = {
+            ':one': 1,
+            ':total': sum(summary.values()),
+            ':updated_at': when.isoformat()
+        }
+        for index, (data_type, count) in enumerate(sorted(summary.items())):
+            expression_attribute_names[f'#t{index}'] = f"{TYPE_PREFIX}{data_type}"
+            expression_attribute_values[f':t{index}'] = count
+            update_expression += f", #t{index} :t{index}"
+        update_expression += " SET #updated_at = :updated_at"
+
+        serializer = TypeSerializer()
+        transact_items = []
+        if audit_id:
+            marker = with_ttl({
+                'requester_email': requester_email,
+                'period': f"{AUDIT_MARKER_PREFIX}{audit_id}",
+                'counted_at': when.isoformat()
+            })
+            transact_items.append({'Put': {
+                'TableName': self.table_name,
+                'Item': {name: serializer.serialize(value) for name, value in marker.items()},
+                'ConditionExpression': 'attribute_not_exists(period)'
+            }})
+        for period in period_keys(when):
+            transact_items.append({'Update': {
+                'TableName': self.table_name,
+                'Key': {
+                    'requester_email': serializer.serialize(requester_email),
+                    'period': serializer.serialize(period)
+                },
+                'UpdateExpression': update_expression,
+                'ExpressionAttributeNames': expression_attribute_names,
+                'ExpressionAttributeValues': {name: serializer.serialize(value)
+                                              for name, value in expression_attribute_values.items()}
+            }})
+
+        logger.info(f"Incrementando contadores de {requester_email}")
+        try:
+            self.dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+            logger.info("Contadores incrementados com sucesso")
+            return True
+        except ClientError as e:
+            reasons = e.response.get('CancellationReasons') or []
+            if audit_id and reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+                logger.info(f"Auditoria {audit_id} já contabilizada nos contadores de {requester_email}")
+                return False
+            logger.error(f"Erro ao incrementar contadores no DynamoDB: {str(e)}", exc_info=True)
+            raise
+
+    def get_counters(self, requester_email, period=TOTAL_PERIOD):
+        """Obtém os contadores de um período com um único GetItem.
+
+        Args:
+            requester_email (str): E-mail do solicitante
+            period (str): Chave de período (ver period_key)
+
+        Returns:
+            dict: audit_count, total_exposed e by_type (zerados se não houver registro)
+        """
+        logger.info(f"Obtendo contadores de {requester_email} ({period})")
+        try:
+            response = self.table.get_item(Key={'requester_email': requester_email, 'period': period})
+            item = response.get('Item', {})
+            return {
+                'requester_email': requester_email,
+                'period': period,
+                'audit_count': int(item.get('audit_count', 0)),
+                'total_exposed': int(item.get('total_exposed', 0)),
+                'by_type': {
+                    name[len(TYPE_PREFIX):]: int(value)
+                    for name, value in item.items()
+                    if name.startswith(TYPE_PREFIX) and isinstance(value, (int, Decimal))
+                },
+                'updated_at': item.get('updated_at')
+            }
+        except ClientError as e:
+            logger.error(f"Erro ao obter contadores do DynamoDB: {str(e)}", exc_info=True)
+            raise
+
+class LocalAuditCountersHandler:
+    """Substituto local do AuditCountersHandler que mantém os contadores em memória (testes e execução offline)."""
+
+    def __init__(self, table_name='local'):
+        self.table_name = table_name
+        self.items = {}
+        self.counted = set()
+
+    def increment(self, requester_email, summary, when=None, audit_id=None):
+        if audit_id:
+            if audit_id in self.counted:
+                logger.info(f"Auditoria {audit_id} já contabilizada nos contadores de {requester_email}")
+                return False
+            self.counted.add(audit_id)
+        summary = {data_type: int(count) for data_type, count in (summary or {}).items() if count}
+        when = when or datetime.utcnow()
+        for period in period_keys(when):
+            item = self.items.setdefault((requester_email, period), {'audit_count': 0, 'total_exposed': 0})
+            item['audit_count'] += 1
+            item['total_exposed'] += sum(summary.values())
+            for data_type, count in summary.items():
+                item[f"{TYPE_PREFIX}{data_type}"] = item.get(f"{TYPE_PREFIX}{data_type}", 0) + count
+            item['updated_at'] = when.isoformat()
+        return True
+
+    def get_counters(self, requester_email, period=TOTAL_PERIOD):
+        item = self.items.get((requester_email, period), {})
+        return {
+            'requester_email': requester_email,
+            'period': period,
+            'audit_count': item.get('audit_count', 0),
+            'total_exposed': item.get('total_exposed', 0),
+            'by_type': {name[len(TYPE_PREFIX):]: value for name, value in item.items() if name.startswith(TYPE_PREFIX)},
+            'updated_at': item.get('updated_at')
+        }
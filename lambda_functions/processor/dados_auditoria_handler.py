@@ -1,16 +1,48 @@
+import base64
 import boto3
+import json
 import os
+from datetime import datetime
+from decimal import Decimal
 from boto3.dynamodb.conditions import Key
 from dotenv import load_dotenv
 from lambda_functions.notifier.utils.logger import setup_logger
+from lambda_functions.processor.retention import with_ttl
 from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
 
 logger = setup_logger(__name__)
 load_dotenv()
 DYNAMODB_TABLE_RESULT = os.environ.get('DYNAMODB_TABLE_RESULT', 'dados-auditoria')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('dados-auditoria')
+REQUESTER_EMAIL_INDEX = 'requester_email-index'  # GSI: requester_email (HASH), created_at (RANGE)
+S3_PATH_INDEX = 's3_path-index'  # GSI: s3_path (HASH), projeção KEYS_ONLY
+
+# Atributos devolvidos na listagem paginada (o CSV bruto em 'text' fica de fora)
+AUDIT_PAGE_ATTRIBUTES = ['HASH', 'RANGE', 'audit_id', 'created_at', 'timestamp', 'requester_email',
+                         'file_name', 's3_path', 'status', 'sensitive_data_count']
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginação inválido ou adulterado."""
+
+def encode_cursor(last_evaluated_key):
+    """Converte o LastEvaluatedKey do DynamoDB em um token opaco para a API."""
+    if not last_evaluated_key:
+        return None
+    payload = json.dumps(last_evaluated_key, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Converte o token opaco da API de volta em ExclusiveStartKey."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursorError("Cursor de paginação inválido") from e
+    if not isinstance(key, dict):
+        raise InvalidCursorError("Cursor de paginação inválido")
+    return key
 
 class DadosAuditoriaHandler:
     def __init__(self, table_name):
@@ -23,16 +55,130 @@ class DadosAuditoriaHandler:
         )
         self.table = self.dynamodb.Table(self.table_name)
 
+    def save_audit_result(self, audit_data):
+        logger.info(f"Salvando auditoria {audit_data.get('audit_id')} no DynamoDB")
+        try:
+            # TTL gravado junto com o item: o DynamoDB o remove ao fim da retenção
+            item = json.loads(json.dumps(with_ttl(dict(audit_data))), parse_float=Decimal)
+            self.table.put_item(Item=item)
+            logger.info("Auditoria salva com sucesso")
+            return audit_data.get('audit_id')
+        except ClientError as e:
+            logger.error(f"Erro ao salvar auditoria no DynamoDB: {str(e)}", exc_info=True)
+            raise
+
+    def update_upload_status(self, upload_id, status, expected_status, timestamp=None, extra_attributes=None):
+        """Atualiza, com escrita condicional, o status do registro de um upload.
+
+        Args:
+            upload_id (str): audit_id gravado pela API no upload
+            status (str): Novo status
+            expected_status (list): Status de origem aceitos (audit_state.ALLOWED_TRANSITIONS)
+            timestamp (str, optional): Chave de ordenação do registro
+            extra_attributes (dict, optional): Atributos gravados junto com o status
+
+        Returns:
+            bool: True se atualizado, False se o registro não existe ou está em outro estado
+        """
+        logger.info(f"Atualizando status do upload {upload_id} para {status}")
+        key = {'audit_id': upload_id}
+        if timestamp:
+            key['timestamp'] = timestamp
+        names = {'#status': 'status'}
+        values = {':status': status, ':updated_at': datetime.utcnow().isoformat()}
+        update_expression = "SET #status = :status, updated_at = :updated_at"
+        for index, (name, value) in enumerate((extra_attributes or {}).items()):
+            names[f'#a{index}'] = name
+            values[f':a{index}'] = json.loads(json.dumps(value), parse_float=Decimal)
+            update_expression += f", #a{index} = :a{index}"
+        for index, expected in enumerate(expected_status):
+            values[f':e{index}'] = expected
+        condition = "attribute_exists(audit_id) AND #status IN (" + ", ".join(
+            f':e{index}' for index in range(len(expected_status))) + ")"
+        try:
+            self.table.update_item(
+                Key=key,
+                UpdateExpression=update_expression,
+                ConditionExpression=condition,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.warning(f"Transição do upload {upload_id} para {status} rejeitada pelo estado atual")
+                return False
+            logger.error(f"Erro ao atualizar status do upload no DynamoDB: {str(e)}", exc_info=True)
+            raise
+
     def list_audits_by_requester(self, email):
-        # Supondo que requester_email não é chave primária, use scan + filtro
-        response = self.table.scan(
-            FilterExpression=Key('requester_email').eq(email)
-        )
-        return response.get('Items', [])
+        # Supondo que requester_email não é chave primária, use scan + filtro (todas as páginas)
+        items = []
+        params = {'FilterExpression': Key('requester_email').eq(email)}
+        while True:
+            response = self.table.scan(**params)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return items
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def iter_s3_paths(self):
+        """Percorre (em páginas) os s3_path referenciados pelas auditorias da tabela."""
+        params = {
+            'ProjectionExpression': '#s3_path',
+            'ExpressionAttributeNames': {'#s3_path': 's3_path'}
+        }
+        try:
+            while True:
+                response = self.table.scan(**params)
+                for item in response.get('Items', []):
+                    if item.get('s3_path'):
+                        yield item['s3_path']
+                if 'LastEvaluatedKey' not in response:
+                    return
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            logger.error(f"Erro ao listar arquivos referenciados no DynamoDB: {str(e)}", exc_info=True)
+            raise
+
+    def is_s3_path_referenced(self, s3_path):
+        """Indica se alguma auditoria da tabela ainda referencia o arquivo (consulta ao GSI por s3_path).
+
+        O GSI é eventualmente consistente: uma auditoria recém-removida pode ainda
+        aparecer, e o arquivo fica para a varredura de órfãos (retention.OrphanSweeper).
+        """
+        try:
+            response = self.table.query(
+                IndexName=S3_PATH_INDEX,
+                KeyConditionExpression=Key('s3_path').eq(s3_path),
+                Limit=1
+            )
+            return bool(response.get('Items'))
+        except ClientError as e:
+            logger.error(f"Erro ao consultar referências ao arquivo {s3_path} no DynamoDB: {str(e)}", exc_info=True)
+            raise
 
-    def get_latest_audit_by_email(email):
-        response = table.query(
-            IndexName='requester_email-index',  # Nome do seu GSI
+    def enable_ttl(self, attribute_name):
+        """Habilita o TTL da tabela no atributo informado (idempotente)."""
+        logger.info(f"Habilitando TTL da tabela {self.table_name} no atributo {attribute_name}")
+        client = self.dynamodb.meta.client
+        try:
+            current = client.describe_time_to_live(TableName=self.table_name)['TimeToLiveDescription']
+            if current.get('TimeToLiveStatus') in ('ENABLED', 'ENABLING'):
+                logger.info("TTL já habilitado")
+                return False
+            client.update_time_to_live(
+                TableName=self.table_name,
+                TimeToLiveSpecification={'Enabled': True, 'AttributeName': attribute_name}
+            )
+            return True
+        except ClientError as e:
+            logger.error(f"Erro ao habilitar TTL no DynamoDB: {str(e)}", exc_info=True)
+            raise
+
+    def get_latest_audit_by_email(self, email):
+        response = self.table.query(
+            IndexName=REQUESTER_EMAIL_INDEX,
             KeyConditionExpression=Key('requester_email').eq(email),
             ScanIndexForward=False,  # Ordena decrescente
             Limit=1
@@ -40,10 +186,52 @@ class DadosAuditoriaHandler:
         items = response.get('Items', [])
         return items[0] if items else None
 
-    # Exemplo de uso
-    if __name__ == "__main__":
-        latest_audit = get_latest_audit_by_email('datamaskingzup@gmail.com')
-        print(latest_audit)
+    def query_audits_page(self, email, limit=20, cursor=None, start=None, end=None):
+        """Lista uma página do histórico de auditorias de um solicitante.
+
+        A consulta usa o GSI por requester_email com o intervalo de datas na
+        condição de chave (created_at), mais recentes primeiro. Apenas 'limit'
+        itens são lidos por chamada; a página seguinte é obtida com o cursor.
+
+        Args:
+            email (str): E-mail do solicitante
+            limit (int): Tamanho da página
+            cursor (str, optional): Token devolvido pela página anterior
+            start (str, optional): created_at mínimo (ISO, inclusivo)
+            end (str, optional): created_at máximo (ISO, inclusivo)
+
+        Returns:
+            tuple: (itens da página, cursor da próxima página ou None)
+        """
+        key_condition = Key('requester_email').eq(email)
+        if start and end:
+            key_condition = key_condition & Key('created_at').between(start, end)
+        elif start:
+            key_condition = key_condition & Key('created_at').gte(start)
+        elif end:
+            key_condition = key_condition & Key('created_at').lte(end)
+
+        params = {
+            'IndexName': REQUESTER_EMAIL_INDEX,
+            'KeyConditionExpression': key_condition,
+            'ScanIndexForward': False,
+            'Limit': limit,
+            'ProjectionExpression': ", ".join(f"#p{i}" for i in range(len(AUDIT_PAGE_ATTRIBUTES))),
+            'ExpressionAttributeNames': {f"#p{i}": name for i, name in enumerate(AUDIT_PAGE_ATTRIBUTES)}
+        }
+        exclusive_start_key = decode_cursor(cursor)
+        if exclusive_start_key:
+            if exclusive_start_key.get('requester_email') != email:
+                raise InvalidCursorError("Cursor de paginação não pertence a este solicitante")
+            params['ExclusiveStartKey'] = exclusive_start_key
+
+        logger.info(f"Listando página de auditorias para {email} (limite {limit})")
+        try:
+            response = self.table.query(**params)
+            return response.get('Items', []), encode_cursor(response.get('LastEvaluatedKey'))
+        except ClientError as e:
+            logger.error(f"Erro ao listar auditorias no DynamoDB: {str(e)}", exc_info=True)
+            raise
 
     def delete_audit(self, hash_key, range_key):
         logger.info(f"Removendo auditoria {hash_key} ({range_key}) do DynamoDB")
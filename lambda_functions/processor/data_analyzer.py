@@ -1,26 +1,42 @@
-import boto3
 import os
+import random
 from dotenv import load_dotenv
 
+from lambda_functions.processor.detectors import SensitiveDataMatcher
+from lambda_functions.processor.file_readers import CsvSource
+from lambda_functions.processor.quick_scan import (
+    DEFAULT_CONFIDENCE, DEFAULT_K, DEFAULT_ROW_BUDGET, DEFAULT_SAMPLE_SIZE,
+    MODE_FIRST_K, MODE_FULL, MODE_SAMPLE, estimate_total, reservoir_sample, validate_mode
+)
+from lambda_functions.processor.s3_handler import S3Handler
+from lambda_functions.processor.tokenizer import get_tokenizer
+
+# Tamanho aproximado (em bytes) de cada bloco analisado entre dois checkpoints
+CHECKPOINT_CHUNK_BYTES = int(os.environ.get('CHECKPOINT_CHUNK_BYTES', str(1024 * 1024)))
+
+# Quantidade de faixas do arquivo (ou lotes da amostra, na leitura sequencial) cuja
+# variação dá o intervalo de confiança no modo sample
+SAMPLE_BATCHES = int(os.environ.get('SAMPLE_BATCHES', '10'))
+
 class DataAnalyzer:
     """Classe responsável pela análise de dados sensíveis."""
 
-    def __init__(self, stackspot_client):
-        """Inicializa o analisador de dados."""
+    def __init__(self, stackspot_client=None, tokenizer=None):
+        """Inicializa o analisador de dados.
+
+        Sem cliente StackSpot, usa o detector local (detectors.SensitiveDataMatcher).
+        Sem tokenizador, usa o configurado no ambiente (MASKING_MODE=token); se
+        não houver, os achados são mascarados pelo cliente.
+        """
         # Carregar variáveis de ambiente do arquivo .env
         load_dotenv()
 
-        self.stackspot_client = stackspot_client
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-            region_name=os.getenv('AWS_REGION', 'us-east-1')  # Padrão para 'us-east-1' se não for especificado
-        )
+        self.stackspot_client = stackspot_client or SensitiveDataMatcher()
+        self.tokenizer = tokenizer or get_tokenizer()
 
     def download_csv_from_s3(self, bucket_name, object_key, download_path):
-        """Faz o download de um arquivo CSV do S3."""
-        self.s3_client.download_file(bucket_name, object_key, download_path)
+        """Faz o download de um arquivo CSV do S3 (via S3Handler, com a mesma configuração de transferência)."""
+        S3Handler(bucket_name).download_file(object_key, download_path)
 
     def analyze_csv(self, bucket_name, object_key):
         """Analisa um arquivo CSV em busca de dados sensíveis.
@@ -42,15 +58,290 @@ class DataAnalyzer:
         results = self.stackspot_client.analyze_data(csv_data)
         return results
 
+    def analyze_csv_file(self, local_path, start_offset=0, partial_result=None,
+                         chunk_bytes=CHECKPOINT_CHUNK_BYTES, on_checkpoint=None,
+                         mode=MODE_FULL, k=DEFAULT_K, sample_size=DEFAULT_SAMPLE_SIZE,
+                         row_budget=DEFAULT_ROW_BUDGET, filename=None):
+        """Analisa um arquivo local em blocos, permitindo retomar a partir de um checkpoint.
+
+        O arquivo pode ser CSV/TSV (com ou sem gzip/zstd) ou Parquet; todos são lidos
+        como linhas CSV normalizadas (ver file_readers.CsvSource). Cada bloco é
+        formado por linhas completas e enviado à análise junto com o cabeçalho.
+        Após cada bloco, on_checkpoint recebe a posição da próxima linha a analisar
+        (offset em bytes no CSV simples, número de linhas nos demais formatos) e o
+        resultado acumulado até ali.
+
+        Achados com 'row' (linha dentro do bloco enviado, 1 = primeira linha de
+        dados) são renumerados para a linha no arquivo; 'rows_analyzed' acompanha
+        o resultado (e o checkpoint) para manter a numeração ao retomar.
+
+        No modo first_k a análise para na linha em que o total de achados atinge K
+        (os blocos crescem a partir de um registro, e a leitura não avança além do
+        bloco dessa linha); no modo sample apenas uma amostra das linhas é analisada
+        (ver analyze_csv_sample).
+
+        Args:
+            local_path: Caminho do arquivo local.
+            start_offset: Posição a partir da qual retomar; 0 inicia do começo.
+            partial_result: Resumo acumulado até start_offset (checkpoint anterior: 'summary'
+                e 'rows_analyzed'; 'sensitive_data' apenas se os achados forem retomados aqui).
+            chunk_bytes: Tamanho aproximado de cada bloco.
+            on_checkpoint: Callback (offset, resultado_parcial) chamado após cada bloco.
+            mode: Modo de análise ('full', 'first_k' ou 'sample').
+            k: Achados que encerram a análise no modo first_k.
+            sample_size: Tamanho da amostra no modo sample.
+            row_budget: Máximo de linhas lidas no modo sample.
+            filename: Nome usado para detectar o formato (padrão: local_path).
+
+        Returns:
+            dict: Resultados da análise ('sensitive_data', 'summary', 'rows_analyzed',
+                'mode' e 'complete').
+        """
+        mode = validate_mode(mode)
+        if mode == MODE_SAMPLE:
+            return self.analyze_csv_sample(local_path, sample_size, row_budget, filename=filename)
+
+        result = {
+            'sensitive_data': list((partial_result or {}).get('sensitive_data', [])),
+            'summary': dict((partial_result or {}).get('summary', {})),
+            'rows_analyzed': int((partial_result or {}).get('rows_analyzed', 0))
+        }
+
+        with CsvSource(local_path, filename) as source:
+            header = source.header
+            if start_offset:
+                source.seek(start_offset)
+
+            # No modo first_k os blocos começam com um registro e dobram a cada bloco
+            # (até chunk_bytes): a leitura passa no máximo do dobro das linhas necessárias
+            max_lines = 1 if mode == MODE_FIRST_K else None
+            while True:
+                lines = []
+                size = 0
+                while size < chunk_bytes and (max_lines is None or len(lines) < max_lines):
+                    line = source.readline()
+                    if not line:
+                        break
+                    lines.append(line)
+                    size += len(line)
+
+                if not lines:
+                    break
+
+                csv_data = (header + b''.join(lines)).decode('utf-8', errors='replace')
+                chunk_result = self.stackspot_client.analyze_data(csv_data)
+                if mode == MODE_FIRST_K:
+                    max_lines *= 2
+                    stop_row = self._first_k_row(chunk_result, k - sum(result['summary'].values()), len(lines))
+                    if stop_row is not None:
+                        # Para na linha do K-ésimo achado, como quick_scan.scan_rows
+                        if stop_row < len(lines):
+                            self._truncate_result(chunk_result, stop_row)
+                        self._offset_rows(chunk_result, result['rows_analyzed'])
+                        self._merge_results(result, chunk_result)
+                        result['rows_analyzed'] += stop_row
+                        result['complete'] = stop_row == len(lines) and not source.readline()
+                        break
+                self._offset_rows(chunk_result, result['rows_analyzed'])
+                self._merge_results(result, chunk_result)
+                result['rows_analyzed'] += len(lines)
+
+                # Os blocos iniciais do first_k são pequenos demais para um checkpoint
+                if on_checkpoint and (mode != MODE_FIRST_K or size >= chunk_bytes):
+                    on_checkpoint(source.position(), result)
+
+        result['mode'] = mode
+        result.setdefault('complete', True)
+        return result
+
+    def analyze_csv_sample(self, local_path, sample_size=DEFAULT_SAMPLE_SIZE, row_budget=DEFAULT_ROW_BUDGET,
+                           batches=SAMPLE_BATCHES, confidence=DEFAULT_CONFIDENCE, rng=None, filename=None):
+        """Estima os dados sensíveis de um CSV analisando apenas uma amostra de linhas.
+
+        No CSV simples (ver CsvSource.seek_record) o arquivo é dividido em 'batches'
+        faixas de bytes; de cada faixa são lidos até row_budget / batches registros a
+        partir do início, amostrados por reservatório e analisados como um lote. O
+        total de cada faixa é expandido pelos bytes lidos e a variação entre as faixas
+        fornece o intervalo de confiança (t de Student) do total do arquivo.
+
+        Nos demais formatos a leitura é sequencial: se row_budget interromper a
+        leitura, a estimativa cobre apenas os registros lidos (escopo 'prefix',
+        sem intervalo).
+
+        Args:
+            local_path: Caminho do arquivo local (qualquer formato aceito).
+            sample_size: Quantidade de linhas amostradas.
+            row_budget: Máximo de linhas lidas do arquivo.
+            batches: Quantidade de faixas (ou lotes, na leitura sequencial) analisadas.
+            confidence: Nível de confiança do intervalo.
+            rng: Gerador de números aleatórios (random.Random).
+            filename: Nome usado para detectar o formato (padrão: local_path).
+
+        Returns:
+            dict: 'summary' estimado por tipo, 'estimate' com o intervalo do total,
+                'scope' ('file' ou 'prefix') e 'sensitive_data' encontrados na amostra.
+        """
+        rng = rng or random.Random()
+        batches = max(1, batches)
+        with CsvSource(local_path, filename) as source:
+            header = source.header
+            by_window = source.seekable and bool(row_budget)
+            if by_window:
+                strata, seen, complete = self._sample_windows(source, sample_size, row_budget, batches, rng)
+            else:
+                sample, seen, complete = reservoir_sample(source, sample_size, row_budget, rng)
+                # Leitura sequencial: cada lote representa a sua parte das linhas lidas
+                batch_size = max(1, -(-len(sample) // batches))
+                strata = [(sample[start:start + batch_size], len(sample[start:start + batch_size]) * seen / len(sample))
+                          for start in range(0, len(sample), batch_size)]
+
+        result = {'sensitive_data': [], 'summary': {}}
+        summary = {}
+        stratum_totals = []
+        for lines, rows in strata:
+            if not lines:
+                stratum_totals.append(0.0)
+                continue
+            chunk_result = self.stackspot_client.analyze_data((header + b''.join(lines)).decode('utf-8', errors='replace'))
+            self._merge_results(result, chunk_result)
+            scale = rows / len(lines)
+            for data_type, count in chunk_result.get('summary', {}).items():
+                summary[data_type] = summary.get(data_type, 0) + count * scale
+            stratum_totals.append(sum(chunk_result.get('summary', {}).values()) * scale)
+        result['summary'] = {data_type: round(count) for data_type, count in summary.items()}
+
+        sampled = sum(len(lines) for lines, _ in strata)
+        population = sum(rows for _, rows in strata)
+        exact = complete and sampled == seen
+        if exact or len(stratum_totals) < 2:
+            total = sum(result['summary'].values())
+            estimate = {'estimate': total, 'lower': total, 'upper': total}
+        else:
+            # O total de cada faixa (ou lote) vezes a quantidade de faixas é uma réplica
+            # da estimativa do total: a dispersão entre as réplicas dá o erro padrão
+            estimate = estimate_total(stratum_totals, len(stratum_totals), confidence, finite_population=False)
+        scope = 'file' if complete or by_window else 'prefix'
+        if scope == 'prefix':
+            estimate['lower'] = estimate['upper'] = None
+        estimate['confidence'] = confidence
+
+        result.update({
+            'mode': MODE_SAMPLE,
+            'scope': scope,
+            'complete': exact,
+            'sample_size': sampled,
+            'rows_scanned': seen,
+            'estimated_rows': round(population),
+            'estimate': estimate
+        })
+        return result
+
+    @staticmethod
+    def _sample_windows(source, sample_size, row_budget, windows, rng):
+        """
+        Amostra registros de 'windows' faixas de bytes do CSV simples.
+
+        De cada faixa são lidos, a partir do início, até row_budget / windows
+        registros, amostrados por reservatório (sample_size / windows por faixa).
+
+        Args:
+            source (CsvSource): Fonte com seek_record
+            sample_size (int): Tamanho total da amostra
+            row_budget (int): Máximo de registros lidos (dividido entre as faixas)
+            windows (int): Quantidade de faixas
+            rng (random.Random): Gerador de números aleatórios
+
+        Returns:
+            tuple: (lista de (amostra, registros estimados na faixa), registros lidos,
+                True se todas as faixas foram lidas por inteiro)
+        """
+        data_start, size = source.data_range
+        span = (size - data_start) / windows
+        per_window = max(1, row_budget // windows)
+        per_sample = max(1, -(-sample_size // windows))
+        strata = []
+        seen = 0
+        complete = True
+        for index in range(windows):
+            end = data_start + round((index + 1) * span)
+            source.seek_record(data_start + round(index * span))
+            begin = source.position()
+
+            def records():
+                for _ in range(per_window):
+                    if source.position() >= end:
+                        return
+                    line = source.readline()
+                    if not line:
+                        return
+                    yield line
+
+            sample, read, _ = reservoir_sample(records(), per_sample, rng=rng)
+            seen += read
+            covered = source.position() - begin
+            if read and source.position() < end:
+                # Faixa lida em parte: expande a contagem pelos bytes da faixa
+                complete = False
+                strata.append((sample, read * (end - begin) / covered))
+            else:
+                strata.append((sample, float(read)))
+        return strata, seen, complete
+
+    @staticmethod
+    def _first_k_row(chunk_result, remaining, block_rows):
+        """
+        Linha do bloco em que o total de achados atinge 'remaining' (None se não atingir).
+
+        Se algum achado não indicar a linha (backend externo), considera o bloco inteiro.
+        """
+        if sum(chunk_result.get('summary', {}).values()) < remaining:
+            return None
+        findings = chunk_result.get('sensitive_data', [])
+        rows = sorted(int(finding['row']) for finding in findings
+                      if isinstance(finding, dict) and finding.get('row') is not None)
+        if len(rows) < len(findings) or len(rows) < remaining:
+            return block_rows
+        return rows[max(remaining, 1) - 1]
+
+    @staticmethod
+    def _truncate_result(chunk_result, stop_row):
+        """Descarta os achados posteriores à linha stop_row do bloco."""
+        kept = [finding for finding in chunk_result.get('sensitive_data', [])
+                if int(finding['row']) <= stop_row]
+        summary = {}
+        for finding in kept:
+            summary[finding['type']] = summary.get(finding['type'], 0) + 1
+        chunk_result['sensitive_data'] = kept
+        chunk_result['summary'] = summary
+
+    @staticmethod
+    def _offset_rows(chunk_result, rows_before):
+        """Renumera 'row' dos achados do bloco para a linha no arquivo."""
+        for finding in chunk_result.get('sensitive_data', []):
+            if isinstance(finding, dict) and finding.get('row') is not None:
+                finding['row'] = rows_before + int(finding['row'])
+
+    @staticmethod
+    def _merge_results(result, chunk_result):
+        """Acumula o resultado de um bloco no resultado total."""
+        result['sensitive_data'].extend(chunk_result.get('sensitive_data', []))
+        for data_type, count in chunk_result.get('summary', {}).items():
+            result['summary'][data_type] = result['summary'].get(data_type, 0) + count
+
     def mask_sensitive_data(self, data):
         """Mascara dados sensíveis para exibição segura.
 
+        Com tokenizador, cada valor vira um token determinístico (o mesmo valor
+        gera o mesmo token em qualquer arquivo).
+
         Args:
             data: Dados sensíveis a serem mascarados.
 
         Returns:
             dict: Dados mascarados.
         """
+        if self.tokenizer:
+            return self.tokenizer.tokenize_findings(data)
         # Supondo que stackspot_client tem um método mask_data
         masked_data = self.stackspot_client.mask_data(data)
         return masked_data
\ No newline at end of file
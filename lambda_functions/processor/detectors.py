@@ -0,0 +1,290 @@
+"""
+Detecção local de dados sensíveis para o Data Sentinel.
+
+Em vez de rodar uma expressão regular por tipo sobre cada linha, os detectores
+são compilados em uma única alternância com grupos nomeados por formato:
+e-mail, sequência numérica e endereço. Cada linha é percorrida uma só vez; as
+sequências numéricas candidatas são então classificadas (CPF, cartão de
+crédito, telefone ou RG), e os validadores de dígito verificador (CPF
+módulo 11 e Luhn) rodam apenas sobre esses candidatos.
+
+Nomes completos não têm um formato que uma expressão regular reconheça sem
+muitos falsos positivos; continuam dependendo do StackSpot IA.
+
+scripts/benchmark_detectors.py compara a vazão com a abordagem de uma
+expressão por tipo (DETECTOR_PATTERNS).
+"""
+
+import bisect
+import csv
+import io
+import os
+import re
+
+from lambda_functions.notifier.utils.logger import setup_logger
+
+# Configuração de logging
+logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
+
+# Padrão de cada tipo isoladamente (referência e classificação dos candidatos numéricos)
+DETECTOR_PATTERNS = {
+    'email': r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}",
+    'cpf': r"(?<![\d.])(?:\d{3}\.\d{3}\.\d{3}-\d{2}|\d{11})(?![\d-])",
+    'rg': r"(?<![\d.])\d{1,2}\.\d{3}\.\d{3}-[\dXx](?![\w-])",
+    'cartao_credito': r"(?<!\d)\d{4}(?:[ -]?\d{4}){2}[ -]?\d{1,7}(?!\d)",
+    'telefone': r"(?<![\d+])(?:(?:\+55\s?)?(?:\(\d{2}\)\s?|\d{2}\s)?9?\d{4}-\d{4}|[1-9]{2}9\d{8})(?!\d)",
+    'endereco': r"(?:[Rr]ua|[Aa]v(?:enida|\.)|[Tt]ravessa|[Aa]lameda|[Rr]odovia|[Ee]strada|[Pp]raça)\s+"
+                r"[^;,\n\d]{2,60},?\s*(?:n[º°o.]?\s*)?\d{1,5}\b",
+}
+
+# Alternância combinada: um grupo por formato; 'numero' cobre CPF, RG, cartão e telefone
+COMBINED_PATTERNS = {
+    'email': DETECTOR_PATTERNS['email'],
+    'numero': r"[\d(+][\d .()+\-]*[\dXx]",
+    'endereco': DETECTOR_PATTERNS['endereco'],
+}
+
+NUMERIC_TYPES = ('cpf', 'rg', 'cartao_credito', 'telefone')
+MASK_CHAR = '*'
+
+_NON_DIGITS = str.maketrans('', '', ' .()+-xX')
+_FULL_PATTERNS = {data_type: re.compile(DETECTOR_PATTERNS[data_type]) for data_type in NUMERIC_TYPES}
+
+def cpf_valid(value):
+    """
+    Valida os dígitos verificadores de um CPF (módulo 11).
+
+    Args:
+        value (str): CPF com ou sem pontuação
+
+    Returns:
+        bool: True se o CPF é válido
+    """
+    digits = [int(char) for char in value if char.isdigit()]
+    if len(digits) != 11 or len(set(digits)) == 1:
+        return False
+    for size in (9, 10):
+        total = sum(digit * weight for digit, weight in zip(digits[:size], range(size + 1, 1, -1)))
+        if (total * 10) % 11 % 10 != digits[size]:
+            return False
+    return True
+
+def luhn_valid(value):
+    """
+    Valida um número de cartão pelo algoritmo de Luhn.
+
+    Args:
+        value (str): Número com ou sem separadores
+
+    Returns:
+        bool: True se o número tem de 13 a 19 dígitos e passa no Luhn
+    """
+    digits = [int(char) for char in value if char.isdigit()]
+    if not 13 <= len(digits) <= 19:
+        return False
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        if position % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+# Validadores de dígito verificador por tipo
+TYPE_VALIDATORS = {
+    'cpf': cpf_valid,
+    'cartao_credito': luhn_valid,
+}
+
+def classify_number(value):
+    """
+    Classifica uma sequência numérica candidata.
+
+    O total de dígitos escolhe os tipos possíveis; o formato é confirmado pelo
+    padrão do tipo e, para CPF e cartão, pelo dígito verificador.
+
+    Args:
+        value (str): Candidato encontrado pelo grupo 'numero'
+
+    Returns:
+        str: Tipo do dado, ou None se não for um dado sensível
+    """
+    size = len(value.translate(_NON_DIGITS))
+    if size < 8:
+        return None
+    if size == 11 and _FULL_PATTERNS['cpf'].fullmatch(value) and cpf_valid(value):
+        return 'cpf'
+    if 13 <= size <= 19 and _FULL_PATTERNS['cartao_credito'].fullmatch(value) and luhn_valid(value):
+        return 'cartao_credito'
+    if _FULL_PATTERNS['telefone'].fullmatch(value):
+        return 'telefone'
+    if size <= 9 and _FULL_PATTERNS['rg'].fullmatch(value):
+        return 'rg'
+    return None
+
+# Classificadores aplicados aos candidatos de cada grupo (grupos ausentes são aceitos como estão)
+VALIDATORS = {
+    'numero': classify_number,
+}
+
+def compile_patterns(patterns=COMBINED_PATTERNS):
+    """
+    Compila os padrões em uma única alternância com grupos nomeados.
+
+    Args:
+        patterns (dict): grupo -> expressão regular (sem grupos nomeados)
+
+    Returns:
+        re.Pattern: Expressão combinada; match.lastgroup indica o grupo
+    """
+    return re.compile('|'.join(f"(?P<{name}>{pattern})" for name, pattern in patterns.items()))
+
+class SensitiveDataMatcher:
+    """Detector local com a mesma interface (analyze_data/mask_data) do cliente StackSpot."""
+
+    def __init__(self, patterns=COMBINED_PATTERNS, validators=VALIDATORS, delimiter=';'):
+        """
+        Inicializa o detector.
+
+        Args:
+            patterns (dict): grupo -> expressão regular
+            validators (dict): grupo -> função que recebe o candidato e devolve o
+                tipo confirmado (ou None para descartá-lo)
+            delimiter (str): Delimitador das linhas CSV analisadas
+        """
+        self.regex = compile_patterns(patterns)
+        self.validators = validators
+        self.delimiter = delimiter
+
+    def iter_matches(self, text):
+        """
+        Percorre o texto uma vez e devolve os dados sensíveis confirmados.
+
+        Args:
+            text (str): Texto (célula ou linha) a analisar
+
+        Yields:
+            tuple: (tipo, valor, início, fim)
+        """
+        for match in self.regex.finditer(text):
+            data_type = match.lastgroup
+            value = match.group()
+            validator = self.validators.get(data_type)
+            if validator is None:
+                yield data_type, value, match.start(), match.end()
+                continue
+            data_type = validator(value)
+            if data_type is not None:
+                yield data_type, value, match.start(), match.end()
+            elif ' ' in value:
+                # Candidato que junta mais de um valor (ex.: "123 - 11 98765-4321"):
+                # procura cada tipo numérico dentro dele
+                yield from self._split_candidate(value, match.start())
+
+    @staticmethod
+    def _split_candidate(value, offset):
+        for data_type in NUMERIC_TYPES:
+            validator = TYPE_VALIDATORS.get(data_type)
+            for match in _FULL_PATTERNS[data_type].finditer(value):
+                if validator is None or validator(match.group()):
+                    yield data_type, match.group(), offset + match.start(), offset + match.end()
+
+    def scan_line(self, line, header=None):
+        """
+        Analisa uma linha CSV inteira com uma única passada da expressão combinada.
+
+        A coluna de cada achado é obtida pela posição do delimitador mais próximo
+        (aproximada quando há delimitadores entre aspas).
+
+        Args:
+            line (str): Linha CSV
+            header (list, optional): Nomes das colunas
+
+        Returns:
+            list: Achados ({'type', 'value', 'column'})
+        """
+        findings = []
+        separators = None
+        for data_type, value, start, _ in self.iter_matches(line):
+            if separators is None:
+                separators = [position for position, char in enumerate(line) if char == self.delimiter]
+            column = bisect.bisect_left(separators, start)
+            if header and column < len(header):
+                column = header[column]
+            findings.append({'type': data_type, 'value': value, 'column': column})
+        return findings
+
+    def scan_record(self, cells, header=None):
+        """
+        Analisa um registro CSV já separado em células, com uma única passada da
+        expressão combinada sobre as células unidas pelo delimitador.
+
+        A coluna de cada achado vem da posição exata das células (delimitadores e
+        quebras de linha dentro de campos entre aspas não a deslocam).
+
+        Args:
+            cells (list): Células do registro
+            header (list, optional): Nomes das colunas
+
+        Returns:
+            list: Achados ({'type', 'value', 'column'})
+        """
+        text = self.delimiter.join(cells)
+        findings = []
+        ends = None
+        for data_type, value, start, _ in self.iter_matches(text):
+            if ends is None:
+                ends = []
+                position = 0
+                for cell in cells:
+                    position += len(cell)
+                    ends.append(position)
+                    position += len(self.delimiter)
+            column = bisect.bisect_left(ends, start + 1)
+            if header and column < len(header):
+                column = header[column]
+            findings.append({'type': data_type, 'value': value, 'column': column})
+        return findings
+
+    def analyze_data(self, csv_data):
+        """
+        Analisa um bloco CSV (cabeçalho + registros) em busca de dados sensíveis.
+
+        O bloco é lido com o módulo csv: um campo entre aspas com quebra de linha
+        pertence a um único registro, numerado como os registros do CsvSource.
+
+        Args:
+            csv_data (str): Conteúdo CSV com cabeçalho
+
+        Returns:
+            dict: 'sensitive_data' (com 'row', 1 = primeiro registro de dados) e 'summary'
+        """
+        records = csv.reader(io.StringIO(csv_data, newline=''), delimiter=self.delimiter)
+        header = [name.strip() for name in next(records, [])]
+        sensitive_data = []
+        summary = {}
+        for row, cells in enumerate(records, start=1):
+            for finding in self.scan_record(cells, header):
+                finding['row'] = row
+                sensitive_data.append(finding)
+                summary[finding['type']] = summary.get(finding['type'], 0) + 1
+        return {'sensitive_data': sensitive_data, 'summary': summary}
+
+    def mask_data(self, data):
+        """
+        Mascara os valores dos achados, mantendo apenas os dois últimos caracteres.
+
+        Args:
+            data (list): Achados devolvidos por analyze_data
+
+        Returns:
+            list: Achados com 'value' mascarado
+        """
+        masked = []
+        for finding in data:
+            finding = dict(finding)
+            value = str(finding.get('value', ''))
+            finding['value'] = MASK_CHAR * max(0, len(value) - 2) + value[-2:]
+            masked.append(finding)
+        return masked
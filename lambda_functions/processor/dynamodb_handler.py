@@ -1,3 +1,5 @@
+import base64
+import copy
 import boto3
 import os
 import json
@@ -6,7 +8,9 @@ from decimal import Decimal
 from datetime import datetime
 from dotenv import load_dotenv
 from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import Binary
 from lambda_functions.notifier.utils.logger import setup_logger
+from lambda_functions.processor.retention import with_ttl
 
 load_dotenv()
 logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
@@ -14,7 +18,10 @@ logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
 class DecimalEncoder(json.JSONEncoder):
     def default(self, o):
         if isinstance(o, Decimal):
-            return float(o)
+            return int(o) if o % 1 == 0 else float(o)
+        if isinstance(o, Binary):
+            # Atributos binários (ex.: achados codificados) seguem em base64
+            return base64.b64encode(o.value).decode('ascii')
         return super(DecimalEncoder, self).default(o)
 
 class DynamoDBHandler:
@@ -31,7 +38,7 @@ class DynamoDBHandler:
         """Salva os resultados da auditoria no DynamoDB."""
         logger.info(f"Salvando resultados da auditoria {audit_data.get('audit_id')} no DynamoDB")
         try:
-            item = json.loads(json.dumps(audit_data), parse_float=Decimal)
+            item = json.loads(json.dumps(with_ttl(dict(audit_data))), parse_float=Decimal)
             self.table.put_item(Item=item)
             logger.info("Resultados da auditoria salvos com sucesso")
             return audit_data.get('audit_id')
@@ -39,8 +46,63 @@ class DynamoDBHandler:
             logger.error(f"Erro ao salvar resultados da auditoria no DynamoDB: {str(e)}", exc_info=True)
             raise
 
-    def update_audit_status(self, audit_id, status, timestamp=None):
-        """Atualiza o status de uma auditoria."""
+    def create_audit_if_absent(self, audit_data):
+        """Cria o registro da auditoria apenas se ele ainda não existir.
+
+        Returns:
+            bool: True se o registro foi criado, False se já existia
+        """
+        logger.info(f"Registrando auditoria {audit_data.get('audit_id')} no DynamoDB")
+        try:
+            item = json.loads(json.dumps(with_ttl(dict(audit_data))), parse_float=Decimal)
+            self.table.put_item(
+                Item=item,
+                ConditionExpression='attribute_not_exists(audit_id)'
+            )
+            logger.info("Auditoria registrada com sucesso")
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.info(f"Auditoria {audit_data.get('audit_id')} já registrada")
+                return False
+            logger.error(f"Erro ao registrar auditoria no DynamoDB: {str(e)}", exc_info=True)
+            raise
+
+    def get_audit(self, audit_id, timestamp=None):
+        """Obtém uma auditoria com leitura fortemente consistente."""
+        logger.info(f"Obtendo auditoria {audit_id} do DynamoDB")
+        try:
+            key = {'audit_id': audit_id}
+            if timestamp:
+                key['timestamp'] = timestamp
+            response = self.table.get_item(Key=key, ConsistentRead=True)
+            if 'Item' not in response:
+                return None
+            return json.loads(json.dumps(response['Item'], cls=DecimalEncoder))
+        except ClientError as e:
+            logger.error(f"Erro ao obter auditoria do DynamoDB: {str(e)}", exc_info=True)
+            raise
+
+    def update_audit_status(self, audit_id, status, timestamp=None, expected_status=None,
+                            extra_attributes=None, remove_attributes=None, lease_expired_before=None,
+                            lease_token=None):
+        """Atualiza o status de uma auditoria.
+
+        Args:
+            audit_id (str): ID da auditoria
+            status (str): Novo status
+            timestamp (str, optional): Chave de ordenação da auditoria
+            expected_status (list, optional): Status de origem aceitos (escrita condicional)
+            extra_attributes (dict, optional): Atributos gravados junto com o status
+            remove_attributes (list, optional): Atributos removidos do item
+            lease_expired_before (float, optional): Se informado, PROCESSING só é aceito
+                como origem quando o lease atual expirou antes desse instante (epoch)
+            lease_token (str, optional): Se informado, a escrita só é aceita enquanto o
+                item guardar esse token (a tentativa que o gravou ainda detém o lease)
+
+        Returns:
+            bool: True se atualizado, False se a condição de estado não foi satisfeita
+        """
         logger.info(f"Atualizando status da auditoria {audit_id} para {status}")
         try:
             key = {'audit_id': audit_id}
@@ -52,18 +114,70 @@ class DynamoDBHandler:
                 ':status': status,
                 ':updated_at': Decimal(str(datetime.utcnow().timestamp()))
             }
-            self.table.update_item(
-                Key=key,
-                UpdateExpression=update_expression,
-                ExpressionAttributeNames=expression_attribute_names,
-                ExpressionAttributeValues=expression_attribute_values
-            )
+            for index, (name, value) in enumerate((extra_attributes or {}).items()):
+                expression_attribute_names[f'#a{index}'] = name
+                if isinstance(value, (bytes, bytearray)):
+                    expression_attribute_values[f':a{index}'] = bytes(value)
+                else:
+                    expression_attribute_values[f':a{index}'] = json.loads(json.dumps(value), parse_float=Decimal)
+                update_expression += f", #a{index} = :a{index}"
+            if remove_attributes:
+                for index, name in enumerate(remove_attributes):
+                    expression_attribute_names[f'#r{index}'] = name
+                update_expression += " REMOVE " + ", ".join(f'#r{index}' for index in range(len(remove_attributes)))
+
+            params = {
+                'Key': key,
+                'UpdateExpression': update_expression,
+                'ExpressionAttributeNames': expression_attribute_names,
+                'ExpressionAttributeValues': expression_attribute_values
+            }
+            if expected_status:
+                conditions = []
+                for index, expected in enumerate(expected_status):
+                    expression_attribute_values[f':e{index}'] = expected
+                    if expected == 'PROCESSING' and lease_expired_before is not None:
+                        expression_attribute_values[':lease_now'] = Decimal(str(lease_expired_before))
+                        conditions.append(f"(#status = :e{index} AND lease_expires_at < :lease_now)")
+                    else:
+                        conditions.append(f"#status = :e{index}")
+                params['ConditionExpression'] = "attribute_exists(audit_id) AND (" + " OR ".join(conditions) + ")"
+            if lease_token is not None:
+                expression_attribute_values[':lease_token'] = lease_token
+                params['ConditionExpression'] = (params.get('ConditionExpression', 'attribute_exists(audit_id)')
+                                                 + " AND lease_token = :lease_token")
+
+            self.table.update_item(**params)
             logger.info("Status da auditoria atualizado com sucesso")
             return True
         except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.warning(f"Transição da auditoria {audit_id} para {status} rejeitada pelo estado atual")
+                return False
             logger.error(f"Erro ao atualizar status da auditoria no DynamoDB: {str(e)}", exc_info=True)
             raise
 
+    def save_checkpoint(self, audit_id, timestamp, offset, partial_result, lease_expires_at, lease_token=None):
+        """Grava o progresso parcial da análise e renova o lease da tentativa atual.
+
+        Returns:
+            bool: True se gravado, False se a auditoria não está mais em PROCESSING
+                ou o lease passou a outra tentativa (lease_token diferente)
+        """
+        logger.info(f"Gravando checkpoint da auditoria {audit_id} no offset {offset}")
+        return self.update_audit_status(
+            audit_id,
+            'PROCESSING',
+            timestamp=timestamp,
+            expected_status=['PROCESSING'],
+            extra_attributes={
+                'checkpoint_offset': offset,
+                'checkpoint_result': partial_result,
+                'lease_expires_at': lease_expires_at
+            },
+            lease_token=lease_token
+        )
+
     def list_audits_by_requester(self, requester_email, limit=10):
         """Lista auditorias por solicitante."""
         logger.info(f"Listando auditorias para o solicitante {requester_email}")
@@ -79,4 +193,88 @@ class DynamoDBHandler:
             return items
         except ClientError as e:
             logger.error(f"Erro ao listar auditorias no DynamoDB: {str(e)}", exc_info=True)
-            raise
\ No newline at end of file
+            raise
+
+class LocalDynamoDBHandler:
+    """Substituto local do DynamoDBHandler que guarda as auditorias em memória (testes e execução offline).
+
+    Reproduz as escritas condicionais (criação única, transições de status e lease)
+    do DynamoDBHandler.
+    """
+
+    def __init__(self, table_name='local'):
+        self.table_name = table_name
+        self.items = {}
+
+    @staticmethod
+    def _normalize(value):
+        # Mesmos tipos devolvidos pelo DynamoDBHandler (números e listas via JSON); binários preservados
+        if isinstance(value, (bytes, bytearray)):
+            return bytes(value)
+        return json.loads(json.dumps(value, cls=DecimalEncoder))
+
+    def _find(self, audit_id, timestamp=None):
+        if timestamp:
+            return self.items.get((audit_id, timestamp))
+        return next((item for (key, _), item in self.items.items() if key == audit_id), None)
+
+    def save_audit_result(self, audit_data):
+        item = {name: self._normalize(value) for name, value in with_ttl(dict(audit_data)).items()}
+        self.items[(item['audit_id'], item.get('timestamp'))] = item
+        return audit_data.get('audit_id')
+
+    def create_audit_if_absent(self, audit_data):
+        if self._find(audit_data['audit_id'], audit_data.get('timestamp')) is not None:
+            logger.info(f"Auditoria {audit_data.get('audit_id')} já registrada")
+            return False
+        self.save_audit_result(audit_data)
+        return True
+
+    def get_audit(self, audit_id, timestamp=None):
+        item = self._find(audit_id, timestamp)
+        return copy.deepcopy(item) if item is not None else None
+
+    def update_audit_status(self, audit_id, status, timestamp=None, expected_status=None,
+                            extra_attributes=None, remove_attributes=None, lease_expired_before=None,
+                            lease_token=None):
+        item = self._find(audit_id, timestamp)
+        if item is None and (expected_status or lease_token is not None):
+            return False
+        if expected_status or lease_token is not None:
+            current = item.get('status')
+            accepted = not expected_status or current in expected_status
+            if accepted and expected_status and current == 'PROCESSING' and lease_expired_before is not None:
+                accepted = item.get('lease_expires_at', 0) < lease_expired_before
+            if accepted and lease_token is not None:
+                accepted = item.get('lease_token') == lease_token
+            if not accepted:
+                logger.warning(f"Transição da auditoria {audit_id} para {status} rejeitada pelo estado atual")
+                return False
+        if item is None:
+            item = self.items[(audit_id, timestamp)] = {'audit_id': audit_id, 'timestamp': timestamp}
+        item['status'] = status
+        item['updated_at'] = datetime.utcnow().timestamp()
+        for name, value in (extra_attributes or {}).items():
+            item[name] = self._normalize(value)
+        for name in remove_attributes or []:
+            item.pop(name, None)
+        return True
+
+    def save_checkpoint(self, audit_id, timestamp, offset, partial_result, lease_expires_at, lease_token=None):
+        return self.update_audit_status(
+            audit_id,
+            'PROCESSING',
+            timestamp=timestamp,
+            expected_status=['PROCESSING'],
+            extra_attributes={
+                'checkpoint_offset': offset,
+                'checkpoint_result': partial_result,
+                'lease_expires_at': lease_expires_at
+            },
+            lease_token=lease_token
+        )
+
+    def list_audits_by_requester(self, requester_email, limit=10):
+        items = sorted((item for item in self.items.values() if item.get('requester_email') == requester_email),
+                       key=lambda item: item.get('timestamp') or '', reverse=True)
+        return copy.deepcopy(items[:limit])
@@ -0,0 +1,394 @@
+"""
+Leitura de arquivos de entrada em vários formatos para o Data Sentinel.
+
+Formatos aceitos: CSV e TSV (opcionalmente comprimidos com gzip ou zstd) e
+Parquet. A descompressão é feita em streaming, sem gerar o arquivo
+descomprimido; o delimitador e a codificação são detectados a partir de uma
+amostra do início do arquivo. No Parquet apenas as colunas candidatas a dados
+sensíveis são lidas.
+
+Todos os formatos são expostos como linhas CSV normalizadas (UTF-8, ';'),
+a mesma entrada usada pela análise de arquivos CSV.
+"""
+
+import codecs
+import csv
+import gzip
+import io
+import os
+
+CSV = 'csv'
+TSV = 'tsv'
+PARQUET = 'parquet'
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+COMPRESSION_EXTENSIONS = {'.gz': GZIP, '.gzip': GZIP, '.zst': ZSTD, '.zstd': ZSTD}
+FORMAT_EXTENSIONS = {'.csv': CSV, '.tsv': TSV, '.parquet': PARQUET}
+SUPPORTED_EXTENSIONS = ('.csv', '.tsv', '.csv.gz', '.tsv.gz', '.csv.zst', '.tsv.zst', '.parquet')
+
+OUTPUT_DELIMITER = ';'
+SNIFF_BYTES = 64 * 1024
+SNIFF_DELIMITERS = ';,\t|'
+
+# Colunas lidas do Parquet (nomes comparados em minúsculas)
+SENSITIVE_COLUMNS = {'cpf', 'email', 'cartao', 'cartao_credito', 'telefone', 'rg', 'endereco', 'nome', 'nome_completo'}
+
+def detect_format(filename):
+    """
+    Identifica o formato e a compressão a partir do nome do arquivo.
+
+    Args:
+        filename (str): Nome (ou chave S3) do arquivo
+
+    Returns:
+        tuple: (formato, compressão ou None)
+
+    Raises:
+        ValueError: Se o formato não for suportado
+    """
+    name = filename.lower()
+    root, extension = os.path.splitext(name)
+    compression = COMPRESSION_EXTENSIONS.get(extension)
+    if compression:
+        root, extension = os.path.splitext(root)
+
+    file_format = FORMAT_EXTENSIONS.get(extension)
+    if file_format is None or (file_format == PARQUET and compression):
+        raise ValueError(f"Formato de arquivo não suportado. Use: {', '.join(SUPPORTED_EXTENSIONS)}")
+    return file_format, compression
+
+def is_supported(filename):
+    """Retorna True se o arquivo está em um dos formatos aceitos."""
+    try:
+        detect_format(filename)
+        return True
+    except ValueError:
+        return False
+
+def is_plain_text(filename):
+    """Retorna True para CSV/TSV sem compressão."""
+    file_format, compression = detect_format(filename)
+    return file_format in (CSV, TSV) and compression is None
+
+def decompress_stream(fileobj, compression):
+    """
+    Envolve um stream binário com a descompressão em streaming.
+
+    Args:
+        fileobj: Stream binário de entrada
+        compression (str): 'gzip', 'zstd' ou None
+
+    Returns:
+        Stream binário descomprimido
+    """
+    if compression == GZIP:
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if compression == ZSTD:
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ValueError("Arquivos .zst exigem o pacote 'zstandard'") from e
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+    return fileobj
+
+def sniff_encoding(sample):
+    """
+    Detecta a codificação de uma amostra de bytes (UTF-8 com/sem BOM ou Latin-1).
+
+    Args:
+        sample (bytes): Início do arquivo
+
+    Returns:
+        str: Nome da codificação
+    """
+    if sample.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    try:
+        # final=False tolera um caractere multibyte cortado no fim da amostra
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+def sniff_delimiter(sample_text, default=OUTPUT_DELIMITER):
+    """
+    Detecta o delimitador de um CSV a partir de uma amostra de texto.
+
+    Args:
+        sample_text (str): Início do arquivo
+        default (str): Delimitador usado se a detecção falhar
+
+    Returns:
+        str: Delimitador
+    """
+    lines = sample_text.splitlines()
+    if len(lines) > 1 and not sample_text.endswith(('\n', '\r')):
+        lines = lines[:-1]  # descarta a última linha, possivelmente incompleta
+    try:
+        return csv.Sniffer().sniff('\n'.join(lines[:50]), delimiters=SNIFF_DELIMITERS).delimiter
+    except csv.Error:
+        return default
+
+class _PrefixedStream(io.RawIOBase):
+    """Stream que devolve primeiro os bytes já lidos (amostra) e depois o restante."""
+
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def open_text(fileobj, filename):
+    """
+    Abre um CSV/TSV (comprimido ou não) como texto, detectando codificação e delimitador.
+
+    Args:
+        fileobj: Stream binário do arquivo
+        filename (str): Nome do arquivo (define formato e compressão)
+
+    Returns:
+        tuple: (stream de texto, delimitador, codificação)
+    """
+    file_format, compression = detect_format(filename)
+    if file_format == PARQUET:
+        raise ValueError("Arquivos Parquet não podem ser lidos como texto")
+
+    stream = decompress_stream(fileobj, compression)
+    sample = stream.read(SNIFF_BYTES)
+    encoding = sniff_encoding(sample)
+    default = '\t' if file_format == TSV else OUTPUT_DELIMITER
+    delimiter = sniff_delimiter(sample.decode(encoding, errors='ignore'), default)
+
+    buffered = io.BufferedReader(_PrefixedStream(sample, stream), buffer_size=SNIFF_BYTES)
+    # A codificação vem da amostra inicial: bytes inválidos adiante são substituídos, sem erro
+    text = io.TextIOWrapper(buffered, encoding=encoding, errors='replace', newline='')
+    return text, delimiter, encoding
+
+def _parquet_columns(schema_names, columns=None):
+    """Seleciona as colunas do Parquet a ler (candidatas a dados sensíveis)."""
+    wanted = {c.lower() for c in (columns or SENSITIVE_COLUMNS)}
+    return [name for name in schema_names if name.lower() in wanted]
+
+def iter_parquet_rows(fileobj, columns=None, batch_size=10000):
+    """
+    Lê um Parquet em lotes, apenas com as colunas candidatas.
+
+    Args:
+        fileobj: Arquivo Parquet (caminho ou stream com seek)
+        columns (iterable, optional): Colunas a ler (padrão: SENSITIVE_COLUMNS)
+        batch_size (int): Linhas por lote
+
+    Yields:
+        dict: Linha com os valores convertidos para texto
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ValueError("Arquivos Parquet exigem o pacote 'pyarrow'") from e
+
+    parquet_file = pq.ParquetFile(fileobj)
+    selected = _parquet_columns(parquet_file.schema_arrow.names, columns)
+    if not selected:
+        return
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=selected):
+        for row in batch.to_pylist():
+            yield {key: '' if value is None else str(value) for key, value in row.items()}
+
+def iter_rows(fileobj, filename, columns=None):
+    """
+    Itera as linhas de um arquivo em qualquer formato aceito como dicionários.
+
+    Args:
+        fileobj: Stream binário do arquivo (com seek, no caso do Parquet)
+        filename (str): Nome do arquivo
+        columns (iterable, optional): Colunas lidas do Parquet
+
+    Yields:
+        dict: Linha do arquivo
+    """
+    file_format, _ = detect_format(filename)
+    if file_format == PARQUET:
+        yield from iter_parquet_rows(fileobj, columns)
+        return
+
+    text, delimiter, _ = open_text(fileobj, filename)
+    yield from csv.DictReader(text, delimiter=delimiter)
+
+class CsvSource:
+    """
+    Fonte de linhas CSV normalizadas (UTF-8, ';') de um arquivo em qualquer formato.
+
+    O arquivo pode ser um caminho local ou um stream binário com seek (ex.:
+    io.BytesIO baixado do S3 em memória); streams não são fechados pela fonte.
+
+    Para CSV UTF-8 já delimitado por ';' e sem compressão, as linhas são lidas
+    diretamente e a posição é o offset em bytes (retomada com seek). Nos demais
+    casos as linhas são convertidas em streaming e a posição é a quantidade de
+    linhas de dados já lidas (retomada descartando essas linhas, sem reanalisá-las).
+    """
+
+    def __init__(self, local_path, filename=None, columns=None):
+        """
+        Args:
+            local_path (str | file): Caminho do arquivo local ou stream binário
+            filename (str, optional): Nome usado para detectar o formato (padrão:
+                local_path; obrigatório para streams)
+            columns (iterable, optional): Colunas lidas do Parquet
+        """
+        self.local_path = local_path
+        self.filename = filename or local_path
+        self.columns = columns
+        self.file_format, self.compression = detect_format(self.filename)
+        self._owns_file = isinstance(local_path, (str, os.PathLike))
+        if self._owns_file:
+            self._file = open(local_path, 'rb')
+            self._size = os.path.getsize(local_path)
+        else:
+            self._file = local_path
+            self._size = self._file.seek(0, io.SEEK_END)
+            self._file.seek(0)
+        self._raw = False
+        self._data_start = 0
+        self._lines_read = 0
+        self.header = b''
+        self._open()
+
+    def _open(self):
+        if self.file_format == PARQUET:
+            rows = iter_parquet_rows(self._file, self.columns)
+            first = next(rows, None)
+            fieldnames = list(first) if first else []
+            self.header = self._encode_row(fieldnames)
+
+            def values():
+                if first is None:
+                    return
+                yield [first[name] for name in fieldnames]
+                for row in rows:
+                    yield [row.get(name, '') for name in fieldnames]
+
+            self._rows = values()
+            return
+
+        if self.compression is None:
+            sample = self._file.read(SNIFF_BYTES)
+            self._file.seek(0)
+            encoding = sniff_encoding(sample)
+            default = '\t' if self.file_format == TSV else OUTPUT_DELIMITER
+            delimiter = sniff_delimiter(sample.decode(encoding, errors='ignore'), default)
+            if encoding == 'utf-8' and delimiter == OUTPUT_DELIMITER:
+                self._raw = True
+                self.header = self._read_record()
+                self._data_start = self._file.tell()
+                return
+
+        text, delimiter, _ = open_text(self._file, self.filename)
+        reader = csv.reader(text, delimiter=delimiter)
+        self.header = self._encode_row(next(reader, []))
+        self._rows = reader
+
+    @staticmethod
+    def _encode_row(values):
+        buffer = io.StringIO()
+        csv.writer(buffer, delimiter=OUTPUT_DELIMITER, lineterminator='\n').writerow(values)
+        return buffer.getvalue().encode('utf-8')
+
+    def position(self):
+        """Posição atual (offset em bytes ou quantidade de linhas lidas)."""
+        return self._file.tell() if self._raw else self._lines_read
+
+    def seek(self, position):
+        """Retoma a leitura a partir de uma posição devolvida por position()."""
+        if self._raw:
+            if position > self._file.tell():
+                self._file.seek(position)
+            return
+        while self._lines_read < position and self.readline():
+            pass
+
+    @property
+    def seekable(self):
+        """True se a fonte aceita saltar para qualquer offset (CSV simples, ver seek_record)."""
+        return self._raw
+
+    @property
+    def data_range(self):
+        """Offsets (início, fim) dos registros de dados no CSV simples."""
+        return self._data_start, self._size
+
+    def seek_record(self, offset):
+        """
+        Salta para o primeiro registro que começa em offset ou depois (apenas CSV simples).
+
+        O restante da linha física em que offset cai é descartado; se offset cair
+        dentro de um campo entre aspas com quebra de linha, a leitura se realinha
+        na linha seguinte (aproximação aceita na amostragem).
+
+        Args:
+            offset (int): Offset em bytes no arquivo
+        """
+        if offset <= self._data_start:
+            self._file.seek(self._data_start)
+            return
+        self._file.seek(offset - 1)
+        self._file.readline()
+
+    def _read_record(self):
+        # Aspas em número ímpar: um campo entre aspas contém quebra de linha e o
+        # registro continua na próxima linha física
+        line = self._file.readline()
+        while line.count(b'"') % 2:
+            more = self._file.readline()
+            if not more:
+                break
+            line += more
+        return line
+
+    def readline(self):
+        """
+        Lê o próximo registro normalizado (bytes), ou b'' no fim do arquivo.
+
+        Um registro com campos entre aspas que contêm quebras de linha é devolvido
+        inteiro, mesmo ocupando várias linhas físicas.
+        """
+        if self._raw:
+            return self._read_record()
+        row = next(self._rows, None)
+        if row is None:
+            return b''
+        self._lines_read += 1
+        return self._encode_row(row)
+
+    def progress(self):
+        """Fração aproximada do arquivo (comprimido) já lida."""
+        return min(1.0, self._file.tell() / (self._size or 1))
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
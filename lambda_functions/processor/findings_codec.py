@@ -0,0 +1,347 @@
+"""
+Representação compacta dos achados (sensitive_data_details) do Data Sentinel.
+
+Os achados são agrupados por (coluna, tipo); em cada grupo as linhas são
+ordenadas, convertidas em diferenças (delta) e codificadas por run-length como
+pares (delta, repetições) em varint. Linhas consecutivas viram um único par
+(1, n) e achados repetidos na mesma célula, (0, n). Os valores mascarados, se
+presentes, seguem na ordem das linhas. O conjunto é comprimido com zlib.
+
+O resultado é gravado como atributo binário no item da auditoria ou, acima de
+FINDINGS_INLINE_MAX_BYTES, em um objeto S3 separado (sidecar), mantendo o item
+do DynamoDB pequeno qualquer que seja a quantidade de achados.
+
+Durante a análise, os achados de cada checkpoint são gravados (mascarados e
+codificados) em segmentos S3 (findings/partial/<audit_id>/<n>.bin); o
+checkpoint guarda apenas a quantidade de segmentos.
+"""
+
+import base64
+import os
+import zlib
+
+from lambda_functions.notifier.utils.logger import setup_logger
+from lambda_functions.processor.retention import retention_tags
+
+# Configuração de logging
+logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
+
+FINDINGS_MAGIC = b'DSF'
+FINDINGS_VERSION = 1
+FINDINGS_ENCODING = 'rle-v1'
+FINDINGS_INLINE_MAX_BYTES = int(os.environ.get('FINDINGS_INLINE_MAX_BYTES', str(64 * 1024)))
+FINDINGS_PREFIX = os.environ.get('FINDINGS_PREFIX', 'findings/')
+
+# Achados sem indicação de linha são gravados na linha 0
+UNKNOWN_ROW = 0
+
+def _write_varint(buffer, value):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def _read_varint(data, position):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+def _write_text(buffer, text):
+    encoded = text.encode('utf-8')
+    _write_varint(buffer, len(encoded))
+    buffer.extend(encoded)
+
+def _read_text(data, position):
+    size, position = _read_varint(data, position)
+    return data[position:position + size].decode('utf-8'), position + size
+
+def encode_findings(findings):
+    """
+    Codifica uma lista de achados no formato compacto.
+
+    Args:
+        findings (list): Achados com 'type' e, opcionalmente, 'row', 'column' e 'value'
+            (itens que não são dicionários são gravados apenas como 'value')
+
+    Returns:
+        bytes: Achados codificados
+    """
+    findings = [finding if isinstance(finding, dict) else {'value': finding} for finding in findings]
+    groups = {}
+    with_values = any('value' in finding for finding in findings)
+    for finding in findings:
+        column = finding.get('column')
+        key = ('' if column is None else str(column), str(finding.get('type', '')))
+        row = finding.get('row')
+        groups.setdefault(key, []).append((UNKNOWN_ROW if row is None else int(row), str(finding.get('value', ''))))
+
+    columns = sorted({column for column, _ in groups})
+    types = sorted({data_type for _, data_type in groups})
+    column_index = {column: index for index, column in enumerate(columns)}
+    type_index = {data_type: index for index, data_type in enumerate(types)}
+
+    buffer = bytearray()
+    buffer.append(1 if with_values else 0)
+    for names in (columns, types):
+        _write_varint(buffer, len(names))
+        for name in names:
+            _write_text(buffer, name)
+
+    _write_varint(buffer, len(groups))
+    for (column, data_type), entries in sorted(groups.items()):
+        entries.sort(key=lambda entry: entry[0])
+        _write_varint(buffer, column_index[column])
+        _write_varint(buffer, type_index[data_type])
+
+        runs = []
+        previous = 0
+        for row, _ in entries:
+            delta = row - previous
+            previous = row
+            if runs and runs[-1][0] == delta:
+                runs[-1][1] += 1
+            else:
+                runs.append([delta, 1])
+        _write_varint(buffer, len(runs))
+        for delta, repeat in runs:
+            _write_varint(buffer, delta)
+            _write_varint(buffer, repeat)
+
+        if with_values:
+            for _, value in entries:
+                _write_text(buffer, value)
+
+    return FINDINGS_MAGIC + bytes([FINDINGS_VERSION]) + zlib.compress(bytes(buffer), 9)
+
+def iter_findings(data, column=None, data_type=None):
+    """
+    Decodifica os achados, opcionalmente filtrando por coluna e tipo.
+
+    Args:
+        data (bytes | str): Achados codificados (ou em base64, como lidos via API)
+        column (str, optional): Coluna desejada
+        data_type (str, optional): Tipo desejado
+
+    Yields:
+        dict: Achado ('row', 'column', 'type' e, se gravado, 'value'),
+            ordenados por coluna, tipo e linha
+    """
+    if isinstance(data, str):
+        data = base64.b64decode(data)
+    data = bytes(data)
+    if data[:3] != FINDINGS_MAGIC:
+        raise ValueError("Achados codificados inválidos")
+    if data[3] != FINDINGS_VERSION:
+        raise ValueError(f"Versão de achados não suportada: {data[3]}")
+
+    payload = zlib.decompress(data[4:])
+    with_values = payload[0] == 1
+    position = 1
+    names = []
+    for _ in range(2):
+        count, position = _read_varint(payload, position)
+        values = []
+        for _ in range(count):
+            text, position = _read_text(payload, position)
+            values.append(text)
+        names.append(values)
+    columns, types = names
+
+    group_count, position = _read_varint(payload, position)
+    for _ in range(group_count):
+        group_column, position = _read_varint(payload, position)
+        group_type, position = _read_varint(payload, position)
+        run_count, position = _read_varint(payload, position)
+        rows = []
+        row = 0
+        for _ in range(run_count):
+            delta, position = _read_varint(payload, position)
+            repeat, position = _read_varint(payload, position)
+            for _ in range(repeat):
+                row += delta
+                rows.append(row)
+
+        wanted = ((column is None or columns[group_column] == column)
+                  and (data_type is None or types[group_type] == data_type))
+        for row in rows:
+            finding = {'row': row, 'column': columns[group_column], 'type': types[group_type]}
+            if with_values:
+                finding['value'], position = _read_text(payload, position)
+            if wanted:
+                yield finding
+
+def decode_findings(data, column=None, data_type=None, offset=0, limit=None):
+    """
+    Decodifica uma página de achados.
+
+    Args:
+        data (bytes | str): Achados codificados
+        column (str, optional): Coluna desejada
+        data_type (str, optional): Tipo desejado
+        offset (int): Achados a pular
+        limit (int, optional): Máximo de achados devolvidos
+
+    Returns:
+        list: Achados da página
+    """
+    page = []
+    for index, finding in enumerate(iter_findings(data, column, data_type)):
+        if index < offset:
+            continue
+        if limit is not None and len(page) >= limit:
+            break
+        page.append(finding)
+    return page
+
+def findings_key(audit_id):
+    """Chave S3 do sidecar de achados de uma auditoria."""
+    return f"{FINDINGS_PREFIX}{audit_id}.bin"
+
+def partial_findings_key(audit_id, index):
+    """Chave S3 do segmento 'index' dos achados parciais de uma auditoria em andamento."""
+    return f"{FINDINGS_PREFIX}partial/{audit_id}/{index:06d}.bin"
+
+class FindingsStore:
+    """Grava e lê os achados codificados (no item ou em um sidecar S3)."""
+
+    def __init__(self, s3_handler, inline_max_bytes=FINDINGS_INLINE_MAX_BYTES):
+        self.s3_handler = s3_handler
+        self.inline_max_bytes = inline_max_bytes
+
+    def attributes(self, audit_id, findings):
+        """
+        Codifica os achados e devolve os atributos a gravar no item da auditoria.
+
+        Acima de inline_max_bytes os achados são gravados no S3 e o item guarda
+        apenas a chave do sidecar.
+
+        Args:
+            audit_id (str): ID da auditoria
+            findings (list): Achados (já mascarados)
+
+        Returns:
+            dict: Atributos do item (encoding, quantidade e achados ou chave S3)
+        """
+        data = encode_findings(findings)
+        attributes = {
+            'sensitive_data_encoding': FINDINGS_ENCODING,
+            'sensitive_data_findings_count': len(findings)
+        }
+        if len(data) <= self.inline_max_bytes:
+            attributes['sensitive_data_findings'] = data
+        else:
+            key = findings_key(audit_id)
+            self.s3_handler.put_object_bytes(key, data, tags=retention_tags())
+            attributes['sensitive_data_findings_key'] = key
+        logger.info(f"Achados da auditoria {audit_id} codificados: {len(findings)} achados em {len(data)} bytes")
+        return attributes
+
+    def load(self, audit):
+        """
+        Obtém os achados codificados de um item de auditoria.
+
+        Args:
+            audit (dict): Item da auditoria
+
+        Returns:
+            bytes | str: Achados codificados, ou None se a auditoria não os tiver
+        """
+        if audit.get('sensitive_data_findings') is not None:
+            return audit['sensitive_data_findings']
+        if audit.get('sensitive_data_findings_key'):
+            return self.s3_handler.get_object_bytes(audit['sensitive_data_findings_key'])
+        return None
+
+    def save_partial(self, audit_id, index, findings):
+        """
+        Grava um segmento dos achados parciais (já mascarados) de uma auditoria.
+
+        Args:
+            audit_id (str): ID da auditoria
+            index (int): Número do segmento (a partir de 0)
+            findings (list): Achados mascarados desde o segmento anterior
+
+        Returns:
+            str: Chave S3 do segmento
+        """
+        key = partial_findings_key(audit_id, index)
+        self.s3_handler.put_object_bytes(key, encode_findings(findings), tags=retention_tags())
+        return key
+
+    def load_partial(self, audit_id, segments):
+        """
+        Lê os achados parciais gravados pelos checkpoints de uma auditoria.
+
+        Args:
+            audit_id (str): ID da auditoria
+            segments (int): Quantidade de segmentos registrada no checkpoint
+
+        Returns:
+            list: Achados mascarados, na ordem dos segmentos
+        """
+        findings = []
+        for index in range(segments):
+            findings.extend(iter_findings(self.s3_handler.get_object_bytes(partial_findings_key(audit_id, index))))
+        logger.info(f"Achados parciais da auditoria {audit_id} carregados: {len(findings)} em {segments} segmentos")
+        return findings
+
+    def delete_partial(self, audit_id, segments):
+        """Remove os segmentos de achados parciais de uma auditoria concluída."""
+        if segments:
+            self.s3_handler.delete_objects([partial_findings_key(audit_id, index) for index in range(segments)])
+
+    def findings(self, audit, column=None, data_type=None, offset=0, limit=None):
+        """
+        Devolve uma página dos achados de uma auditoria.
+
+        Auditorias gravadas antes do formato compacto usam a lista sensitive_data_details.
+
+        Returns:
+            list: Achados da página
+        """
+        data = self.load(audit)
+        if data is not None:
+            return decode_findings(data, column, data_type, offset, limit)
+
+        legacy = self._legacy(audit, column, data_type)
+        return legacy[offset:None if limit is None else offset + limit]
+
+    def findings_page(self, audit, column=None, data_type=None, offset=0, limit=None):
+        """
+        Devolve uma página dos achados de uma auditoria e o total com os mesmos filtros.
+
+        Sem filtros, o total é o sensitive_data_findings_count gravado no item;
+        com filtros, os achados são contados na mesma leitura da página.
+
+        Returns:
+            tuple: (achados da página, total de achados que atendem aos filtros)
+        """
+        data = self.load(audit)
+        if data is None:
+            legacy = self._legacy(audit, column, data_type)
+            return legacy[offset:None if limit is None else offset + limit], len(legacy)
+
+        if column is None and data_type is None and audit.get('sensitive_data_findings_count') is not None:
+            return decode_findings(data, offset=offset, limit=limit), int(audit['sensitive_data_findings_count'])
+
+        page = []
+        total = 0
+        for finding in iter_findings(data, column, data_type):
+            if total >= offset and (limit is None or len(page) < limit):
+                page.append(finding)
+            total += 1
+        return page, total
+
+    @staticmethod
+    def _legacy(audit, column=None, data_type=None):
+        # Auditorias anteriores ao formato compacto: lista sensitive_data_details
+        return [finding for finding in audit.get('sensitive_data_details') or []
+                if isinstance(finding, dict)
+                and (column is None or str(finding.get('column')) == column)
+                and (data_type is None or finding.get('type') == data_type)]
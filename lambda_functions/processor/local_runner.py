@@ -0,0 +1,259 @@
+"""
+Data Sentinel - Execução local do processor
+
+Executa o lambda_handler sobre um arquivo do disco, com S3, DynamoDB e SNS
+substituídos por equivalentes em memória (LocalS3Handler, LocalDynamoDBHandler e
+LocalSNSPublisher), para reproduzir e medir auditorias lentas fora da AWS.
+
+Ao final são informados o tempo de cada etapa (download, delta, análise,
+mascaramento, gravação dos achados, DynamoDB e notificação) e, opcionalmente:
+
+- --profile: perfil determinístico do cProfile (funções mais custosas por tempo
+  acumulado; --profile-output grava o .prof para o snakeviz/pstats);
+- --memory: pico de memória e maiores alocações retidas via tracemalloc.
+
+Ambos acrescentam sobrecarga: compare tempos de etapas apenas entre execuções
+com as mesmas opções. Para um perfil por amostragem, sem sobrecarga relevante,
+execute o runner sob o py-spy (instalado à parte).
+
+Uso:
+    python -m lambda_functions.processor.local_runner clientes.csv --email analista@exemplo.com
+    python -m lambda_functions.processor.local_runner clientes.csv --profile --profile-output auditoria.prof --memory
+    py-spy record -o auditoria.svg -- python -m lambda_functions.processor.local_runner clientes.csv
+"""
+
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+class StageTimer:
+    """Acumula o tempo gasto em cada etapa da auditoria."""
+
+    def __init__(self):
+        self.totals = OrderedDict()
+        self.calls = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def wrap(self, name, function):
+        """Retorna a função envolvida pela medição da etapa 'name'."""
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return function(*args, **kwargs)
+        return timed
+
+    def report(self, total):
+        """
+        Formata o tempo por etapa.
+
+        Args:
+            total (float): Duração total da execução (s)
+
+        Returns:
+            str: Tabela com tempo, chamadas e participação de cada etapa
+        """
+        lines = [f"{'etapa':<22}{'tempo (s)':>12}{'chamadas':>10}{'%':>8}"]
+        rows = list(self.totals.items()) + [('outros', max(0.0, total - sum(self.totals.values())))]
+        for name, elapsed in rows:
+            share = 100 * elapsed / total if total else 0.0
+            lines.append(f"{name:<22}{elapsed:>12.3f}{self.calls.get(name, ''):>10}{share:>8.1f}")
+        lines.append(f"{'total':<22}{total:>12.3f}")
+        return '\n'.join(lines)
+
+@contextmanager
+def _patched(module, **attributes):
+    original = {name: getattr(module, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in original.items():
+            setattr(module, name, value)
+
+def _timed_methods(instance, stage_names, timer):
+    for method, stage in stage_names.items():
+        setattr(instance, method, timer.wrap(stage, getattr(instance, method)))
+    return instance
+
+@contextmanager
+def local_environment(timer, detector_backend='local'):
+    """
+    Substitui, no módulo main, os serviços da AWS por equivalentes em memória
+    e instrumenta as etapas da auditoria.
+
+    Args:
+        timer (StageTimer): Acumulador do tempo por etapa
+        detector_backend (str): 'local' (detector por expressões) ou 'stackspot'
+
+    Yields:
+        dict: Serviços em memória ('s3', 'dynamodb', 'sns', 'counters', 'digests')
+    """
+    from lambda_functions.processor import main as processor
+    from lambda_functions.processor.counters_handler import LocalAuditCountersHandler
+    from lambda_functions.processor.dynamodb_handler import LocalDynamoDBHandler
+    from lambda_functions.processor.notification_digest import LocalDigestStore
+    from lambda_functions.processor.s3_handler import LocalS3Handler
+    from lambda_functions.processor.sns_publisher import LocalSNSPublisher
+
+    services = {
+        's3': _timed_methods(LocalS3Handler(processor.S3_BUCKET), {
+            'download_file': 'download',
+            'download_fileobj': 'download',
+            'put_object_bytes': 'gravacao_s3'
+        }, timer),
+        'dynamodb': _timed_methods(LocalDynamoDBHandler(processor.DYNAMODB_TABLE), {
+            'create_audit_if_absent': 'dynamodb',
+            'get_audit': 'dynamodb',
+            'update_audit_status': 'dynamodb',
+            'save_checkpoint': 'dynamodb'
+        }, timer),
+        'sns': _timed_methods(LocalSNSPublisher(processor.SNS_TOPIC), {
+            'publish_notification': 'notificacao'
+        }, timer),
+        'counters': _timed_methods(LocalAuditCountersHandler(processor.DYNAMODB_TABLE_COUNTERS), {
+            'increment': 'contadores'
+        }, timer),
+        'digests': _timed_methods(LocalDigestStore(processor.DYNAMODB_TABLE_DIGESTS), {
+            'append': 'notificacao'
+        }, timer)
+    }
+
+    class TimedDataAnalyzer(processor.DataAnalyzer):
+        def analyze_csv_file(self, *args, **kwargs):
+            with timer.stage('analise'):
+                return super().analyze_csv_file(*args, **kwargs)
+
+        def mask_sensitive_data(self, *args, **kwargs):
+            with timer.stage('mascaramento'):
+                return super().mask_sensitive_data(*args, **kwargs)
+
+    class TimedFindingsStore(processor.FindingsStore):
+        def attributes(self, *args, **kwargs):
+            with timer.stage('codificacao_achados'):
+                return super().attributes(*args, **kwargs)
+
+    with _patched(
+        processor,
+        S3Handler=lambda bucket_name: services['s3'],
+        DynamoDBHandler=lambda table_name: services['dynamodb'],
+        SNSPublisher=lambda topic_arn: services['sns'],
+        AuditCountersHandler=lambda table_name: services['counters'],
+        DataAnalyzer=TimedDataAnalyzer,
+        FindingsStore=TimedFindingsStore,
+        build_delta=timer.wrap('delta', processor.build_delta),
+        merge_index=timer.wrap('indice_fingerprints', processor.merge_index),
+        DigestStore=lambda table_name: services['digests'],
+        DETECTOR_BACKEND=detector_backend
+    ):
+        yield services
+
+def run_local(file_path, requester_email, event_overrides=None, detector_backend='local',
+              profile=False, memory=False):
+    """
+    Executa uma auditoria local de um arquivo.
+
+    Args:
+        file_path (str): Arquivo a auditar
+        requester_email (str): E-mail do solicitante
+        event_overrides (dict, optional): Campos adicionais do evento (ex.: analysis_mode)
+        detector_backend (str): 'local' ou 'stackspot'
+        profile (bool): Coleta o perfil do cProfile
+        memory (bool): Mede o pico de memória com tracemalloc
+
+    Returns:
+        dict: 'response' do handler, 'timer' (StageTimer), 'total' (s), 'services',
+            'profiler' (cProfile.Profile ou None) e 'memory' (pico e maiores alocações, ou None)
+    """
+    from lambda_functions.processor import main as processor
+
+    timer = StageTimer()
+    file_key = f"uploads/{os.path.basename(file_path)}"
+    event = dict(event_overrides or {}, file_key=file_key, requester_email=requester_email)
+
+    with local_environment(timer, detector_backend) as services:
+        services['s3'].upload_file(file_path, file_key)
+
+        profiler = cProfile.Profile() if profile else None
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            response = processor.lambda_handler(event, None)
+        finally:
+            if profiler:
+                profiler.disable()
+            total = time.perf_counter() - start
+
+        memory_report = None
+        if memory:
+            _, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics('lineno')[:10]
+            tracemalloc.stop()
+            memory_report = {'peak_bytes': peak, 'top': top}
+
+    return {
+        'response': response,
+        'timer': timer,
+        'total': total,
+        'services': services,
+        'profiler': profiler,
+        'memory': memory_report
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Execução local do processor do Data Sentinel")
+    parser.add_argument('file', help="Arquivo a auditar (CSV ou TSV, com ou sem gzip/zstd, ou Parquet)")
+    parser.add_argument('--email', default='local@data-sentinel.local', help="E-mail do solicitante")
+    parser.add_argument('--mode', default='full', choices=('full', 'first_k', 'sample'), help="Modo de análise")
+    parser.add_argument('--backend', default='local', choices=('local', 'stackspot'), help="Detector de dados sensíveis")
+    parser.add_argument('--profile', action='store_true', help="Coleta o perfil do cProfile")
+    parser.add_argument('--profile-output', help="Arquivo .prof para gravar o perfil")
+    parser.add_argument('--profile-limit', type=int, default=25, help="Funções listadas no perfil")
+    parser.add_argument('--memory', action='store_true', help="Mede o pico de memória (tracemalloc)")
+    parser.add_argument('--log-level', default='WARNING', help="Nível de log dos módulos do processor")
+    args = parser.parse_args()
+
+    # Os loggers leem LOG_LEVEL na importação dos módulos (feita em run_local)
+    os.environ['LOG_LEVEL'] = args.log_level
+    result = run_local(args.file, args.email, {'analysis_mode': args.mode}, args.backend,
+                       profile=args.profile or bool(args.profile_output), memory=args.memory)
+
+    response = result['response']
+    print(f"Status: {response.get('statusCode')}")
+    print(json.dumps(json.loads(response.get('body', '{}')), indent=2, ensure_ascii=False))
+    print()
+    print(result['timer'].report(result['total']))
+
+    if result['profiler']:
+        if args.profile_output:
+            result['profiler'].dump_stats(args.profile_output)
+            print(f"\nPerfil gravado em {args.profile_output}")
+        output = io.StringIO()
+        pstats.Stats(result['profiler'], stream=output).sort_stats('cumulative').print_stats(args.profile_limit)
+        print(output.getvalue())
+
+    if result['memory']:
+        print(f"\nPico de memória: {result['memory']['peak_bytes'] / (1024 * 1024):.1f} MB")
+        print("Maiores alocações retidas ao final da execução:")
+        for statistic in result['memory']['top']:
+            print(f"  {statistic}")
+
+if __name__ == '__main__':
+    main()
@@ -6,34 +6,163 @@ identificar dados sensíveis usando StackSpot IA (Quick Commands), armazenar os
 no DynamoDB e disparar notificações via SNS.
 """
 
+import io
 import os
 import json
+import time
 import uuid
+import tempfile
 import logging
 from datetime import datetime
 
 # Importação dos módulos internos
-from stackspot_integration import StackSpotIntegration
-from .data_analyzer import DataAnalyzer
-from s3_handler import S3Handler
-from dynamodb_handler import DynamoDBHandler
-from sns_publisher import SNSPublisher
-from utils.logger import setup_logger
-from utils.validators import validate_event
+from lambda_functions.processor.data_analyzer import DataAnalyzer
+from lambda_functions.processor.s3_handler import S3_IN_MEMORY_MAX_BYTES, S3Handler
+from lambda_functions.processor.dynamodb_handler import DynamoDBHandler
+from lambda_functions.processor.sns_publisher import SNSPublisher
+from lambda_functions.processor.notification_digest import DYNAMODB_TABLE_DIGESTS, DigestStore, NotificationDigest
+from lambda_functions.processor.counters_handler import AuditCountersHandler
+from lambda_functions.processor.audit_state import ALLOWED_TRANSITIONS, COMPLETED, FAILED, PENDING, PROCESSING, make_audit_id
+from lambda_functions.processor.quick_scan import DEFAULT_K, DEFAULT_ROW_BUDGET, DEFAULT_SAMPLE_SIZE, MODE_FULL
+from lambda_functions.processor.row_fingerprints import DeltaRowMismatchError, FingerprintStore, build_delta, merge_index
+from lambda_functions.processor.findings_codec import FindingsStore
+from lambda_functions.processor.retention import OrphanSweeper
+from lambda_functions.processor.dados_auditoria_handler import DYNAMODB_TABLE_RESULT, DadosAuditoriaHandler
+from lambda_functions.processor.utils.logger import setup_logger
+from lambda_functions.processor.utils.validators import validate_event
 
 # Configuração de ambiente
 S3_BUCKET = os.environ.get('S3_BUCKET', 'data-sentinel-storage')
 DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'data-sentinel-audit-results')
 SNS_TOPIC = os.environ.get('SNS_TOPIC', 'data-sentinel-notifications')
+DYNAMODB_TABLE_COUNTERS = os.environ.get('DYNAMODB_TABLE_COUNTERS', 'data-sentinel-audit-counters')
 LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+PROCESSING_LEASE_SECONDS = int(os.environ.get('PROCESSING_LEASE_SECONDS', '900'))
+DIGEST_ENABLED = os.environ.get('DIGEST_ENABLED', 'false').lower() == 'true'
+DETECTOR_BACKEND = os.environ.get('DETECTOR_BACKEND', 'stackspot')
+INCREMENTAL_AUDIT = os.environ.get('INCREMENTAL_AUDIT', 'true').lower() == 'true'
 
 # Configuração de logging
 logger = setup_logger(__name__, LOG_LEVEL)
 
+def get_notification_digest(publisher=None):
+    """
+    Cria o agrupador de notificações, com o buffer na tabela de digests do DynamoDB.
+
+    Args:
+        publisher: Publicador SNS (padrão: SNSPublisher do tópico configurado)
+
+    Returns:
+        NotificationDigest: Agrupador de notificações
+    """
+    return NotificationDigest(publisher or SNSPublisher(SNS_TOPIC), DigestStore(DYNAMODB_TABLE_DIGESTS))
+
+def _lease_seconds(context):
+    """
+    Calcula a duração do lease de processamento a partir do tempo restante da Lambda.
+
+    Args:
+        context: Contexto de execução da Lambda (pode ser None)
+
+    Returns:
+        float: Duração do lease em segundos
+    """
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        return context.get_remaining_time_in_millis() / 1000.0 + 5
+    return PROCESSING_LEASE_SECONDS
+
+def _update_upload(job, status, extra_attributes=None):
+    """
+    Acompanha a auditoria no registro do upload (tabela dados-auditoria) criado pela API.
+
+    Trabalhos sem 'upload_id' (invocação direta, execução local) são ignorados; uma
+    falha ao atualizar o registro não interrompe a auditoria.
+
+    Args:
+        job (dict): Trabalho ('upload_id' e, opcionalmente, 'upload_timestamp')
+        status (str): Novo status, aceito conforme ALLOWED_TRANSITIONS
+        extra_attributes (dict, optional): Atributos gravados junto com o status
+    """
+    if not job.get('upload_id'):
+        return
+    try:
+        DadosAuditoriaHandler(DYNAMODB_TABLE_RESULT).update_upload_status(
+            job['upload_id'],
+            status,
+            expected_status=list(ALLOWED_TRANSITIONS[status]),
+            timestamp=job.get('upload_timestamp'),
+            extra_attributes=extra_attributes
+        )
+    except Exception as e:
+        logger.error(f"Erro ao atualizar o upload {job['upload_id']} para {status}: {str(e)}", exc_info=True)
+
+def _mark_side_effect(dynamodb_handler, audit, flag):
+    # Marca um efeito pós-conclusão como feito; o item permanece em COMPLETED
+    dynamodb_handler.update_audit_status(
+        audit['audit_id'],
+        COMPLETED,
+        timestamp=audit.get('timestamp'),
+        expected_status=[COMPLETED],
+        extra_attributes={flag: True}
+    )
+
+def _finish_side_effects(job, dynamodb_handler, sns_publisher, audit):
+    """
+    Executa os efeitos posteriores à conclusão ainda pendentes no item da auditoria.
+
+    A conclusão de uma auditoria completa grava 'counted' e 'notified' como False;
+    cada efeito marca o seu atributo ao terminar. Uma nova entrega do mesmo trabalho
+    encontra a auditoria em COMPLETED e retoma apenas os pendentes (a notificação
+    pode se repetir se a falha ocorrer entre o envio e a marcação).
+
+    Args:
+        job (dict): Trabalho (registro do upload a acompanhar)
+        dynamodb_handler (DynamoDBHandler): Tabela de auditorias
+        sns_publisher (SNSPublisher): Publicador das notificações
+        audit (dict): Item da auditoria concluída
+
+    Raises:
+        Exception: Falha de um efeito pendente; a mensagem volta à fila para nova tentativa
+    """
+    audit_id = audit['audit_id']
+    summary = audit.get('sensitive_data_count', {})
+    _update_upload(job, COMPLETED, {'sensitive_data_count': summary})
+
+    # Contadores agregados
+    if audit.get('counted') is False:
+        # O audit_id é a chave de idempotência: a auditoria é contada uma única vez
+        counters = AuditCountersHandler(DYNAMODB_TABLE_COUNTERS)
+        counters.increment(audit['requester_email'], summary, audit_id=audit_id)
+        _mark_side_effect(dynamodb_handler, audit, 'counted')
+
+    # Publicação de notificação no SNS
+    if audit.get('notified') is False:
+        notification_message = {
+            'audit_id': audit_id,
+            'requester_email': audit['requester_email'],
+            'summary': summary,
+            'timestamp': audit.get('timestamp')
+        }
+        if DIGEST_ENABLED:
+            notification_message['file_name'] = audit.get('file_name')
+            get_notification_digest(sns_publisher).add(notification_message)
+            logger.info(f"Notificação adicionada ao digest do solicitante")
+        else:
+            sns_publisher.publish_notification(
+                message=json.dumps(notification_message),
+                subject=f"Resultado da Auditoria de Dados Sensíveis - {audit_id}"
+            )
+            logger.info(f"Notificação enviada para o tópico SNS")
+        _mark_side_effect(dynamodb_handler, audit, 'notified')
+
 def lambda_handler(event, context):
     """
     Função principal que processa o evento de upload de arquivo CSV.
     
+    Aceita uma invocação direta ({'file_key', 'requester_email'}), um lote de
+    mensagens da fila SQS de auditorias ou os eventos agendados de digest e de
+    varredura de retenção.
+    
     Args:
         event: Evento que acionou a função Lambda
         context: Contexto de execução da Lambda
@@ -44,87 +173,416 @@ def lambda_handler(event, context):
     logger.info("Iniciando processamento de auditoria")
     logger.debug(f"Evento recebido: {json.dumps(event)}")
     
+    # Evento agendado (ex.: EventBridge) para publicar os digests com a janela vencida
+    # ('force' publica todos os pendentes)
+    if event.get('digest_flush'):
+        try:
+            digest = get_notification_digest()
+            message_ids = digest.flush_all() if event.get('force') else digest.flush_due()
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'Digests publicados com sucesso',
+                    'published': len(message_ids)
+                })
+            }
+        except Exception as e:
+            logger.error(f"Erro ao publicar digests: {str(e)}", exc_info=True)
+            return {
+                'statusCode': 500,
+                'body': json.dumps({
+                    'message': f'Erro ao publicar digests: {str(e)}'
+                })
+            }
+    
+    # Evento agendado para remover os uploads que nenhuma auditoria referencia
+    if event.get('retention_sweep'):
+        try:
+            result = OrphanSweeper(
+                S3Handler(S3_BUCKET),
+                DadosAuditoriaHandler(DYNAMODB_TABLE_RESULT)
+            ).sweep(dry_run=bool(event.get('dry_run')))
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'Varredura de retenção concluída',
+                    **result
+                })
+            }
+        except Exception as e:
+            logger.error(f"Erro na varredura de retenção: {str(e)}", exc_info=True)
+            return {
+                'statusCode': 500,
+                'body': json.dumps({
+                    'message': f'Erro na varredura de retenção: {str(e)}'
+                })
+            }
+    
+    # Lote da fila SQS: falhas parciais são devolvidas para nova entrega
+    records = event.get('Records') or []
+    if records and records[0].get('eventSource') == 'aws:sqs':
+        failures = []
+        for record in records:
+            response = process_audit(json.loads(record['body']), context)
+            if response['statusCode'] != 200:
+                failures.append({'itemIdentifier': record['messageId']})
+        return {'batchItemFailures': failures}
+    
+    return process_audit(event, context)
+
+def process_audit(job, context=None):
+    """
+    Processa a auditoria de um arquivo: análise, armazenamento e notificação.
+    
+    Usada tanto pela Lambda quanto pelo worker da fila (worker.py).
+    
+    Args:
+        job (dict): Dados do trabalho ('file_key' e 'requester_email'; 'incremental'
+            False força a reanálise de todas as linhas; 'upload_id' e 'upload_timestamp'
+            identificam o registro do upload na tabela dados-auditoria)
+        context: Contexto de execução da Lambda (None fora da Lambda)
+        
+    Returns:
+        dict: Resposta no formato da Lambda (statusCode e body)
+    """
+    processing_audit_id = None
+    processing_timestamp = None
+    lease_token = None
+    # Arquivos do /tmp desta auditoria (download e delta), removidos ao final
+    temp_paths = []
+    
     try:
-        # Validação do evento
-        validate_event(event)
+        # Validação do trabalho
+        validate_event(job)
         
         # Extração de informações do evento
-        file_key = event.get('file_key')
-        requester_email = event.get('requester_email')
+        file_key = job.get('file_key')
+        requester_email = job.get('requester_email')
         file_name = file_key.split('/')[-1]
-        
-        # Geração de ID único para a auditoria
-        audit_id = str(uuid.uuid4())
-        timestamp = datetime.utcnow().isoformat()
+        analysis_mode = job.get('analysis_mode', MODE_FULL)
+        analysis_params = {
+            'k': int(job.get('k', DEFAULT_K)),
+            'sample_size': int(job.get('sample_size', DEFAULT_SAMPLE_SIZE)),
+            'row_budget': int(job.get('row_budget', DEFAULT_ROW_BUDGET))
+        }
+        # Parâmetros da análise rápida entram no ID: K ou amostras diferentes são auditorias distintas
+        analysis_variant = analysis_mode
+        if analysis_mode != MODE_FULL:
+            analysis_variant += ':' + ','.join(f"{key}={value}" for key, value in analysis_params.items())
         
         # Inicialização dos handlers
         s3_handler = S3Handler(S3_BUCKET)
         dynamodb_handler = DynamoDBHandler(DYNAMODB_TABLE)
         sns_publisher = SNSPublisher(SNS_TOPIC)
         
-        # Download do arquivo do S3
-        local_file_path = f"/tmp/{file_name}"
-        s3_handler.download_file(file_key, local_file_path)
-        logger.info(f"Arquivo {file_name} baixado para análise")
+        # ID determinístico (chave S3 + ETag): novas tentativas reutilizam o mesmo registro
+        metadata = s3_handler.get_object_metadata(file_key)
+        audit_id = make_audit_id(file_key, metadata['ETag'], analysis_variant)
+        timestamp = metadata['LastModified'].isoformat()
+        now = datetime.utcnow().isoformat()
         
-        # Inicialização da integração com StackSpot IA
-        stackspot_integration = StackSpotIntegration()
-        
-        # Análise de dados sensíveis
-        data_analyzer = DataAnalyzer(stackspot_integration)
-        analysis_result = data_analyzer.analyze_csv(local_file_path)
-        logger.info(f"Análise concluída: {len(analysis_result['sensitive_data'])} dados sensíveis encontrados")
-        
-        # Mascaramento de dados sensíveis para armazenamento
-        masked_data = data_analyzer.mask_sensitive_data(analysis_result['sensitive_data'])
-        
-        # Preparação dos dados para armazenamento no DynamoDB
-        audit_data = {
+        dynamodb_handler.create_audit_if_absent({
             'audit_id': audit_id,
             'timestamp': timestamp,
             'requester_email': requester_email,
             'file_name': file_name,
             's3_path': file_key,
-            'sensitive_data_count': analysis_result['summary'],
-            'sensitive_data_details': masked_data,
-            'status': 'COMPLETED',
-            'created_at': timestamp,
-            'updated_at': timestamp
-        }
+            'etag': metadata['ETag'],
+            'analysis_mode': analysis_mode,
+            'status': PENDING,
+            'attempts': 0,
+            'created_at': now,
+            'updated_at': now
+        })
+        audit = dynamodb_handler.get_audit(audit_id, timestamp)
+        _update_upload(job, PROCESSING, {'processor_audit_id': audit_id})
         
-        # Armazenamento dos resultados no DynamoDB
-        dynamodb_handler.save_audit_result(audit_data)
-        logger.info(f"Resultados da auditoria {audit_id} salvos no DynamoDB")
+        # Auditoria já concluída em uma tentativa anterior: resposta idempotente
+        if audit.get('status') == COMPLETED:
+            logger.info(f"Auditoria {audit_id} já concluída; retomando efeitos pendentes")
+            _finish_side_effects(job, dynamodb_handler, sns_publisher, audit)
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'Auditoria já concluída',
+                    'audit_id': audit_id,
+                    'summary': audit.get('sensitive_data_count', {})
+                })
+            }
         
-        # Publicação de notificação no SNS
-        notification_message = {
-            'audit_id': audit_id,
-            'requester_email': requester_email,
-            'summary': analysis_result['summary'],
-            'timestamp': timestamp
-        }
+        # Transição para PROCESSING; falha se outra execução detém um lease válido
+        # O token identifica esta tentativa: checkpoints e a conclusão só são aceitos
+        # enquanto o item o mantiver (uma tentativa cujo lease expirou não grava mais)
+        lease_seconds = _lease_seconds(context)
+        lease_token = str(uuid.uuid4())
+        acquired = dynamodb_handler.update_audit_status(
+            audit_id,
+            PROCESSING,
+            timestamp=timestamp,
+            expected_status=list(ALLOWED_TRANSITIONS[PROCESSING]),
+            extra_attributes={
+                'lease_expires_at': time.time() + lease_seconds,
+                'lease_token': lease_token,
+                'attempts': audit.get('attempts', 0) + 1
+            },
+            lease_expired_before=time.time()
+        )
+        if not acquired:
+            logger.info(f"Auditoria {audit_id} em processamento por outra execução")
+            return {
+                'statusCode': 409,
+                'body': json.dumps({
+                    'message': 'Auditoria em processamento',
+                    'audit_id': audit_id
+                })
+            }
+        processing_audit_id, processing_timestamp = audit_id, timestamp
+        
+        # Download do arquivo do S3: arquivos pequenos ficam em memória, os demais
+        # vão para o /tmp com transferência multipart em paralelo. Análises rápidas
+        # leem sob demanda (GETs com Range) apenas o trecho que de fato percorrem
+        in_memory = metadata['ContentLength'] <= S3_IN_MEMORY_MAX_BYTES
+        if analysis_mode != MODE_FULL:
+            local_file_path = s3_handler.open_stream(file_key, metadata['ContentLength'])
+            logger.info(f"Arquivo {file_name} aberto para leitura sob demanda")
+        elif in_memory:
+            local_file_path = s3_handler.download_fileobj(file_key)
+            logger.info(f"Arquivo {file_name} baixado para análise (memória)")
+        else:
+            # Nome exclusivo por execução: auditorias simultâneas de arquivos com o
+            # mesmo nome (ou novas tentativas no mesmo ambiente) não compartilham o arquivo
+            with tempfile.NamedTemporaryFile(dir='/tmp', prefix=f"{audit_id}-", suffix=f"-{file_name}",
+                                             delete=False) as temp_file:
+                local_file_path = temp_file.name
+            temp_paths.append(local_file_path)
+            s3_handler.download_file(file_key, local_file_path)
+            logger.info(f"Arquivo {file_name} baixado para análise (disco)")
         
-        sns_publisher.publish_notification(
-            message=json.dumps(notification_message),
-            subject=f"Resultado da Auditoria de Dados Sensíveis - {audit_id}"
+        # Inicialização da integração com StackSpot IA (ou detector local, com DETECTOR_BACKEND=local)
+        stackspot_integration = None
+        if DETECTOR_BACKEND == 'stackspot':
+            # Importado sob demanda: o SDK da StackSpot só é necessário com esse backend
+            from stackspot_integration import StackSpotIntegration
+            stackspot_integration = StackSpotIntegration()
+        
+        # Reauditoria incremental: apenas as linhas ausentes do índice da auditoria
+        # anterior do mesmo arquivo (file_name + solicitante) são analisadas
+        analysis_path, analysis_filename = local_file_path, file_name
+        delta_plan = None
+        previous_index = None
+        fingerprint_base = None
+        if analysis_mode == MODE_FULL and INCREMENTAL_AUDIT and job.get('incremental', True):
+            fingerprint_store = FingerprintStore(s3_handler)
+            previous_index = fingerprint_store.load(requester_email, file_name)
+            fingerprint_base = previous_index.digest if previous_index else 'none'
+            delta_target = io.BytesIO() if in_memory else f"{local_file_path}.delta.csv"
+            if not in_memory:
+                temp_paths.append(delta_target)
+            delta_plan = build_delta(local_file_path, previous_index, delta_target, filename=file_name)
+            analysis_path, analysis_filename = delta_plan.delta_path, 'delta.csv'
+        
+        # Análise de dados sensíveis, retomando do último checkpoint se houver
+        start_offset = int(audit.get('checkpoint_offset', 0))
+        partial_result = audit.get('checkpoint_result')
+        if start_offset and (partial_result or {}).get('fingerprint_base') != fingerprint_base:
+            # O checkpoint se refere a outro arquivo delta (o índice mudou): recomeça
+            logger.info(f"Checkpoint da auditoria {audit_id} descartado: índice de fingerprints alterado")
+            start_offset, partial_result = 0, None
+        
+        # Achados já mascarados das tentativas anteriores (segmentos S3 dos checkpoints);
+        # o item guarda apenas o offset, o resumo e a quantidade de segmentos
+        findings_store = FindingsStore(s3_handler)
+        findings_segments = int((partial_result or {}).get('findings_segments', 0)) if start_offset else 0
+        masked_data = findings_store.load_partial(audit_id, findings_segments) if findings_segments else []
+        if start_offset:
+            logger.info(f"Retomando análise da auditoria {audit_id} a partir da posição {start_offset}")
+        
+        # Achados desta execução já mascarados e gravados em segmentos
+        persisted = 0
+        
+        def to_original_rows(findings):
+            # Na reauditoria incremental, 'row' é a linha no arquivo delta: volta à linha do arquivo recebido
+            return delta_plan.remap_findings(findings) if delta_plan else findings
+        
+        def checkpoint(offset, partial_result):
+            nonlocal processing_audit_id, findings_segments, persisted
+            new_findings = partial_result['sensitive_data'][persisted:]
+            if new_findings:
+                masked = data_analyzer.mask_sensitive_data(to_original_rows(new_findings))
+                findings_store.save_partial(audit_id, findings_segments, masked)
+                findings_segments += 1
+                masked_data.extend(masked)
+                persisted += len(new_findings)
+            saved = dynamodb_handler.save_checkpoint(
+                audit_id, timestamp, offset,
+                {
+                    'summary': partial_result['summary'],
+                    'rows_analyzed': partial_result['rows_analyzed'],
+                    'fingerprint_base': fingerprint_base,
+                    'findings_segments': findings_segments
+                },
+                lease_expires_at=time.time() + lease_seconds,
+                lease_token=lease_token
+            )
+            if not saved:
+                # Outra execução assumiu a auditoria: interrompe sem marcá-la como FAILED
+                processing_audit_id = None
+                raise RuntimeError(f"Auditoria {audit_id} não está mais sob esta execução")
+        
+        data_analyzer = DataAnalyzer(stackspot_integration)
+        try:
+            analysis_result = data_analyzer.analyze_csv_file(
+                analysis_path,
+                start_offset=start_offset,
+                partial_result=partial_result,
+                on_checkpoint=checkpoint,
+                mode=analysis_mode,
+                filename=analysis_filename,
+                **analysis_params
+            )
+            # Mascaramento dos achados posteriores ao último checkpoint (ou de toda a
+            # análise, sem checkpoints, no modo sample)
+            masked_tail = data_analyzer.mask_sensitive_data(to_original_rows(analysis_result['sensitive_data'][persisted:]))
+        except DeltaRowMismatchError as e:
+            # Os achados do delta não podem ser atribuídos às linhas do arquivo recebido:
+            # descarta o progresso incremental e audita o arquivo inteiro, sem índice
+            logger.warning(f"Reauditoria incremental da auditoria {audit_id} abandonada ({str(e)}); "
+                           f"analisando o arquivo completo")
+            try:
+                findings_store.delete_partial(audit_id, findings_segments)
+            except Exception:
+                logger.error(f"Erro ao remover achados parciais da auditoria {audit_id}", exc_info=True)
+            delta_plan, fingerprint_base = None, None
+            findings_segments, persisted = 0, 0
+            masked_data.clear()
+            analysis_result = data_analyzer.analyze_csv_file(
+                local_file_path,
+                on_checkpoint=checkpoint,
+                mode=analysis_mode,
+                filename=file_name,
+                **analysis_params
+            )
+            masked_tail = data_analyzer.mask_sensitive_data(analysis_result['sensitive_data'][persisted:])
+        masked_data.extend(masked_tail)
+        analysis_info = {key: analysis_result[key]
+                         for key in ('mode', 'scope', 'complete', 'estimate', 'sample_size', 'rows_scanned', 'estimated_rows')
+                         if key in analysis_result}
+        logger.info(f"Análise concluída: {len(masked_data)} dados sensíveis encontrados")
+        
+        # Linhas mantidas entram no resumo com as contagens da auditoria anterior;
+        # os detalhes armazenados se referem apenas às linhas novas
+        new_index = None
+        if delta_plan:
+            for data_type, count in delta_plan.carried_summary.items():
+                analysis_result['summary'][data_type] = analysis_result['summary'].get(data_type, 0) + count
+            analysis_info['incremental'] = dict(delta_plan.stats(), details_scope='new_rows')
+            new_index = merge_index(delta_plan, masked_data, previous_index)
+        
+        # Achados mascarados em formato compacto (no item ou em sidecar S3, conforme o tamanho)
+        findings_attributes = findings_store.attributes(audit_id, masked_data)
+        
+        # Conclusão condicional: apenas a execução que detém o lease grava o resultado.
+        # Auditorias completas registram os efeitos posteriores como pendentes
+        side_effects = {'counted': False, 'notified': False} if analysis_mode == MODE_FULL else {}
+        completed = dynamodb_handler.update_audit_status(
+            audit_id,
+            COMPLETED,
+            timestamp=timestamp,
+            expected_status=list(ALLOWED_TRANSITIONS[COMPLETED]),
+            extra_attributes={
+                'sensitive_data_count': analysis_result['summary'],
+                'analysis': analysis_info,
+                **findings_attributes,
+                **side_effects
+            },
+            remove_attributes=['checkpoint_offset', 'checkpoint_result', 'lease_expires_at', 'lease_token'],
+            lease_token=lease_token
         )
-        logger.info(f"Notificação enviada para o tópico SNS")
+        processing_audit_id = None
+        if not completed:
+            logger.warning(f"Auditoria {audit_id} não está mais sob esta execução; resultado descartado")
+            return {
+                'statusCode': 409,
+                'body': json.dumps({
+                    'message': 'Auditoria concluída ou assumida por outra execução',
+                    'audit_id': audit_id
+                })
+            }
+        logger.info(f"Resultados da auditoria {audit_id} salvos no DynamoDB")
+        
+        try:
+            findings_store.delete_partial(audit_id, findings_segments)
+        except Exception as e:
+            logger.error(f"Erro ao remover achados parciais da auditoria {audit_id}: {str(e)}", exc_info=True)
+        
+        # Índice gravado só após a conclusão: uma nova tentativa desta auditoria
+        # reconstrói o mesmo arquivo delta e reaproveita os checkpoints
+        if new_index is not None and new_index is not previous_index:
+            try:
+                fingerprint_store.save(requester_email, file_name, new_index)
+            except Exception as e:
+                logger.error(f"Erro ao salvar índice de fingerprints da auditoria {audit_id}: {str(e)}", exc_info=True)
+        
+        # Registro do upload, contadores e notificação (análises rápidas são
+        # pré-verificações: sem contadores nem e-mail)
+        _finish_side_effects(job, dynamodb_handler, sns_publisher, dict(
+            audit, status=COMPLETED, sensitive_data_count=analysis_result['summary'], **side_effects
+        ))
+        
+        if analysis_mode != MODE_FULL:
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'Análise rápida concluída com sucesso',
+                    'audit_id': audit_id,
+                    'summary': analysis_result['summary'],
+                    'analysis': analysis_info
+                })
+            }
         
         # Retorno da resposta
+        body = {
+            'message': 'Auditoria concluída com sucesso',
+            'audit_id': audit_id,
+            'summary': analysis_result['summary']
+        }
+        if delta_plan:
+            # O resumo inclui as linhas mantidas; os detalhes (achados) cobrem apenas as linhas novas
+            body['incremental'] = analysis_info['incremental']
+            body['details'] = 'Os achados detalhados cobrem apenas as linhas novas desde a auditoria anterior'
         return {
             'statusCode': 200,
-            'body': json.dumps({
-                'message': 'Auditoria concluída com sucesso',
-                'audit_id': audit_id,
-                'summary': analysis_result['summary']
-            })
+            'body': json.dumps(body)
         }
         
     except Exception as e:
         logger.error(f"Erro durante o processamento: {str(e)}", exc_info=True)
+        # Mantém o checkpoint: a próxima tentativa retoma a partir dele
+        if processing_audit_id:
+            try:
+                dynamodb_handler.update_audit_status(
+                    processing_audit_id,
+                    FAILED,
+                    timestamp=processing_timestamp,
+                    expected_status=list(ALLOWED_TRANSITIONS[FAILED]),
+                    extra_attributes={'error_message': str(e)[:1000]},
+                    remove_attributes=['lease_expires_at', 'lease_token'],
+                    lease_token=lease_token
+                )
+            except Exception:
+                logger.error("Erro ao registrar falha da auditoria", exc_info=True)
+            _update_upload(job, FAILED, {'error_message': str(e)[:1000]})
         return {
             'statusCode': 500,
             'body': json.dumps({
                 'message': f'Erro durante o processamento: {str(e)}'
             })
         }
+    finally:
+        for path in temp_paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logger.warning(f"Não foi possível remover o arquivo temporário {path}", exc_info=True)
@@ -0,0 +1,359 @@
+"""
+Agrupamento (digest) de notificações de auditoria por solicitante no Data Sentinel.
+
+Em vez de publicar uma mensagem SNS por auditoria concluída, as notificações são
+acumuladas por requester_email e publicadas como um único e-mail de resumo quando
+o buffer atinge DIGEST_MAX_BATCH notificações ou tem mais de DIGEST_WINDOW_SECONDS.
+
+O buffer fica no DynamoDB (DigestStore), um item por solicitante, e não na
+memória da Lambda: containers diferentes acumulam no mesmo item, nada se perde
+quando um container é reciclado e o evento agendado {"digest_flush": true}
+publica os buffers vencidos de todos os solicitantes.
+
+- Inclusão: UpdateItem com list_append, condicionado a que a auditoria ainda não
+  esteja no buffer (audit_ids), o que torna novas tentativas idempotentes.
+- Publicação: o buffer é reservado com um lease condicional, publicado e só então
+  as notificações publicadas são removidas. Uma falha entre a publicação e a
+  remoção faz o digest ser reenviado após o lease (entrega pelo menos uma vez).
+
+Esquema da tabela: requester_email (HASH).
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import boto3
+from botocore.exceptions import ClientError
+
+from lambda_functions.notifier.email_formatter import EmailFormatter
+from lambda_functions.notifier.utils.logger import setup_logger
+
+# Configuração de logging
+logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
+
+DYNAMODB_TABLE_DIGESTS = os.environ.get('DYNAMODB_TABLE_DIGESTS', 'data-sentinel-notification-digests')
+DIGEST_MAX_BATCH = int(os.environ.get('DIGEST_MAX_BATCH', '50'))
+DIGEST_WINDOW_SECONDS = int(os.environ.get('DIGEST_WINDOW_SECONDS', '900'))
+# Tempo em que um buffer reservado para publicação fica indisponível para outra execução
+DIGEST_LEASE_SECONDS = int(os.environ.get('DIGEST_LEASE_SECONDS', '120'))
+
+class DigestStore:
+    """Buffer de notificações por solicitante em uma tabela DynamoDB."""
+
+    def __init__(self, table_name=DYNAMODB_TABLE_DIGESTS):
+        """Inicializa o buffer de digests."""
+        self.table_name = table_name
+        self.dynamodb = boto3.resource('dynamodb')
+        self.table = self.dynamodb.Table(table_name)
+        logger.info(f"Inicializando DigestStore para a tabela: {table_name}")
+
+    def append(self, requester_email, notification, now):
+        """
+        Acrescenta uma notificação ao buffer do solicitante.
+
+        Args:
+            requester_email (str): E-mail do solicitante
+            notification (dict): Notificação (com audit_id)
+            now (float): Instante atual (epoch)
+
+        Returns:
+            int: Notificações no buffer após a inclusão, ou None se a auditoria já estava nele
+        """
+        audit_id = str(notification.get('audit_id'))
+        try:
+            response = self.table.update_item(
+                Key={'requester_email': requester_email},
+                UpdateExpression=(
+                    "SET notifications = list_append(if_not_exists(notifications, :empty), :notification), "
+                    "opened_at = if_not_exists(opened_at, :now) ADD audit_ids :audit_ids"
+                ),
+                ConditionExpression="attribute_not_exists(audit_ids) OR NOT contains(audit_ids, :audit_id)",
+                ExpressionAttributeValues={
+                    ':empty': [],
+                    ':notification': [json.dumps(notification)],
+                    ':now': Decimal(str(now)),
+                    ':audit_ids': {audit_id},
+                    ':audit_id': audit_id
+                },
+                ReturnValues='UPDATED_NEW'
+            )
+            return len(response['Attributes']['notifications'])
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.info(f"Auditoria {audit_id} já está no digest de {requester_email}")
+                return None
+            logger.error(f"Erro ao acrescentar notificação ao digest no DynamoDB: {str(e)}", exc_info=True)
+            raise
+
+    def claim(self, requester_email, now, lease_seconds=DIGEST_LEASE_SECONDS):
+        """
+        Reserva o buffer do solicitante para publicação.
+
+        Returns:
+            tuple: (lease, notificações) ou None se o buffer não existe ou já está reservado
+        """
+        lease = Decimal(str(now + lease_seconds))
+        try:
+            response = self.table.update_item(
+                Key={'requester_email': requester_email},
+                UpdateExpression="SET flush_lease = :lease",
+                ConditionExpression="attribute_exists(requester_email) AND "
+                                    "(attribute_not_exists(flush_lease) OR flush_lease < :now)",
+                ExpressionAttributeValues={':lease': lease, ':now': Decimal(str(now))},
+                ReturnValues='ALL_NEW'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return None
+            logger.error(f"Erro ao reservar digest no DynamoDB: {str(e)}", exc_info=True)
+            raise
+        notifications = [json.loads(item) for item in response['Attributes'].get('notifications', [])]
+        return lease, notifications
+
+    def complete(self, requester_email, lease, notifications, now):
+        """
+        Remove do buffer as notificações publicadas e libera o lease.
+
+        Notificações acrescentadas durante a publicação ficam no fim da lista e são
+        mantidas; o item é apagado quando o buffer fica vazio.
+        """
+        values = {':lease': lease, ':now': Decimal(str(now))}
+        removals = [f"notifications[{index}]" for index in range(len(notifications))]
+        update_expression = "SET opened_at = :now REMOVE flush_lease"
+        if removals:
+            update_expression += ", " + ", ".join(removals)
+            values[':published'] = {str(n.get('audit_id')) for n in notifications}
+            update_expression += " DELETE audit_ids :published"
+        try:
+            self.table.update_item(
+                Key={'requester_email': requester_email},
+                UpdateExpression=update_expression,
+                ConditionExpression="flush_lease = :lease",
+                ExpressionAttributeValues=values
+            )
+            self.table.delete_item(
+                Key={'requester_email': requester_email},
+                ConditionExpression="attribute_not_exists(flush_lease) AND "
+                                    "(attribute_not_exists(notifications) OR size(notifications) = :zero)",
+                ExpressionAttributeValues={':zero': 0}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                # Lease expirado (outra execução reservou o buffer) ou novas notificações pendentes
+                return
+            logger.error(f"Erro ao concluir digest no DynamoDB: {str(e)}", exc_info=True)
+            raise
+
+    def release(self, requester_email, lease):
+        """Libera o lease sem alterar o buffer (publicação falhou)."""
+        try:
+            self.table.update_item(
+                Key={'requester_email': requester_email},
+                UpdateExpression="REMOVE flush_lease",
+                ConditionExpression="flush_lease = :lease",
+                ExpressionAttributeValues={':lease': lease}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.error(f"Erro ao liberar digest no DynamoDB: {str(e)}", exc_info=True)
+                raise
+
+    def iter_buffers(self):
+        """
+        Percorre (em páginas) os buffers pendentes.
+
+        Yields:
+            tuple: (requester_email, opened_at, quantidade de notificações)
+        """
+        params = {'ProjectionExpression': 'requester_email, opened_at, notifications'}
+        try:
+            while True:
+                response = self.table.scan(**params)
+                for item in response.get('Items', []):
+                    yield item['requester_email'], float(item.get('opened_at', 0)), len(item.get('notifications', []))
+                if 'LastEvaluatedKey' not in response:
+                    return
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            logger.error(f"Erro ao listar digests no DynamoDB: {str(e)}", exc_info=True)
+            raise
+
+class LocalDigestStore:
+    """Substituto local do DigestStore que mantém os buffers em memória (testes e execução offline)."""
+
+    def __init__(self, table_name='local'):
+        self.table_name = table_name
+        self.items = {}
+        self._lock = threading.Lock()
+
+    def append(self, requester_email, notification, now):
+        with self._lock:
+            item = self.items.setdefault(requester_email, {'notifications': [], 'audit_ids': set(), 'opened_at': now})
+            audit_id = str(notification.get('audit_id'))
+            if audit_id in item['audit_ids']:
+                return None
+            item['notifications'].append(json.dumps(notification))
+            item['audit_ids'].add(audit_id)
+            return len(item['notifications'])
+
+    def claim(self, requester_email, now, lease_seconds=DIGEST_LEASE_SECONDS):
+        with self._lock:
+            item = self.items.get(requester_email)
+            if item is None or item.get('flush_lease', 0) >= now:
+                return None
+            item['flush_lease'] = now + lease_seconds
+            return item['flush_lease'], [json.loads(n) for n in item['notifications']]
+
+    def complete(self, requester_email, lease, notifications, now):
+        with self._lock:
+            item = self.items.get(requester_email)
+            if item is None or item.get('flush_lease') != lease:
+                return
+            del item['notifications'][:len(notifications)]
+            item['audit_ids'] -= {str(n.get('audit_id')) for n in notifications}
+            item.pop('flush_lease')
+            item['opened_at'] = now
+            if not item['notifications']:
+                del self.items[requester_email]
+
+    def release(self, requester_email, lease):
+        with self._lock:
+            item = self.items.get(requester_email)
+            if item is not None and item.get('flush_lease') == lease:
+                item.pop('flush_lease')
+
+    def iter_buffers(self):
+        with self._lock:
+            buffers = [(email, item['opened_at'], len(item['notifications'])) for email, item in self.items.items()]
+        yield from buffers
+
+class NotificationDigest:
+    """Classe responsável por acumular notificações e publicá-las em digest."""
+
+    def __init__(self, publisher, store=None, formatter=None, max_batch=DIGEST_MAX_BATCH,
+                 window_seconds=DIGEST_WINDOW_SECONDS, clock=time.time):
+        """
+        Inicializa o agrupador de notificações.
+
+        Args:
+            publisher: Objeto com publish_notification (SNSPublisher ou LocalSNSPublisher)
+            store: Buffer das notificações (DigestStore ou LocalDigestStore); padrão: DigestStore
+            formatter (EmailFormatter, optional): Formatador usado para o digest
+            max_batch (int): Quantidade de notificações que dispara a publicação
+            window_seconds (int): Tempo máximo que uma notificação fica no buffer
+            clock (callable): Fonte de tempo (substituível em testes)
+        """
+        self.publisher = publisher
+        self.store = store or DigestStore()
+        self.formatter = formatter or EmailFormatter()
+        self.max_batch = max_batch
+        self.window_seconds = window_seconds
+        self.clock = clock
+
+    def add(self, notification):
+        """
+        Adiciona uma notificação ao buffer do solicitante.
+
+        Args:
+            notification (dict): Notificação com requester_email, audit_id, summary e timestamp
+
+        Returns:
+            list: IDs das mensagens publicadas (vazia se nada foi publicado)
+        """
+        requester_email = notification['requester_email']
+        count = self.store.append(requester_email, notification, self.clock())
+        logger.info(f"Notificação da auditoria {notification.get('audit_id')} adicionada ao digest de {requester_email}")
+
+        if count is not None and count >= self.max_batch:
+            message_id = self.flush(requester_email)
+            if message_id:
+                return [message_id]
+        return []
+
+    def flush_due(self):
+        """
+        Publica os digests cuja janela de tempo expirou (chamado pelo evento agendado).
+
+        Returns:
+            list: IDs das mensagens publicadas
+        """
+        now = self.clock()
+        due = [email for email, opened_at, count in self.store.iter_buffers()
+               if count and now - opened_at >= self.window_seconds]
+        return self._flush_many(due)
+
+    def flush_all(self):
+        """
+        Publica todos os digests pendentes, independentemente da janela.
+
+        Returns:
+            list: IDs das mensagens publicadas
+        """
+        return self._flush_many([email for email, _, count in self.store.iter_buffers() if count])
+
+    def _flush_many(self, requester_emails):
+        message_ids = []
+        for requester_email in requester_emails:
+            try:
+                message_id = self.flush(requester_email)
+            except Exception:
+                # O buffer permanece para a próxima execução; os demais solicitantes seguem
+                continue
+            if message_id:
+                message_ids.append(message_id)
+        return message_ids
+
+    def flush(self, requester_email):
+        """
+        Publica o digest de um solicitante e remove do buffer as notificações publicadas.
+
+        Args:
+            requester_email (str): E-mail do solicitante
+
+        Returns:
+            str: ID da mensagem publicada, ou None se não havia notificações ou outra
+                execução está publicando o mesmo buffer
+        """
+        claimed = self.store.claim(requester_email, self.clock())
+        if claimed is None:
+            return None
+        lease, notifications = claimed
+        if not notifications:
+            self.store.complete(requester_email, lease, notifications, self.clock())
+            return None
+
+        logger.info(f"Publicando digest de {len(notifications)} auditorias para {requester_email}")
+
+        try:
+            email_content = self.formatter.format_digest(requester_email, notifications)
+            message = {
+                'digest': True,
+                'audit_id': str(uuid.uuid4()),
+                'requester_email': requester_email,
+                'audit_ids': [n.get('audit_id') for n in notifications],
+                'summary': email_content['summary'],
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            message_id = self.publisher.publish_notification(
+                message=json.dumps(message),
+                subject=email_content['subject'],
+                email_message=email_content['body']
+            )
+
+        except Exception as e:
+            # Mantém as notificações no buffer para nova tentativa
+            self.store.release(requester_email, lease)
+            logger.error(f"Erro ao publicar digest para {requester_email}: {str(e)}", exc_info=True)
+            raise
+
+        self.store.complete(requester_email, lease, notifications, self.clock())
+        return message_id
+
+    def pending_count(self):
+        """Retorna a quantidade total de notificações aguardando publicação."""
+        return sum(count for _, _, count in self.store.iter_buffers())
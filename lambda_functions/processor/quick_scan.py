@@ -0,0 +1,224 @@
+"""
+Modos de análise rápida (quick-scan) do Data Sentinel.
+
+- full: percorre todas as linhas (comportamento padrão).
+- first_k: interrompe a varredura assim que K dados expostos são encontrados;
+  responde perguntas do tipo "o arquivo tem algum CPF não mascarado?".
+- sample: amostragem por reservatório dentro de um orçamento de linhas, com
+  estimativa do total de dados expostos e intervalo de confiança (t de Student).
+  Se o orçamento interromper a leitura sequencial, a estimativa cobre apenas o
+  trecho lido (escopo 'prefix', sem intervalo).
+"""
+
+import math
+import random
+
+MODE_FULL = 'full'
+MODE_FIRST_K = 'first_k'
+MODE_SAMPLE = 'sample'
+ANALYSIS_MODES = (MODE_FULL, MODE_FIRST_K, MODE_SAMPLE)
+
+DEFAULT_K = 1
+DEFAULT_SAMPLE_SIZE = 1000
+DEFAULT_ROW_BUDGET = 100000
+DEFAULT_CONFIDENCE = 0.95
+
+def validate_mode(mode):
+    """
+    Valida o modo de análise.
+
+    Args:
+        mode (str): Modo informado
+
+    Returns:
+        str: Modo validado
+
+    Raises:
+        ValueError: Se o modo não for suportado
+    """
+    mode = mode or MODE_FULL
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Modo de análise inválido: {mode}. Use um de: {', '.join(ANALYSIS_MODES)}")
+    return mode
+
+def reservoir_sample(items, sample_size, max_items=None, rng=None):
+    """
+    Amostragem por reservatório (algoritmo R) sobre um iterável.
+
+    Args:
+        items (iterable): Itens a amostrar
+        sample_size (int): Tamanho da amostra
+        max_items (int, optional): Orçamento de itens lidos; a leitura para ao atingi-lo
+        rng (random.Random, optional): Gerador de números aleatórios
+
+    Returns:
+        tuple: (amostra, itens lidos, True se o iterável foi lido até o fim)
+    """
+    rng = rng or random.Random()
+    reservoir = []
+    seen = 0
+    for item in items:
+        if max_items is not None and seen >= max_items:
+            return reservoir, seen, False
+        if seen < sample_size:
+            reservoir.append(item)
+        else:
+            index = rng.randint(0, seen)
+            if index < sample_size:
+                reservoir[index] = item
+        seen += 1
+    return reservoir, seen, True
+
+def _incomplete_beta(a, b, x):
+    # Função beta incompleta regularizada I_x(a, b), por fração contínua (Lentz)
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - _incomplete_beta(b, a, 1 - x)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log(1 - x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    fraction = d
+    for m in range(1, 200):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            fraction *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return front * fraction
+
+def student_t_quantile(probability, degrees_of_freedom):
+    """
+    Quantil da distribuição t de Student (sem dependências externas).
+
+    Args:
+        probability (float): Probabilidade acumulada (0 < p < 1)
+        degrees_of_freedom (int): Graus de liberdade
+
+    Returns:
+        float: t tal que P(T <= t) = probability
+    """
+    if probability < 0.5:
+        return -student_t_quantile(1 - probability, degrees_of_freedom)
+    df = float(degrees_of_freedom)
+
+    def upper_tail(t):
+        return 0.5 * _incomplete_beta(df / 2, 0.5, df / (df + t * t))
+
+    target = 1 - probability
+    low, high = 0.0, 1.0
+    while upper_tail(high) > target:
+        low, high = high, high * 2
+    for _ in range(100):
+        middle = (low + high) / 2
+        if upper_tail(middle) > target:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+def estimate_total(sample_counts, population_size, confidence=DEFAULT_CONFIDENCE, finite_population=True):
+    """
+    Estima o total populacional a partir das contagens por unidade amostrada.
+
+    Usa a média amostral expandida para a população, com intervalo pela
+    distribuição t de Student (n - 1 graus de liberdade) e correção para
+    população finita.
+
+    Args:
+        sample_counts (list): Contagem de dados expostos em cada unidade amostrada
+        population_size (float): Quantidade (estimada) de unidades na população
+        confidence (float): Nível de confiança do intervalo
+        finite_population (bool): Aplica a correção para população finita; desligada
+            quando as unidades são réplicas independentes da estimativa (ex.: janelas
+            de amostragem), e não uma amostra das unidades da população
+
+    Returns:
+        dict: estimate, lower e upper
+    """
+    n = len(sample_counts)
+    if n == 0 or population_size <= 0:
+        return {'estimate': 0, 'lower': 0, 'upper': 0}
+
+    mean = sum(sample_counts) / n
+    estimate = population_size * mean
+    if n < 2 or (finite_population and n >= population_size):
+        return {'estimate': round(estimate), 'lower': round(estimate), 'upper': round(estimate)}
+
+    variance = sum((x - mean) ** 2 for x in sample_counts) / (n - 1)
+    fpc = math.sqrt(max(0.0, 1 - n / population_size)) if finite_population else 1.0
+    standard_error = population_size * math.sqrt(variance / n) * fpc
+    t = student_t_quantile((1 + confidence) / 2, n - 1)
+    return {
+        'estimate': round(estimate),
+        'lower': max(0, math.floor(estimate - t * standard_error)),
+        'upper': math.ceil(estimate + t * standard_error)
+    }
+
+def scan_rows(rows, count_row, mode=MODE_FULL, k=DEFAULT_K, sample_size=DEFAULT_SAMPLE_SIZE,
+              row_budget=DEFAULT_ROW_BUDGET, progress=None, confidence=DEFAULT_CONFIDENCE, rng=None):
+    """
+    Conta dados expostos em linhas já parseadas conforme o modo de análise.
+
+    Args:
+        rows (iterable): Linhas a analisar
+        count_row (callable): Função que retorna quantos dados expostos há em uma linha
+        mode (str): 'full', 'first_k' ou 'sample'
+        k (int): Quantidade de achados que encerra o modo first_k
+        sample_size (int): Tamanho da amostra no modo sample
+        row_budget (int): Máximo de linhas lidas no modo sample
+        progress (callable, optional): Fração (0..1) do arquivo já lida; informa
+            quanto do arquivo o trecho amostrado cobre quando o orçamento interrompe a leitura
+        confidence (float): Nível de confiança do intervalo no modo sample
+        rng (random.Random, optional): Gerador de números aleatórios
+
+    Returns:
+        dict: mode, exposed, rows_scanned, complete e, no modo sample, o escopo
+            ('file' ou 'prefix') e os limites do intervalo (None no escopo 'prefix')
+    """
+    mode = validate_mode(mode)
+
+    if mode == MODE_SAMPLE:
+        sample, seen, complete = reservoir_sample(rows, sample_size, row_budget, rng)
+        counts = [count_row(row) for row in sample]
+        # A amostra vem só das linhas lidas: sem ler o arquivo inteiro, a estimativa
+        # vale para esse trecho inicial e não tem intervalo para o arquivo
+        bounds = estimate_total(counts, seen, confidence)
+        if not complete:
+            bounds['lower'] = bounds['upper'] = None
+        result = {
+            'mode': mode,
+            'scope': 'file' if complete else 'prefix',
+            'exposed': bounds['estimate'],
+            'lower': bounds['lower'],
+            'upper': bounds['upper'],
+            'confidence': confidence,
+            'sample_size': len(sample),
+            'rows_scanned': seen,
+            'estimated_rows': seen,
+            'complete': complete
+        }
+        if not complete and progress:
+            result['fraction_scanned'] = round(progress(), 4)
+        return result
+
+    exposed = 0
+    rows_scanned = 0
+    rows = iter(rows)
+    for row in rows:
+        rows_scanned += 1
+        exposed += count_row(row)
+        if mode == MODE_FIRST_K and exposed >= k:
+            # Completo apenas se a K-ésima exposição estava na última linha
+            complete = next(rows, None) is None
+            return {'mode': mode, 'exposed': exposed, 'rows_scanned': rows_scanned, 'complete': complete}
+
+    return {'mode': mode, 'exposed': exposed, 'rows_scanned': rows_scanned, 'complete': True}
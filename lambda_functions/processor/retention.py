@@ -0,0 +1,174 @@
+"""
+Retenção de auditorias e arquivos enviados no Data Sentinel.
+
+- DynamoDB: os itens recebem, na gravação, o atributo TTL 'expires_at'
+  (epoch em segundos); com o TTL habilitado na tabela, o próprio DynamoDB
+  remove os itens vencidos, sem custo de escrita.
+- S3: os uploads (e os sidecars de achados e índices de fingerprints) são
+  marcados com a tag de retenção e regras de ciclo de vida expiram os objetos
+  marcados após AUDIT_RETENTION_DAYS dias.
+- Varredura de órfãos: objetos de 'uploads/' que nenhuma auditoria referencia
+  (s3_path), por exemplo de itens removidos ou de uploads anteriores à tag,
+  são apagados em lotes de 1.000 chaves com DeleteObjects.
+
+Uso (configuração e varredura):
+    python -m lambda_functions.processor.retention --setup
+    python -m lambda_functions.processor.retention --sweep --dry-run
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from lambda_functions.notifier.utils.logger import setup_logger
+
+# Configuração de logging
+logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
+
+AUDIT_RETENTION_DAYS = int(os.environ.get('AUDIT_RETENTION_DAYS', '90'))
+TTL_ATTRIBUTE = 'expires_at'
+RETENTION_TAG_KEY = 'data-sentinel-retention'
+RETENTION_TAG_VALUE = 'standard'
+UPLOADS_PREFIX = os.environ.get('UPLOADS_PREFIX', 'uploads/')
+# Prefixos com objetos marcados para expiração (uploads, sidecars de achados e índices de fingerprints)
+RETENTION_PREFIXES = (UPLOADS_PREFIX, 'findings/', 'fingerprints/')
+# Uploads mais novos que isto não são órfãos: o item da auditoria é gravado após o upload
+ORPHAN_GRACE_SECONDS = int(os.environ.get('ORPHAN_GRACE_SECONDS', '86400'))
+
+def expiration_epoch(now=None, days=AUDIT_RETENTION_DAYS):
+    """
+    Calcula o instante de expiração (TTL do DynamoDB) de um item gravado agora.
+
+    Args:
+        now (float, optional): Instante da gravação (epoch); padrão: agora
+        days (int): Dias de retenção
+
+    Returns:
+        int: Epoch em segundos
+    """
+    return int((now if now is not None else time.time()) + days * 86400)
+
+def with_ttl(item, days=AUDIT_RETENTION_DAYS):
+    """
+    Acrescenta o atributo TTL a um item, se ainda não houver um.
+
+    Args:
+        item (dict): Item a gravar
+        days (int): Dias de retenção (0 desativa)
+
+    Returns:
+        dict: O próprio item
+    """
+    if days > 0 and TTL_ATTRIBUTE not in item:
+        item[TTL_ATTRIBUTE] = expiration_epoch(days=days)
+    return item
+
+def retention_tags():
+    """Tags aplicadas aos uploads para a expiração pela regra de ciclo de vida."""
+    return {RETENTION_TAG_KEY: RETENTION_TAG_VALUE}
+
+def lifecycle_rule(prefix=UPLOADS_PREFIX, days=AUDIT_RETENTION_DAYS):
+    """
+    Regra de ciclo de vida que expira os objetos do prefixo marcados com a tag de retenção.
+
+    Returns:
+        dict: Regra no formato de PutBucketLifecycleConfiguration
+    """
+    return {
+        'ID': f"data-sentinel-retention-{prefix.strip('/')}",
+        'Status': 'Enabled',
+        'Filter': {
+            'And': {
+                'Prefix': prefix,
+                'Tags': [{'Key': RETENTION_TAG_KEY, 'Value': RETENTION_TAG_VALUE}]
+            }
+        },
+        'Expiration': {'Days': days},
+        'AbortIncompleteMultipartUpload': {'DaysAfterInitiation': 1}
+    }
+
+class OrphanSweeper:
+    """Remove do S3 os uploads que nenhuma auditoria referencia."""
+
+    def __init__(self, s3_handler, audits_handler, prefix=UPLOADS_PREFIX, grace_seconds=ORPHAN_GRACE_SECONDS):
+        """
+        Inicializa a varredura.
+
+        Args:
+            s3_handler (S3Handler): Bucket dos uploads
+            audits_handler (DadosAuditoriaHandler): Tabela com os s3_path referenciados
+            prefix (str): Prefixo varrido
+            grace_seconds (int): Idade mínima de um objeto para ser considerado órfão
+        """
+        self.s3_handler = s3_handler
+        self.audits_handler = audits_handler
+        self.prefix = prefix
+        self.grace_seconds = grace_seconds
+
+    def find_orphans(self, now=None):
+        """
+        Lista (em páginas) os objetos do prefixo sem auditoria que os referencie.
+
+        Args:
+            now (datetime, optional): Instante de referência (UTC)
+
+        Yields:
+            str: Chave do objeto órfão
+        """
+        referenced = set(self.audits_handler.iter_s3_paths())
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=self.grace_seconds)
+        logger.info(f"{len(referenced)} objetos referenciados por auditorias")
+        for obj in self.s3_handler.list_objects(self.prefix):
+            if obj['Key'] not in referenced and obj['LastModified'] < cutoff:
+                yield obj['Key']
+
+    def sweep(self, dry_run=False, now=None):
+        """
+        Apaga os objetos órfãos em lotes de DeleteObjects.
+
+        Args:
+            dry_run (bool): Apenas conta os órfãos, sem apagar
+            now (datetime, optional): Instante de referência (UTC)
+
+        Returns:
+            dict: 'orphans' encontrados e 'deleted'
+        """
+        orphans = self.find_orphans(now)
+        if dry_run:
+            count = sum(1 for _ in orphans)
+            logger.info(f"Varredura (simulação): {count} objetos órfãos em {self.prefix}")
+            return {'orphans': count, 'deleted': 0}
+
+        counted = []
+
+        def counting(keys):
+            for key in keys:
+                counted.append(key)
+                yield key
+
+        deleted = self.s3_handler.delete_objects(counting(orphans))
+        logger.info(f"Varredura concluída: {deleted} de {len(counted)} objetos órfãos removidos")
+        return {'orphans': len(counted), 'deleted': deleted}
+
+def main():
+    from lambda_functions.processor.dados_auditoria_handler import DYNAMODB_TABLE_RESULT, DadosAuditoriaHandler
+    from lambda_functions.processor.s3_handler import S3Handler
+
+    parser = argparse.ArgumentParser(description="Retenção de auditorias e uploads do Data Sentinel")
+    parser.add_argument('--setup', action='store_true', help="Habilita o TTL da tabela e a regra de ciclo de vida")
+    parser.add_argument('--sweep', action='store_true', help="Remove os uploads órfãos")
+    parser.add_argument('--dry-run', action='store_true', help="Apenas conta os órfãos")
+    args = parser.parse_args()
+
+    s3_handler = S3Handler(os.environ.get('S3_BUCKET'))
+    audits_handler = DadosAuditoriaHandler(DYNAMODB_TABLE_RESULT)
+    if args.setup:
+        audits_handler.enable_ttl(TTL_ATTRIBUTE)
+        for prefix in RETENTION_PREFIXES:
+            s3_handler.put_lifecycle_rule(lifecycle_rule(prefix))
+    if args.sweep:
+        print(OrphanSweeper(s3_handler, audits_handler).sweep(dry_run=args.dry_run))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Reauditoria incremental por impressão digital (fingerprint) de linhas.
+
+Para cada arquivo (file_name) de cada solicitante é mantido no S3 um índice
+compacto que associa o hash de 64 bits de cada linha às contagens de dados
+sensíveis encontradas nela. Em um novo upload do mesmo arquivo, apenas as
+linhas cujo hash não está no índice são analisadas; as contagens das demais
+são reaproveitadas. O custo da auditoria diária passa a acompanhar a
+quantidade de linhas alteradas, não o tamanho do arquivo.
+
+Um filtro de Bloom responderia apenas "linha já vista", sem as contagens
+necessárias para somar o resultado das linhas mantidas; por isso o índice
+guarda hash e contagens (ordenado e comprimido com zlib).
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import struct
+import zlib
+from array import array
+from botocore.exceptions import ClientError
+
+from lambda_functions.processor.file_readers import CsvSource
+from lambda_functions.notifier.utils.logger import setup_logger
+from lambda_functions.processor.retention import retention_tags
+
+# Configuração de logging
+logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
+
+FINGERPRINT_PREFIX = os.environ.get('FINGERPRINT_PREFIX', 'fingerprints/')
+INDEX_MAGIC = b'DSFP'
+INDEX_VERSION = 1
+
+def row_fingerprint(line):
+    """
+    Calcula o hash de 64 bits de uma linha normalizada.
+
+    Args:
+        line (bytes): Linha CSV normalizada (ver file_readers.CsvSource)
+
+    Returns:
+        int: Hash da linha
+    """
+    digest = hashlib.blake2b(line.rstrip(b'\r\n'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def index_key(requester_email, file_name):
+    """Chave S3 do índice de um arquivo de um solicitante."""
+    owner = hashlib.sha256(requester_email.strip().lower().encode()).hexdigest()[:16]
+    return f"{FINGERPRINT_PREFIX}{owner}/{file_name}.fpi"
+
+class FingerprintIndex:
+    """Índice hash da linha -> contagens de dados sensíveis por tipo."""
+
+    def __init__(self, entries=None, digest=None):
+        """
+        Args:
+            entries (dict, optional): hash -> {tipo: quantidade}
+            digest (str, optional): Identificador do índice serializado de origem
+        """
+        self.entries = entries or {}
+        self.digest = digest
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self.entries
+
+    def get(self, fingerprint):
+        return self.entries.get(fingerprint)
+
+    def to_bytes(self):
+        """Serializa o índice: cabeçalho, tipos e registros (hash + contagens) ordenados, com zlib."""
+        types = sorted({data_type for counts in self.entries.values() for data_type in counts})
+        hashes = array('Q', sorted(self.entries))
+        counts = array('I')
+        for fingerprint in hashes:
+            row_counts = self.entries[fingerprint]
+            counts.extend(row_counts.get(data_type, 0) for data_type in types)
+
+        types_blob = json.dumps(types).encode()
+        header = INDEX_MAGIC + struct.pack('<BII', INDEX_VERSION, len(types_blob), len(hashes))
+        return header + zlib.compress(types_blob + hashes.tobytes() + counts.tobytes(), 6)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Reconstrói o índice serializado por to_bytes."""
+        if data[:4] != INDEX_MAGIC:
+            raise ValueError("Índice de fingerprints inválido")
+        version, types_size, size = struct.unpack_from('<BII', data, 4)
+        if version != INDEX_VERSION:
+            raise ValueError(f"Versão de índice não suportada: {version}")
+
+        payload = zlib.decompress(data[4 + struct.calcsize('<BII'):])
+        types = json.loads(payload[:types_size])
+        hashes = array('Q')
+        hashes.frombytes(payload[types_size:types_size + 8 * size])
+        counts = array('I')
+        counts.frombytes(payload[types_size + 8 * size:])
+
+        width = len(types)
+        entries = {}
+        for position, fingerprint in enumerate(hashes):
+            row = counts[position * width:(position + 1) * width]
+            entries[fingerprint] = {data_type: count for data_type, count in zip(types, row) if count}
+        return cls(entries, digest=hashlib.blake2b(data, digest_size=8).hexdigest())
+
+class FingerprintStore:
+    """Persistência dos índices de fingerprints no S3."""
+
+    def __init__(self, s3_handler):
+        self.s3_handler = s3_handler
+
+    def load(self, requester_email, file_name):
+        """
+        Carrega o índice da auditoria anterior do arquivo.
+
+        Returns:
+            FingerprintIndex: Índice, ou None se não houver auditoria anterior
+        """
+        key = index_key(requester_email, file_name)
+        try:
+            data = self.s3_handler.get_object_bytes(key)
+        except ClientError as e:
+            logger.info(f"Índice de fingerprints {key} indisponível: {str(e)}")
+            return None
+        try:
+            index = FingerprintIndex.from_bytes(data)
+        except (ValueError, zlib.error) as e:
+            logger.warning(f"Índice de fingerprints {key} ignorado: {str(e)}")
+            return None
+        logger.info(f"Índice de fingerprints carregado: {len(index)} linhas")
+        return index
+
+    def save(self, requester_email, file_name, index):
+        """Grava o índice do arquivo para a próxima auditoria."""
+        key = index_key(requester_email, file_name)
+        data = index.to_bytes()
+        self.s3_handler.put_object_bytes(key, data, tags=retention_tags())
+        logger.info(f"Índice de fingerprints salvo em {key} ({len(index)} linhas, {len(data)} bytes)")
+
+class DeltaRowMismatchError(ValueError):
+    """Achado do arquivo delta em uma linha que o plano não conhece."""
+
+class DeltaPlan:
+    """Resultado da comparação de um arquivo com o índice da auditoria anterior."""
+
+    def __init__(self, delta_path, new_fingerprints, carried, carried_summary, rows_total, rows_removed,
+                 new_rows=None):
+        self.delta_path = delta_path
+        self.new_fingerprints = new_fingerprints
+        # Linha no arquivo recebido de cada linha do delta (posição 1 -> new_rows[0])
+        self.new_rows = new_rows if new_rows is not None else list(range(1, len(new_fingerprints) + 1))
+        self.carried = carried
+        self.carried_summary = carried_summary
+        self.rows_total = rows_total
+        self.rows_removed = rows_removed
+
+    @property
+    def rows_new(self):
+        return len(self.new_fingerprints)
+
+    @property
+    def rows_carried(self):
+        return self.rows_total - self.rows_new
+
+    def original_row(self, position):
+        """
+        Converte uma linha do arquivo delta na linha correspondente do arquivo recebido.
+
+        Args:
+            position (int): Linha no delta (1 = primeira linha de dados)
+
+        Returns:
+            int: Linha no arquivo recebido (1 = primeira linha de dados)
+
+        Raises:
+            DeltaRowMismatchError: Se a posição não corresponder a uma linha do delta
+                (o detector numerou os registros de forma diferente do CsvSource)
+        """
+        if not 1 <= position <= len(self.new_rows):
+            raise DeltaRowMismatchError(
+                f"Linha {position} fora do arquivo delta ({len(self.new_rows)} linhas novas)"
+            )
+        return self.new_rows[position - 1]
+
+    def remap_findings(self, sensitive_data):
+        """
+        Renumera os achados da análise do delta para as linhas do arquivo recebido.
+
+        Args:
+            sensitive_data (list): Achados com 'row' relativo ao arquivo delta
+
+        Returns:
+            list: Cópias dos achados com 'row' no arquivo recebido (achados sem linha
+                são mantidos como estão)
+        """
+        remapped = []
+        for finding in sensitive_data:
+            if isinstance(finding, dict) and finding.get('row') is not None:
+                finding = dict(finding, row=self.original_row(int(finding['row'])))
+            remapped.append(finding)
+        return remapped
+
+    def stats(self):
+        return {
+            'rows_total': self.rows_total,
+            'rows_new': self.rows_new,
+            'rows_carried': self.rows_carried,
+            'rows_removed': self.rows_removed
+        }
+
+def build_delta(local_path, previous_index, delta_path, filename=None):
+    """
+    Separa as linhas novas (a analisar) das já conhecidas pelo índice anterior.
+
+    As linhas novas são gravadas, normalizadas, em delta_path (com o cabeçalho),
+    na ordem do arquivo; o arquivo é determinístico para o mesmo par
+    (arquivo, índice), o que mantém válidos os checkpoints da análise.
+
+    Args:
+        local_path (str | file): Caminho ou stream binário do arquivo recebido
+        previous_index (FingerprintIndex): Índice anterior (None: todas as linhas são novas)
+        delta_path (str | file): Caminho ou stream binário (ex.: io.BytesIO) do CSV
+            com as linhas a analisar
+        filename (str, optional): Nome usado para detectar o formato
+
+    Returns:
+        DeltaPlan: Plano da auditoria incremental
+    """
+    previous_index = previous_index or FingerprintIndex()
+    new_fingerprints = []
+    new_rows = []
+    carried = {}
+    carried_summary = {}
+    seen = set()
+    rows_total = 0
+
+    in_memory = not isinstance(delta_path, (str, os.PathLike))
+    with CsvSource(local_path, filename) as source, \
+            (contextlib.nullcontext(delta_path) if in_memory else open(delta_path, 'wb')) as delta:
+        delta.seek(0)
+        delta.truncate()
+        delta.write(source.header)
+        for line in source:
+            rows_total += 1
+            fingerprint = row_fingerprint(line)
+            seen.add(fingerprint)
+            counts = previous_index.get(fingerprint)
+            if counts is None:
+                new_fingerprints.append(fingerprint)
+                new_rows.append(rows_total)
+                delta.write(line if line.endswith(b'\n') else line + b'\n')
+                continue
+            carried[fingerprint] = counts
+            for data_type, count in counts.items():
+                carried_summary[data_type] = carried_summary.get(data_type, 0) + count
+
+    rows_removed = sum(1 for fingerprint in previous_index.entries if fingerprint not in seen)
+    plan = DeltaPlan(delta_path, new_fingerprints, carried, carried_summary, rows_total, rows_removed, new_rows)
+    logger.info(f"Reauditoria incremental: {plan.stats()}")
+    return plan
+
+def per_row_counts(sensitive_data):
+    """
+    Agrupa os achados por linha.
+
+    Args:
+        sensitive_data (list): Achados com 'row' (1 = primeira linha de dados) e 'type'
+
+    Returns:
+        dict: linha -> {tipo: quantidade}, ou None se algum achado não indicar a linha
+    """
+    rows = {}
+    for finding in sensitive_data:
+        if not isinstance(finding, dict) or finding.get('row') is None or not finding.get('type'):
+            return None
+        counts = rows.setdefault(int(finding['row']), {})
+        counts[finding['type']] = counts.get(finding['type'], 0) + 1
+    return rows
+
+def merge_index(plan, sensitive_data, previous_index=None):
+    """
+    Monta o índice da auditoria atual: linhas mantidas + linhas novas analisadas.
+
+    Args:
+        plan (DeltaPlan): Plano usado na análise
+        sensitive_data (list): Achados da análise do arquivo delta, já renumerados para
+            as linhas do arquivo recebido (DeltaPlan.remap_findings)
+        previous_index (FingerprintIndex, optional): Índice anterior, mantido se as
+            linhas novas não puderem ser atribuídas
+
+    Returns:
+        FingerprintIndex: Novo índice, ou previous_index se os achados não indicarem a linha
+    """
+    rows = per_row_counts(sensitive_data)
+    if rows is None:
+        logger.warning("Achados sem indicação de linha; índice de fingerprints não atualizado")
+        return previous_index
+
+    entries = dict(plan.carried)
+    for fingerprint, row in zip(plan.new_fingerprints, plan.new_rows):
+        entries[fingerprint] = rows.get(row, {})
+    return FingerprintIndex(entries)
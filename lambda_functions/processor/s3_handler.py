@@ -3,9 +3,14 @@ Manipulação de arquivos no Amazon S3 para o Data Sentinel.
 """
 
 import boto3
+import hashlib
+import io
 import logging
 import os
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
+from datetime import datetime, timezone
+from urllib.parse import urlencode
 from dotenv import load_dotenv
 import os
 
@@ -16,9 +21,88 @@ from lambda_functions.notifier.utils.logger import setup_logger
 # Configuração de logging
 logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
 
+# Transferências multipart: acima do limite o arquivo é dividido em partes enviadas em paralelo
+S3_MULTIPART_THRESHOLD = int(os.environ.get('S3_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+S3_MULTIPART_CHUNKSIZE = int(os.environ.get('S3_MULTIPART_CHUNKSIZE', str(8 * 1024 * 1024)))
+S3_MAX_CONCURRENCY = int(os.environ.get('S3_MAX_CONCURRENCY', '10'))
+
+# Limite de chaves por chamada de DeleteObjects
+DELETE_BATCH_SIZE = 1000
+
+# Objetos até este tamanho são processados em memória, sem passar pelo /tmp
+S3_IN_MEMORY_MAX_BYTES = int(os.environ.get('S3_IN_MEMORY_MAX_BYTES', str(16 * 1024 * 1024)))
+
+# Tamanho de cada GET com Range na leitura sob demanda (open_stream)
+S3_RANGE_BLOCK_BYTES = int(os.environ.get('S3_RANGE_BLOCK_BYTES', str(1024 * 1024)))
+
+def build_transfer_config(multipart_threshold=S3_MULTIPART_THRESHOLD, multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+                          max_concurrency=S3_MAX_CONCURRENCY):
+    """
+    Cria a configuração das transferências gerenciadas do boto3.
+
+    Args:
+        multipart_threshold (int): Tamanho a partir do qual a transferência é multipart
+        multipart_chunksize (int): Tamanho de cada parte
+        max_concurrency (int): Partes transferidas em paralelo
+
+    Returns:
+        TransferConfig: Configuração de transferência
+    """
+    return TransferConfig(
+        multipart_threshold=multipart_threshold,
+        multipart_chunksize=multipart_chunksize,
+        max_concurrency=max_concurrency,
+        use_threads=max_concurrency > 1
+    )
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Leitura sob demanda de um objeto do S3, com seek, por meio de GETs com Range.
+
+    Apenas os blocos efetivamente lidos são transferidos: uma análise rápida
+    (first_k/sample) ou a leitura do rodapé de um Parquet não baixam o objeto inteiro.
+    """
+
+    def __init__(self, s3_handler, s3_key, size):
+        self._s3_handler = s3_handler
+        self._s3_key = s3_key
+        self._size = size
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(0, offset)
+        return self._position
+
+    def readinto(self, buffer):
+        if self._position >= self._size or not len(buffer):
+            return 0
+        end = min(self._size, self._position + len(buffer)) - 1
+        data = self._s3_handler.get_range(self._s3_key, self._position, end)
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+def open_range_stream(s3_handler, s3_key, size, block_bytes=S3_RANGE_BLOCK_BYTES):
+    """Stream binário (com seek) sobre um objeto do S3, lido em blocos de block_bytes via get_range."""
+    return io.BufferedReader(S3RangeReader(s3_handler, s3_key, size), buffer_size=block_bytes)
+
 class S3Handler:
-    def __init__(self, bucket_name):
+    def __init__(self, bucket_name, transfer_config=None):
         self.bucket_name = bucket_name
+        self.transfer_config = transfer_config or build_transfer_config()
         self.s3_client = boto3.client(
             's3',
             aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
@@ -26,13 +110,18 @@ class S3Handler:
             region_name=os.getenv('AWS_REGION')  
         )
 
-    def upload_file(self, file_path, s3_key):
+    @staticmethod
+    def _extra_args(tags):
+        return {'Tagging': urlencode(tags)} if tags else None
+
+    def upload_file(self, file_path, s3_key, tags=None):
         """
         Faz upload de um arquivo para o S3.
         
         Args:
             file_path (str): Caminho do arquivo local
             s3_key (str): Chave do objeto no S3
+            tags (dict, optional): Tags do objeto (ex.: retenção)
             
         Returns:
             str: URL do arquivo no S3
@@ -40,7 +129,8 @@ class S3Handler:
         logger.info(f"Iniciando upload do arquivo {file_path} para S3 com chave {s3_key}")
         
         try:
-            self.s3_client.upload_file(file_path, self.bucket_name, s3_key)
+            self.s3_client.upload_file(file_path, self.bucket_name, s3_key, Config=self.transfer_config,
+                                       ExtraArgs=self._extra_args(tags))
             
             # Gera URL do arquivo
             url = f"https://{self.bucket_name}.s3.amazonaws.com/{s3_key}"
@@ -69,7 +159,7 @@ class S3Handler:
             # Garante que o diretório de destino existe
             os.makedirs(os.path.dirname(local_path), exist_ok=True)
             
-            self.s3_client.download_file(self.bucket_name, s3_key, local_path)
+            self.s3_client.download_file(self.bucket_name, s3_key, local_path, Config=self.transfer_config)
             logger.info(f"Download concluído com sucesso: {local_path}")
             
             return local_path
@@ -78,6 +168,169 @@ class S3Handler:
             logger.error(f"Erro ao fazer download do arquivo do S3: {str(e)}", exc_info=True)
             raise
             
+    def upload_fileobj(self, fileobj, s3_key, tags=None):
+        """
+        Faz upload de um buffer em memória ou stream binário para o S3.
+        
+        Args:
+            fileobj: Objeto binário com read() (ex.: io.BytesIO)
+            s3_key (str): Chave do objeto no S3
+            tags (dict, optional): Tags do objeto (ex.: retenção)
+            
+        Returns:
+            str: URL do arquivo no S3
+        """
+        logger.info(f"Iniciando upload em memória para S3 com chave {s3_key}")
+        
+        try:
+            self.s3_client.upload_fileobj(fileobj, self.bucket_name, s3_key, Config=self.transfer_config,
+                                          ExtraArgs=self._extra_args(tags))
+            
+            url = f"https://{self.bucket_name}.s3.amazonaws.com/{s3_key}"
+            logger.info(f"Upload concluído com sucesso. URL: {url}")
+            
+            return url
+            
+        except ClientError as e:
+            logger.error(f"Erro ao fazer upload do arquivo para S3: {str(e)}", exc_info=True)
+            raise
+            
+    def download_fileobj(self, s3_key, fileobj=None):
+        """
+        Faz download de um arquivo do S3 para um buffer em memória ou stream binário.
+        
+        Args:
+            s3_key (str): Chave do objeto no S3
+            fileobj (optional): Objeto binário com write(); padrão: novo io.BytesIO
+            
+        Returns:
+            Objeto binário com o conteúdo, posicionado no início quando possível
+        """
+        logger.info(f"Iniciando download em memória do arquivo S3 {s3_key}")
+        
+        try:
+            fileobj = fileobj if fileobj is not None else io.BytesIO()
+            self.s3_client.download_fileobj(self.bucket_name, s3_key, fileobj, Config=self.transfer_config)
+            if fileobj.seekable():
+                fileobj.seek(0)
+            logger.info("Download concluído com sucesso")
+            
+            return fileobj
+            
+        except ClientError as e:
+            logger.error(f"Erro ao fazer download do arquivo do S3: {str(e)}", exc_info=True)
+            raise
+            
+    def get_range(self, s3_key, start, end=None):
+        """
+        Lê um intervalo de bytes de um objeto do S3 (GET com cabeçalho Range).
+        
+        Args:
+            s3_key (str): Chave do objeto no S3
+            start (int): Primeiro byte (inclusive); negativo lê os últimos -start bytes
+            end (int, optional): Último byte (inclusive); padrão: até o fim do objeto
+            
+        Returns:
+            bytes: Conteúdo do intervalo
+        """
+        if start < 0:
+            byte_range = f"bytes={start}"
+        else:
+            byte_range = f"bytes={start}-" + ("" if end is None else str(end))
+        logger.info(f"Lendo intervalo {byte_range} do arquivo S3 {s3_key}")
+        
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key, Range=byte_range)
+            return response['Body'].read()
+            
+        except ClientError as e:
+            logger.error(f"Erro ao ler intervalo do arquivo do S3: {str(e)}", exc_info=True)
+            raise
+            
+    def open_stream(self, s3_key, size=None):
+        """
+        Abre um objeto do S3 para leitura sob demanda (blocos via get_range).
+        
+        Args:
+            s3_key (str): Chave do objeto no S3
+            size (int, optional): Tamanho do objeto; padrão: obtido com HeadObject
+            
+        Returns:
+            io.BufferedReader: Stream binário com seek
+        """
+        if size is None:
+            size = self.get_object_metadata(s3_key)['ContentLength']
+        logger.info(f"Abrindo leitura sob demanda do arquivo S3 {s3_key} ({size} bytes)")
+        return open_range_stream(self, s3_key, size)
+            
+    def get_object_bytes(self, s3_key):
+        """
+        Lê o conteúdo de um objeto do S3 em memória (sem passar pelo disco).
+        
+        Args:
+            s3_key (str): Chave do objeto no S3
+            
+        Returns:
+            bytes: Conteúdo do objeto
+        """
+        logger.info(f"Lendo arquivo S3 {s3_key} em memória")
+        
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
+            return response['Body'].read()
+            
+        except ClientError as e:
+            logger.error(f"Erro ao ler arquivo do S3: {str(e)}", exc_info=True)
+            raise
+            
+    def put_object_bytes(self, s3_key, data, tags=None):
+        """
+        Grava um conteúdo em memória como objeto do S3.
+        
+        Args:
+            s3_key (str): Chave do objeto no S3
+            data (bytes): Conteúdo do objeto
+            tags (dict, optional): Tags do objeto (ex.: retenção)
+            
+        Returns:
+            str: ETag (sem aspas) do objeto gravado
+        """
+        logger.info(f"Gravando {len(data)} bytes no arquivo S3 {s3_key}")
+        
+        try:
+            response = self.s3_client.put_object(Bucket=self.bucket_name, Key=s3_key, Body=data,
+                                                 **(self._extra_args(tags) or {}))
+            return response['ETag'].strip('"')
+            
+        except ClientError as e:
+            logger.error(f"Erro ao gravar arquivo no S3: {str(e)}", exc_info=True)
+            raise
+            
+    def get_object_metadata(self, s3_key):
+        """
+        Obtém os metadados de um objeto do S3 sem baixar o conteúdo.
+        
+        Args:
+            s3_key (str): Chave do objeto no S3
+            
+        Returns:
+            dict: ETag (sem aspas), LastModified e ContentLength do objeto
+        """
+        logger.info(f"Obtendo metadados do arquivo S3 {s3_key}")
+        
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+            
+            return {
+                'ETag': response['ETag'].strip('"'),
+                'LastModified': response['LastModified'],
+                'ContentLength': response['ContentLength']
+            }
+            
+        except ClientError as e:
+            logger.error(f"Erro ao obter metadados do arquivo do S3: {str(e)}", exc_info=True)
+            raise
+            
     def delete_file(self, s3_key):
         """
         Remove um arquivo do S3.
@@ -128,3 +381,176 @@ class S3Handler:
         except ClientError as e:
             logger.error(f"Erro ao listar arquivos no S3: {str(e)}", exc_info=True)
             raise
+
+    def list_objects(self, prefix=""):
+        """
+        Lista, página a página, os objetos do bucket com um prefixo.
+        
+        Args:
+            prefix (str): Prefixo para filtrar os objetos
+            
+        Yields:
+            dict: Objeto (Key, LastModified, Size, ...)
+        """
+        logger.info(f"Listando objetos no bucket {self.bucket_name} com prefixo {prefix}")
+        
+        try:
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                yield from page.get('Contents', [])
+                
+        except ClientError as e:
+            logger.error(f"Erro ao listar objetos no S3: {str(e)}", exc_info=True)
+            raise
+            
+    def delete_objects(self, keys):
+        """
+        Remove objetos do S3 em lotes de até 1.000 chaves (DeleteObjects).
+        
+        Args:
+            keys (iterable): Chaves dos objetos
+            
+        Returns:
+            int: Quantidade de objetos removidos
+        """
+        deleted = 0
+        batch = []
+        
+        def flush(batch):
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+            for error in response.get('Errors', []):
+                logger.error(f"Erro ao remover {error.get('Key')} do S3: {error.get('Code')} {error.get('Message')}")
+            return len(batch) - len(response.get('Errors', []))
+        
+        try:
+            for key in keys:
+                batch.append(key)
+                if len(batch) == DELETE_BATCH_SIZE:
+                    deleted += flush(batch)
+                    batch = []
+            if batch:
+                deleted += flush(batch)
+            logger.info(f"{deleted} objetos removidos do S3")
+            
+            return deleted
+            
+        except ClientError as e:
+            logger.error(f"Erro ao remover objetos do S3: {str(e)}", exc_info=True)
+            raise
+            
+    def put_lifecycle_rule(self, rule):
+        """
+        Cria ou substitui (pelo ID) uma regra de ciclo de vida do bucket, mantendo as demais.
+        
+        Args:
+            rule (dict): Regra no formato de PutBucketLifecycleConfiguration
+        """
+        logger.info(f"Configurando regra de ciclo de vida {rule['ID']} no bucket {self.bucket_name}")
+        
+        try:
+            try:
+                rules = self.s3_client.get_bucket_lifecycle_configuration(Bucket=self.bucket_name)['Rules']
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'NoSuchLifecycleConfiguration':
+                    raise
+                rules = []
+            rules = [existing for existing in rules if existing.get('ID') != rule['ID']] + [rule]
+            self.s3_client.put_bucket_lifecycle_configuration(
+                Bucket=self.bucket_name,
+                LifecycleConfiguration={'Rules': rules}
+            )
+            logger.info("Regra de ciclo de vida configurada com sucesso")
+            
+        except ClientError as e:
+            logger.error(f"Erro ao configurar ciclo de vida do bucket: {str(e)}", exc_info=True)
+            raise
+
+class LocalS3Handler:
+    """Substituto local do S3Handler que guarda os objetos em memória (testes e execução offline)."""
+
+    def __init__(self, bucket_name='local'):
+        self.bucket_name = bucket_name
+        self.objects = {}
+
+    def _get(self, s3_key, operation):
+        if s3_key not in self.objects:
+            # Mesmo erro do S3 para chaves inexistentes: os chamadores tratam ClientError
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': f"Chave {s3_key} inexistente"}}, operation)
+        return self.objects[s3_key]
+
+    def put_object_bytes(self, s3_key, data, tags=None):
+        """Grava o conteúdo em memória com a mesma assinatura do S3Handler."""
+        data = bytes(data)
+        etag = hashlib.md5(data).hexdigest()
+        self.objects[s3_key] = {
+            'Body': data,
+            'Tags': dict(tags or {}),
+            'ETag': etag,
+            'LastModified': datetime.now(timezone.utc)
+        }
+        logger.info(f"{len(data)} bytes gravados localmente em {s3_key}")
+        return etag
+
+    def upload_file(self, file_path, s3_key, tags=None):
+        with open(file_path, 'rb') as f:
+            self.put_object_bytes(s3_key, f.read(), tags)
+        return f"local://{self.bucket_name}/{s3_key}"
+
+    def upload_fileobj(self, fileobj, s3_key, tags=None):
+        self.put_object_bytes(s3_key, fileobj.read(), tags)
+        return f"local://{self.bucket_name}/{s3_key}"
+
+    def download_file(self, s3_key, local_path):
+        data = self._get(s3_key, 'GetObject')['Body']
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, 'wb') as f:
+            f.write(data)
+        return local_path
+
+    def download_fileobj(self, s3_key, fileobj=None):
+        fileobj = fileobj if fileobj is not None else io.BytesIO()
+        fileobj.write(self._get(s3_key, 'GetObject')['Body'])
+        if fileobj.seekable():
+            fileobj.seek(0)
+        return fileobj
+
+    def get_range(self, s3_key, start, end=None):
+        data = self._get(s3_key, 'GetObject')['Body']
+        if start < 0:
+            return data[start:]
+        return data[start:None if end is None else end + 1]
+
+    def open_stream(self, s3_key, size=None):
+        if size is None:
+            size = len(self._get(s3_key, 'HeadObject')['Body'])
+        return open_range_stream(self, s3_key, size)
+
+    def get_object_bytes(self, s3_key):
+        return self._get(s3_key, 'GetObject')['Body']
+
+    def get_object_metadata(self, s3_key):
+        obj = self._get(s3_key, 'HeadObject')
+        return {'ETag': obj['ETag'], 'LastModified': obj['LastModified'], 'ContentLength': len(obj['Body'])}
+
+    def delete_file(self, s3_key):
+        self.objects.pop(s3_key, None)
+        return True
+
+    def list_files(self, prefix=""):
+        return sorted(key for key in self.objects if key.startswith(prefix))
+
+    def list_objects(self, prefix=""):
+        for key in self.list_files(prefix):
+            obj = self.objects[key]
+            yield {'Key': key, 'LastModified': obj['LastModified'], 'Size': len(obj['Body']), 'ETag': obj['ETag']}
+
+    def delete_objects(self, keys):
+        deleted = 0
+        # Como no S3, remover uma chave inexistente não é erro
+        for key in keys:
+            self.objects.pop(key, None)
+            deleted += 1
+        return deleted
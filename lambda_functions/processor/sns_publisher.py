@@ -0,0 +1,87 @@
+"""
+Publicação de notificações no Amazon SNS para o Data Sentinel.
+"""
+
+import boto3
+import json
+import os
+import uuid
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from lambda_functions.notifier.utils.logger import setup_logger
+
+# Configuração de logging
+logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
+
+class SNSPublisher:
+    """Classe responsável pela publicação de mensagens no Amazon SNS."""
+
+    def __init__(self, topic_arn):
+        """Inicializa o publicador de SNS.
+
+        Args:
+            topic_arn (str): ARN do tópico SNS
+        """
+        self.topic_arn = topic_arn
+        self.sns_client = boto3.client(
+            'sns',
+            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            region_name=os.getenv('AWS_REGION')
+        )
+
+    def publish_notification(self, message, subject, email_message=None):
+        """
+        Publica uma notificação no tópico SNS.
+
+        Args:
+            message (str): Mensagem (JSON) entregue aos assinantes
+            subject (str): Assunto da notificação
+            email_message (str, optional): Texto entregue aos assinantes de e-mail.
+                Quando informado, a mensagem é publicada com MessageStructure='json'.
+
+        Returns:
+            str: ID da mensagem publicada
+        """
+        logger.info(f"Publicando notificação no tópico SNS {self.topic_arn}")
+
+        try:
+            params = {
+                'TopicArn': self.topic_arn,
+                'Subject': subject[:100],  # Limite do SNS para o assunto
+                'Message': message
+            }
+            if email_message is not None:
+                params['Message'] = json.dumps({'default': message, 'email': email_message})
+                params['MessageStructure'] = 'json'
+
+            response = self.sns_client.publish(**params)
+            logger.info(f"Notificação publicada com sucesso: {response['MessageId']}")
+
+            return response['MessageId']
+
+        except ClientError as e:
+            logger.error(f"Erro ao publicar notificação no SNS: {str(e)}", exc_info=True)
+            raise
+
+class LocalSNSPublisher:
+    """Substituto local do SNSPublisher que guarda as mensagens em memória (testes e execução offline)."""
+
+    def __init__(self, topic_arn='local'):
+        self.topic_arn = topic_arn
+        self.messages = []
+
+    def publish_notification(self, message, subject, email_message=None):
+        """Registra a notificação em memória com a mesma assinatura do SNSPublisher."""
+        message_id = str(uuid.uuid4())
+        self.messages.append({
+            'MessageId': message_id,
+            'Subject': subject[:100],
+            'Message': message,
+            'EmailMessage': email_message
+        })
+        logger.info(f"Notificação registrada localmente: {message_id}")
+        return message_id
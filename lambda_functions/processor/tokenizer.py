@@ -0,0 +1,135 @@
+"""
+Tokenização determinística de dados sensíveis no Data Sentinel.
+
+Alternativa ao mascaramento (que mantém apenas os dois últimos caracteres): cada
+valor é substituído por um token HMAC-SHA256 com chave secreta. O mesmo valor
+gera o mesmo token em qualquer arquivo ou auditoria, o que permite cruzar dados
+mascarados sem expor o original; sem a chave, o token não pode ser revertido
+nem recalculado a partir de valores candidatos.
+
+Antes do HMAC o valor é normalizado pelo tipo (apenas dígitos para CPF, RG,
+cartão e telefone; minúsculas para e-mail), de modo que '529.982.247-25' e
+'52998224725' geram o mesmo token. Um memo LRU limitado (TOKEN_MEMO_SIZE
+valores) evita recalcular o HMAC de valores repetidos.
+
+Ativação: MASKING_MODE=token e TOKENIZATION_KEY com a chave secreta.
+"""
+
+import hashlib
+import hmac
+import os
+from functools import lru_cache
+
+from lambda_functions.notifier.utils.logger import setup_logger
+
+# Configuração de logging
+logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
+
+MASKING_MODE = os.environ.get('MASKING_MODE', 'mask')
+TOKENIZATION_KEY = os.environ.get('TOKENIZATION_KEY', '')
+TOKEN_MEMO_SIZE = int(os.environ.get('TOKEN_MEMO_SIZE', '65536'))
+TOKEN_LENGTH = int(os.environ.get('TOKEN_LENGTH', '16'))
+TOKEN_PREFIX = 'tk_'
+
+# Tipos normalizados para apenas dígitos (e o 'X' final do RG); inclui os nomes de coluna da API
+DIGIT_TYPES = ('cpf', 'rg', 'cartao', 'cartao_credito', 'telefone')
+_NON_DIGITS = str.maketrans('', '', ' .()+-/')
+
+def normalize_value(value, data_type=None):
+    """
+    Normaliza um valor para a tokenização, conforme o tipo.
+
+    Args:
+        value (str): Valor original
+        data_type (str, optional): Tipo do dado (ex.: 'cpf', 'email')
+
+    Returns:
+        str: Valor normalizado
+    """
+    value = str(value).strip()
+    if data_type in DIGIT_TYPES:
+        return value.translate(_NON_DIGITS).upper()
+    if data_type == 'email':
+        return value.lower()
+    return value
+
+class Tokenizer:
+    """Gera tokens determinísticos (HMAC-SHA256) com memo LRU limitado."""
+
+    def __init__(self, key, memo_size=TOKEN_MEMO_SIZE, length=TOKEN_LENGTH):
+        """
+        Inicializa o tokenizador.
+
+        Args:
+            key (str | bytes): Chave secreta do HMAC
+            memo_size (int): Valores mantidos no memo LRU
+            length (int): Caracteres hexadecimais do token (até 64)
+
+        Raises:
+            ValueError: Se a chave estiver vazia
+        """
+        if not key:
+            raise ValueError("TOKENIZATION_KEY é obrigatória para a tokenização")
+        self._key = key.encode('utf-8') if isinstance(key, str) else bytes(key)
+        self.length = length
+        # Memo por instância: cada execução (auditoria ou processo da API) tem o seu
+        self._token = lru_cache(maxsize=memo_size)(self._compute)
+
+    def _compute(self, normalized):
+        digest = hmac.new(self._key, normalized.encode('utf-8'), hashlib.sha256).hexdigest()
+        return TOKEN_PREFIX + digest[:self.length]
+
+    def token(self, value, data_type=None):
+        """
+        Retorna o token de um valor.
+
+        Args:
+            value (str): Valor original
+            data_type (str, optional): Tipo do dado, usado na normalização
+
+        Returns:
+            str: Token ('tk_' + hexadecimal)
+        """
+        return self._token(normalize_value(value, data_type))
+
+    def tokenize_findings(self, findings):
+        """
+        Substitui o 'value' de cada achado pelo seu token.
+
+        Args:
+            findings (list): Achados com 'type' e 'value' (ou apenas os valores)
+
+        Returns:
+            list: Cópias dos achados com 'value' tokenizado
+        """
+        tokenized = []
+        for finding in findings:
+            if not isinstance(finding, dict):
+                tokenized.append(self.token(finding))
+                continue
+            finding = dict(finding)
+            if finding.get('value'):
+                finding['value'] = self.token(finding['value'], finding.get('type'))
+            tokenized.append(finding)
+        info = self.memo_info()
+        logger.info(f"{len(tokenized)} achados tokenizados (memo: {info.hits} reutilizados, {info.misses} calculados)")
+        return tokenized
+
+    def memo_info(self):
+        """Estatísticas do memo (hits, misses, maxsize, currsize)."""
+        return self._token.cache_info()
+
+def get_tokenizer(mode=MASKING_MODE, key=TOKENIZATION_KEY):
+    """
+    Cria o tokenizador configurado no ambiente.
+
+    Returns:
+        Tokenizer se MASKING_MODE=token, senão None (mascaramento)
+
+    Raises:
+        ValueError: Se MASKING_MODE=token sem TOKENIZATION_KEY
+    """
+    if mode != 'token':
+        return None
+    logger.info("Tokenização determinística ativada para o mascaramento")
+    return Tokenizer(key)
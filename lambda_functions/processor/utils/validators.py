@@ -5,7 +5,8 @@ Módulo de utilitários para validação de eventos no Data Sentinel.
 import logging
 import os
 
-from utils.logger import setup_logger
+from lambda_functions.processor.utils.logger import setup_logger
+from lambda_functions.processor.file_readers import SUPPORTED_EXTENSIONS, is_supported
 
 # Configuração de logging
 logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
@@ -35,8 +36,8 @@ def validate_event(event):
             raise ValueError(error_message)
     
     # Validações específicas
-    if not event['file_key'].endswith('.csv'):
-        error_message = "O arquivo deve ter extensão .csv"
+    if not is_supported(event['file_key']):
+        error_message = f"O arquivo deve ter uma das extensões: {', '.join(SUPPORTED_EXTENSIONS)}"
         logger.error(error_message)
         raise ValueError(error_message)
     
@@ -45,5 +46,10 @@ def validate_event(event):
         logger.error(error_message)
         raise ValueError(error_message)
     
+    if event.get('analysis_mode', 'full') not in ('full', 'first_k', 'sample'):
+        error_message = "Modo de análise inválido: use full, first_k ou sample"
+        logger.error(error_message)
+        raise ValueError(error_message)
+    
     logger.info("Evento validado com sucesso")
     return True
@@ -0,0 +1,195 @@
+"""
+Fila de trabalhos de auditoria do Data Sentinel.
+
+A API enfileira um trabalho por upload e os workers (worker.py ou a Lambda com
+trigger SQS) consomem os trabalhos em lote. Em produção a fila é o Amazon SQS;
+para desenvolvimento local existe uma implementação em SQLite com a mesma interface.
+"""
+
+import boto3
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from lambda_functions.notifier.utils.logger import setup_logger
+
+# Configuração de logging
+logger = setup_logger(__name__, os.environ.get('LOG_LEVEL', 'INFO'))
+
+WORK_QUEUE_URL = os.environ.get('WORK_QUEUE_URL')
+WORK_QUEUE_DB = os.environ.get('WORK_QUEUE_DB', os.path.join(tempfile.gettempdir(), 'data-sentinel-queue.db'))
+VISIBILITY_TIMEOUT = int(os.environ.get('WORK_QUEUE_VISIBILITY_TIMEOUT', '900'))
+
+class SQSWorkQueue:
+    """Fila de trabalhos baseada no Amazon SQS."""
+
+    def __init__(self, queue_url, visibility_timeout=VISIBILITY_TIMEOUT):
+        """Inicializa a fila SQS.
+
+        Args:
+            queue_url (str): URL da fila SQS
+            visibility_timeout (int): Tempo (s) que uma mensagem recebida fica invisível
+        """
+        self.queue_url = queue_url
+        self.visibility_timeout = visibility_timeout
+        self.sqs_client = boto3.client(
+            'sqs',
+            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            region_name=os.getenv('AWS_REGION')
+        )
+
+    def enqueue(self, job):
+        """
+        Enfileira um trabalho.
+
+        Args:
+            job (dict): Dados do trabalho (serializáveis em JSON)
+
+        Returns:
+            str: ID da mensagem
+        """
+        logger.info(f"Enfileirando trabalho para {job.get('file_key')}")
+        try:
+            response = self.sqs_client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(job))
+            return response['MessageId']
+        except ClientError as e:
+            logger.error(f"Erro ao enfileirar trabalho no SQS: {str(e)}", exc_info=True)
+            raise
+
+    def receive(self, max_messages=10, wait_seconds=20):
+        """
+        Recebe um lote de trabalhos (long polling).
+
+        Args:
+            max_messages (int): Quantidade máxima de trabalhos (até 10 no SQS)
+            wait_seconds (int): Tempo máximo de espera por mensagens
+
+        Returns:
+            list: Tuplas (receipt, job, receive_count)
+        """
+        try:
+            response = self.sqs_client.receive_message(
+                QueueUrl=self.queue_url,
+                MaxNumberOfMessages=min(max_messages, 10),
+                WaitTimeSeconds=wait_seconds,
+                VisibilityTimeout=self.visibility_timeout,
+                AttributeNames=['ApproximateReceiveCount']
+            )
+            return [
+                (message['ReceiptHandle'], json.loads(message['Body']),
+                 int(message.get('Attributes', {}).get('ApproximateReceiveCount', 1)))
+                for message in response.get('Messages', [])
+            ]
+        except ClientError as e:
+            logger.error(f"Erro ao receber trabalhos do SQS: {str(e)}", exc_info=True)
+            raise
+
+    def ack(self, receipt):
+        """Remove da fila um trabalho concluído."""
+        try:
+            self.sqs_client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt)
+        except ClientError as e:
+            logger.error(f"Erro ao remover trabalho do SQS: {str(e)}", exc_info=True)
+            raise
+
+    def release(self, receipt, delay_seconds=0):
+        """Devolve um trabalho à fila para nova tentativa após delay_seconds."""
+        try:
+            self.sqs_client.change_message_visibility(
+                QueueUrl=self.queue_url,
+                ReceiptHandle=receipt,
+                VisibilityTimeout=delay_seconds
+            )
+        except ClientError as e:
+            logger.error(f"Erro ao devolver trabalho ao SQS: {str(e)}", exc_info=True)
+            raise
+
+class LocalWorkQueue:
+    """Fila de trabalhos local baseada em SQLite, compartilhável entre processos da mesma máquina."""
+
+    def __init__(self, db_path=WORK_QUEUE_DB, visibility_timeout=VISIBILITY_TIMEOUT):
+        """Inicializa a fila local.
+
+        Args:
+            db_path (str): Caminho do arquivo SQLite (':memory:' para uso no mesmo processo)
+            visibility_timeout (int): Tempo (s) que um trabalho recebido fica invisível
+        """
+        self.db_path = db_path
+        self.visibility_timeout = visibility_timeout
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "body TEXT NOT NULL, "
+            "visible_at REAL NOT NULL, "
+            "receive_count INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_visible_at ON jobs (visible_at)")
+
+    def enqueue(self, job):
+        """Enfileira um trabalho e retorna seu ID."""
+        logger.info(f"Enfileirando trabalho local para {job.get('file_key')}")
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (body, visible_at) VALUES (?, ?)",
+                (json.dumps(job), time.time())
+            )
+            return str(cursor.lastrowid)
+
+    def receive(self, max_messages=10, wait_seconds=20):
+        """Recebe um lote de trabalhos visíveis, aguardando até wait_seconds (polling)."""
+        deadline = time.time() + wait_seconds
+        while True:
+            with self._lock:
+                now = time.time()
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    rows = self._conn.execute(
+                        "SELECT id, body, receive_count FROM jobs WHERE visible_at <= ? ORDER BY id LIMIT ?",
+                        (now, max_messages)
+                    ).fetchall()
+                    self._conn.executemany(
+                        "UPDATE jobs SET visible_at = ?, receive_count = receive_count + 1 WHERE id = ?",
+                        [(now + self.visibility_timeout, row[0]) for row in rows]
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+
+            if rows or time.time() >= deadline:
+                return [(str(row[0]), json.loads(row[1]), row[2] + 1) for row in rows]
+            time.sleep(min(0.5, max(0.0, deadline - time.time())))
+
+    def ack(self, receipt):
+        """Remove da fila um trabalho concluído."""
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (int(receipt),))
+
+    def release(self, receipt, delay_seconds=0):
+        """Devolve um trabalho à fila para nova tentativa após delay_seconds."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET visible_at = ? WHERE id = ?",
+                (time.time() + delay_seconds, int(receipt))
+            )
+
+def get_work_queue():
+    """
+    Cria a fila de trabalhos configurada no ambiente.
+
+    Returns:
+        SQSWorkQueue se WORK_QUEUE_URL estiver definida, senão LocalWorkQueue
+    """
+    if WORK_QUEUE_URL:
+        return SQSWorkQueue(WORK_QUEUE_URL)
+    return LocalWorkQueue(WORK_QUEUE_DB)
@@ -0,0 +1,120 @@
+"""
+Data Sentinel - Worker de auditorias
+
+Processo de longa duração que consome a fila de trabalhos (SQS ou SQLite local)
+em lotes e executa as auditorias com concorrência configurável. A vazão escala
+adicionando workers; a API apenas enfileira e responde imediatamente.
+
+Uso:
+    python -m lambda_functions.processor.worker --concurrency 4 --batch-size 10
+"""
+
+import argparse
+import json
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+# Importação dos módulos internos
+from lambda_functions.processor.main import process_audit
+from lambda_functions.processor.work_queue import get_work_queue
+from lambda_functions.processor.utils.logger import setup_logger
+
+# Configuração de ambiente
+WORKER_CONCURRENCY = int(os.environ.get('WORKER_CONCURRENCY', '4'))
+WORKER_BATCH_SIZE = int(os.environ.get('WORKER_BATCH_SIZE', '10'))
+WORKER_MAX_RECEIVES = int(os.environ.get('WORKER_MAX_RECEIVES', '5'))
+WORKER_RETRY_DELAY = int(os.environ.get('WORKER_RETRY_DELAY', '60'))
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+# Configuração de logging
+logger = setup_logger(__name__, LOG_LEVEL)
+
+class Worker:
+    """Classe responsável por consumir a fila e executar as auditorias."""
+
+    def __init__(self, queue, concurrency=WORKER_CONCURRENCY, batch_size=WORKER_BATCH_SIZE,
+                 max_receives=WORKER_MAX_RECEIVES, retry_delay=WORKER_RETRY_DELAY):
+        """
+        Inicializa o worker.
+
+        Args:
+            queue: Fila de trabalhos (SQSWorkQueue ou LocalWorkQueue)
+            concurrency (int): Quantidade de auditorias executadas em paralelo
+            batch_size (int): Quantidade de trabalhos recebidos por lote
+            max_receives (int): Tentativas antes de descartar um trabalho
+            retry_delay (int): Espera (s) antes de uma nova tentativa após falha
+        """
+        self.queue = queue
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_receives = max_receives
+        self.retry_delay = retry_delay
+        self.running = True
+
+    def stop(self, *args):
+        """Solicita o encerramento após o lote atual."""
+        logger.info("Encerramento solicitado; finalizando lote atual")
+        self.running = False
+
+    def run(self, wait_seconds=20):
+        """Consome a fila até que stop() seja chamado."""
+        logger.info(f"Worker iniciado (concorrência={self.concurrency}, lote={self.batch_size})")
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while self.running:
+                self.run_once(executor, wait_seconds)
+        logger.info("Worker encerrado")
+
+    def run_once(self, executor, wait_seconds=20):
+        """
+        Recebe e processa um lote de trabalhos.
+
+        Returns:
+            int: Quantidade de trabalhos recebidos
+        """
+        messages = self.queue.receive(max_messages=self.batch_size, wait_seconds=wait_seconds)
+        if not messages:
+            return 0
+
+        logger.info(f"Lote de {len(messages)} trabalhos recebido")
+        futures = [(receipt, job, receive_count, executor.submit(process_audit, job))
+                   for receipt, job, receive_count in messages]
+
+        for receipt, job, receive_count, future in futures:
+            try:
+                response = future.result()
+            except Exception as e:
+                logger.error(f"Erro inesperado no trabalho {job.get('file_key')}: {str(e)}", exc_info=True)
+                response = {'statusCode': 500, 'body': json.dumps({'message': str(e)})}
+            self._settle(receipt, job, receive_count, response)
+
+        return len(messages)
+
+    def _settle(self, receipt, job, receive_count, response):
+        """Confirma, devolve ou descarta o trabalho conforme o resultado da auditoria."""
+        status_code = response.get('statusCode')
+        if status_code == 200:
+            self.queue.ack(receipt)
+        elif status_code == 409:
+            # Outra execução detém o lease; tenta de novo quando ele expirar
+            self.queue.release(receipt, self.retry_delay)
+        elif receive_count >= self.max_receives:
+            logger.error(f"Trabalho {job.get('file_key')} descartado após {receive_count} tentativas")
+            self.queue.ack(receipt)
+        else:
+            self.queue.release(receipt, self.retry_delay)
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de auditorias do Data Sentinel")
+    parser.add_argument('--concurrency', type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument('--batch-size', type=int, default=WORKER_BATCH_SIZE)
+    parser.add_argument('--wait-seconds', type=int, default=20)
+    args = parser.parse_args()
+
+    worker = Worker(get_work_queue(), concurrency=args.concurrency, batch_size=args.batch_size)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run(wait_seconds=args.wait_seconds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark do detector local de dados sensíveis.
+
+Compara a expressão combinada (uma passada por linha, detectors.SensitiveDataMatcher)
+com a abordagem ingênua de uma expressão por tipo, sobre um CSV sintético.
+O resultado é a vazão em MB/s em um único núcleo.
+
+Uso:
+    python scripts/benchmark_detectors.py --rows 200000 --repeat 3
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lambda_functions.processor.detectors import DETECTOR_PATTERNS, TYPE_VALIDATORS, SensitiveDataMatcher
+
+HEADER = "id;nome;cpf;email;telefone;cartao;observacao"
+
+def _cpf(rng):
+    digits = [rng.randint(0, 9) for _ in range(9)]
+    for size in (9, 10):
+        total = sum(digit * weight for digit, weight in zip(digits, range(size + 1, 1, -1)))
+        digits.append((total * 10) % 11 % 10)
+    text = ''.join(map(str, digits))
+    return f"{text[:3]}.{text[3:6]}.{text[6:9]}-{text[9:]}"
+
+def generate_csv(rows, exposed_ratio=0.3, seed=42):
+    """Gera um CSV sintético em que ~exposed_ratio das linhas contém dados sensíveis."""
+    rng = random.Random(seed)
+    lines = [HEADER]
+    for row in range(rows):
+        if rng.random() < exposed_ratio:
+            lines.append(f"{row};Cliente {row};{_cpf(rng)};cliente{row}@exemplo.com.br;"
+                         f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)};"
+                         f"4111 1111 1111 1111;pedido entregue")
+        else:
+            lines.append(f"{row};Cliente {row};*****;*****;*****;*****;pedido {rng.randint(1, 10**6)} entregue")
+    return '\n'.join(lines) + '\n'
+
+class PerTypeMatcher(SensitiveDataMatcher):
+    """Abordagem ingênua: uma expressão por tipo, cada uma percorrendo a linha inteira."""
+
+    def __init__(self, patterns=DETECTOR_PATTERNS, validators=TYPE_VALIDATORS, delimiter=';'):
+        super().__init__(patterns, validators, delimiter)
+        self.regexes = [(data_type, re.compile(pattern)) for data_type, pattern in patterns.items()]
+
+    def iter_matches(self, text):
+        for data_type, regex in self.regexes:
+            validator = self.validators.get(data_type)
+            for match in regex.finditer(text):
+                if validator is None or validator(match.group()):
+                    yield data_type, match.group(), match.start(), match.end()
+
+def measure(matcher, csv_data, repeat):
+    """Retorna (melhor tempo em segundos, total de achados)."""
+    best = None
+    found = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = matcher.analyze_data(csv_data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        found = sum(result['summary'].values())
+    return best, found
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do detector local de dados sensíveis")
+    parser.add_argument('--rows', type=int, default=200000, help="Linhas do CSV sintético")
+    parser.add_argument('--exposed-ratio', type=float, default=0.3, help="Fração de linhas com dados expostos")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetições (vale o melhor tempo)")
+    args = parser.parse_args()
+
+    csv_data = generate_csv(args.rows, args.exposed_ratio)
+    size_mb = len(csv_data.encode('utf-8')) / (1024 * 1024)
+    print(f"CSV sintético: {args.rows} linhas, {size_mb:.1f} MB")
+
+    for name, matcher in (('combinada', SensitiveDataMatcher()), ('uma por tipo', PerTypeMatcher())):
+        elapsed, found = measure(matcher, csv_data, args.repeat)
+        print(f"{name:>14}: {size_mb / elapsed:8.2f} MB/s ({elapsed:.3f}s, {found} achados)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Teste de carga da API do Data Sentinel.
+
+Mantém N conexões keep-alive (uma por thread) enviando requisições a uma rota
+durante um intervalo fixo e informa a vazão (req/s), as latências (p50, p95,
+p99 e máxima) e a contagem por status HTTP. Usado para comparar o perfil de
+produção (gunicorn.conf.py) com um único processo uvicorn; o método está
+descrito em docs/guia_implantacao.md.
+
+Uso:
+    python scripts/load_test_api.py --url http://localhost:8000/contadores --concurrency 64 --duration 30
+"""
+
+import argparse
+import http.client
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def worker(url, method, deadline, measure_from, latencies, statuses, lock):
+    """Envia requisições em uma conexão keep-alive até o prazo; descarta as do aquecimento."""
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    target = parts.path or '/'
+    if parts.query:
+        target += '?' + parts.query
+
+    local_latencies = []
+    local_statuses = Counter()
+    connection = connection_class(parts.netloc, timeout=30)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request(method, target)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader('connection', '').lower() == 'close':
+                connection.close()
+        except (OSError, http.client.HTTPException):
+            status = 'erro'
+            connection.close()
+            connection = connection_class(parts.netloc, timeout=30)
+        if start >= measure_from:
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[status] += 1
+    connection.close()
+
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+def run(url, method='GET', concurrency=32, duration=30.0, warmup=5.0):
+    """
+    Executa o teste de carga.
+
+    Args:
+        url (str): URL da rota testada
+        method (str): Método HTTP
+        concurrency (int): Conexões simultâneas
+        duration (float): Segundos medidos
+        warmup (float): Segundos iniciais descartados
+
+    Returns:
+        dict: Vazão, latências (ms) e contagem por status
+    """
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+    threads = [
+        threading.Thread(target=worker, args=(url, method, deadline, measure_from, latencies, statuses, lock))
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+        'statuses': dict(statuses)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API do Data Sentinel")
+    parser.add_argument('--url', default='http://localhost:8000/contadores', help="URL da rota testada")
+    parser.add_argument('--method', default='GET', help="Método HTTP")
+    parser.add_argument('--concurrency', type=int, default=32, help="Conexões simultâneas")
+    parser.add_argument('--duration', type=float, default=30.0, help="Segundos medidos")
+    parser.add_argument('--warmup', type=float, default=5.0, help="Segundos iniciais descartados")
+    args = parser.parse_args()
+
+    result = run(args.url, args.method.upper(), args.concurrency, args.duration, args.warmup)
+    print(f"{args.method.upper()} {args.url} com {args.concurrency} conexões por {args.duration:.0f}s")
+    print(f"  requisições: {result['requests']} ({result['rps']:.1f} req/s)")
+    print(f"  latência (ms): p50 {result['p50_ms']:.1f} | p95 {result['p95_ms']:.1f} | "
+          f"p99 {result['p99_ms']:.1f} | máx {result['max_ms']:.1f}")
+    print(f"  status: {result['statuses']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import json
+
+from lambda_functions.processor import main as processor
+from lambda_functions.processor.dynamodb_handler import LocalDynamoDBHandler
+from lambda_functions.processor.local_runner import StageTimer, local_environment
+
+CSV = 'id;cpf\n1;529.982.247-25\n2;111.444.777-35\n'
+
+def _claim(handler, token, now):
+    return handler.update_audit_status(
+        'a1', 'PROCESSING', timestamp='t',
+        expected_status=['PENDING', 'FAILED', 'PROCESSING'],
+        extra_attributes={'lease_expires_at': now + 10, 'lease_token': token},
+        lease_expired_before=now
+    )
+
+def test_lease_expirado_nao_grava_checkpoint_nem_conclusao():
+    handler = LocalDynamoDBHandler()
+    handler.create_audit_if_absent({'audit_id': 'a1', 'timestamp': 't', 'status': 'PENDING'})
+
+    assert _claim(handler, 'A', now=0)
+    # O lease de A expira e B assume a auditoria
+    assert _claim(handler, 'B', now=100)
+
+    assert not handler.save_checkpoint('a1', 't', 10, {}, lease_expires_at=200, lease_token='A')
+    assert not handler.update_audit_status('a1', 'COMPLETED', timestamp='t', expected_status=['PROCESSING'],
+                                           lease_token='A')
+    assert handler.save_checkpoint('a1', 't', 10, {}, lease_expires_at=200, lease_token='B')
+    assert handler.update_audit_status('a1', 'COMPLETED', timestamp='t', expected_status=['PROCESSING'],
+                                       lease_token='B')
+
+def test_execucao_sem_lease_nao_conclui(tmp_path):
+    with local_environment(StageTimer()) as services:
+        services['s3'].put_object_bytes('uploads/clientes.csv', CSV.encode('utf-8'))
+        dynamodb = services['dynamodb']
+        update_audit_status = dynamodb.update_audit_status
+
+        def concorrente(audit_id, status, **kwargs):
+            if status == 'COMPLETED':
+                # Outra execução assume a auditoria antes da conclusão desta
+                item = dynamodb._find(audit_id, kwargs.get('timestamp'))
+                item['lease_token'] = 'outra-execucao'
+            return update_audit_status(audit_id, status, **kwargs)
+
+        dynamodb.update_audit_status = concorrente
+        response = processor.lambda_handler(
+            {'file_key': 'uploads/clientes.csv', 'requester_email': 'analista@exemplo.com'}, None)
+
+    assert response['statusCode'] == 409
+    assert [item['status'] for item in dynamodb.items.values()] == ['PROCESSING']
+    assert services['sns'].messages == []
+
+def test_nova_entrega_conclui_notificacao_pendente():
+    event = {'file_key': 'uploads/clientes.csv', 'requester_email': 'analista@exemplo.com'}
+    with local_environment(StageTimer()) as services:
+        services['s3'].put_object_bytes('uploads/clientes.csv', CSV.encode('utf-8'))
+        sns = services['sns']
+        publish_notification = sns.publish_notification
+
+        def indisponivel(*args, **kwargs):
+            raise RuntimeError('SNS indisponível')
+
+        sns.publish_notification = indisponivel
+        first = processor.lambda_handler(event, None)
+        sns.publish_notification = publish_notification
+        second = processor.lambda_handler(event, None)
+        third = processor.lambda_handler(event, None)
+
+    assert first['statusCode'] == 500
+    assert second['statusCode'] == third['statusCode'] == 200
+    assert len(sns.messages) == 1
+    assert json.loads(sns.messages[0]['Message'])['summary'] == {'cpf': 2}
+    assert services['counters'].get_counters('analista@exemplo.com')['audit_count'] == 1
+    item = next(iter(services['dynamodb'].items.values()))
+    assert item['status'] == 'COMPLETED' and item['counted'] and item['notified']
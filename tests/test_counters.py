@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from lambda_functions.processor.counters_handler import LocalAuditCountersHandler
+
+def test_auditoria_contada_uma_unica_vez():
+    counters = LocalAuditCountersHandler()
+    when = datetime(2026, 10, 19)
+
+    assert counters.increment('analista@exemplo.com', {'cpf': 2}, when=when, audit_id='a1')
+    assert not counters.increment('analista@exemplo.com', {'cpf': 2}, when=when, audit_id='a1')
+
+    for period in ('TOTAL', 'MONTH#2026-10', 'DAY#2026-10-19'):
+        totals = counters.get_counters('analista@exemplo.com', period)
+        assert (totals['audit_count'], totals['by_type']) == (1, {'cpf': 2})
@@ -0,0 +1,31 @@
+import json
+
+from lambda_functions.processor.detectors import SensitiveDataMatcher
+from lambda_functions.processor.local_runner import run_local
+
+CSV_MULTILINHA = (
+    'id;observacao;cpf;email\n'
+    '1;"primeira linha\nsegunda linha; com delimitador";529.982.247-25;ana@exemplo.com\n'
+    '2;sem quebra;111.444.777-35;bruno@exemplo.com\n'
+)
+
+def test_analyze_data_numera_registros_com_campo_multilinha():
+    result = SensitiveDataMatcher().analyze_data(CSV_MULTILINHA)
+
+    achados = {(finding['row'], finding['column'], finding['type']) for finding in result['sensitive_data']}
+    assert achados == {
+        (1, 'cpf', 'cpf'), (1, 'email', 'email'),
+        (2, 'cpf', 'cpf'), (2, 'email', 'email')
+    }
+    assert result['summary'] == {'cpf': 2, 'email': 2}
+
+def test_auditoria_incremental_com_campo_multilinha(tmp_path):
+    arquivo = tmp_path / 'clientes.csv'
+    arquivo.write_text(CSV_MULTILINHA, encoding='utf-8')
+
+    result = run_local(str(arquivo), 'analista@exemplo.com')
+
+    assert result['response']['statusCode'] == 200
+    body = json.loads(result['response']['body'])
+    assert body['incremental']['rows_total'] == 2
+    assert body['summary'] == {'cpf': 2, 'email': 2}
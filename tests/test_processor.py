@@ -0,0 +1,26 @@
+import glob
+import json
+import os
+
+from lambda_functions.processor import main as processor
+from lambda_functions.processor.local_runner import StageTimer, local_environment
+
+CSV = 'id;cpf\n1;529.982.247-25\n2;111.444.777-35\n'
+
+def test_download_em_disco_usa_arquivo_proprio_e_o_remove(monkeypatch):
+    monkeypatch.setattr(processor, 'S3_IN_MEMORY_MAX_BYTES', 0)
+    with local_environment(StageTimer()) as services:
+        # Arquivo com o mesmo nome deixado por outra auditoria
+        with open('/tmp/clientes.csv', 'w', encoding='utf-8') as other:
+            other.write('id;email\n1;outra@exemplo.com\n')
+        services['s3'].put_object_bytes('uploads/u1/clientes.csv', CSV.encode('utf-8'))
+        response = processor.lambda_handler(
+            {'file_key': 'uploads/u1/clientes.csv', 'requester_email': 'analista@exemplo.com'}, None)
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['summary'] == {'cpf': 2}
+    audit_id = json.loads(response['body'])['audit_id']
+    assert glob.glob(f'/tmp/{audit_id}-*') == []
+    with open('/tmp/clientes.csv', encoding='utf-8') as other:
+        assert 'outra@exemplo.com' in other.read()
+    os.remove('/tmp/clientes.csv')
@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from lambda_functions.processor.data_analyzer import DataAnalyzer
+from lambda_functions.processor.quick_scan import MODE_FIRST_K, student_t_quantile
+
+def _csv(tmp_path, rows=20000):
+    # CPF exposto em todas as linhas da segunda metade do arquivo
+    linhas = ['id;nome;cpf'] + [
+        f"{i};nome{i};{'529.982.247-25' if i >= rows // 2 else '*****'}" for i in range(rows)
+    ]
+    arquivo = tmp_path / 'clientes.csv'
+    arquivo.write_text('\n'.join(linhas) + '\n', encoding='utf-8')
+    return str(arquivo)
+
+def test_student_t_quantile():
+    assert student_t_quantile(0.975, 4) == pytest.approx(2.7764, abs=1e-4)
+    assert student_t_quantile(0.975, 1) == pytest.approx(12.7062, abs=1e-4)
+
+def test_amostra_cobre_o_arquivo_inteiro(tmp_path):
+    result = DataAnalyzer().analyze_csv_sample(_csv(tmp_path), sample_size=1000, row_budget=5000,
+                                               rng=random.Random(1))
+
+    assert result['scope'] == 'file'
+    assert result['estimate']['lower'] <= 10000 <= result['estimate']['upper']
+    assert 18000 <= result['estimated_rows'] <= 22000
+
+def test_first_k_para_na_linha_do_k_esimo_achado(tmp_path):
+    result = DataAnalyzer().analyze_csv_file(_csv(tmp_path), mode=MODE_FIRST_K, k=3)
+
+    assert result['rows_analyzed'] == 10003
+    assert [finding['row'] for finding in result['sensitive_data']] == [10001, 10002, 10003]
+    assert result['complete'] is False
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from lambda_functions.processor.detectors import SensitiveDataMatcher
+from lambda_functions.processor.local_runner import run_local
+from lambda_functions.processor.row_fingerprints import DeltaRowMismatchError, build_delta
+
+# Aspas no meio de um campo sem aspas: o CsvSource junta as duas linhas físicas em
+# um registro, o módulo csv lê dois registros
+CSV_ASPAS_SOLTAS = (
+    'id;nome;cpf\n'
+    '1;Ana "Aninha;529.982.247-25\n'
+    '2;Bruno;111.444.777-35\n'
+)
+
+def test_original_row_fora_do_delta(tmp_path):
+    arquivo = tmp_path / 'clientes.csv'
+    arquivo.write_text(CSV_ASPAS_SOLTAS, encoding='utf-8')
+    plan = build_delta(str(arquivo), None, str(tmp_path / 'delta.csv'))
+
+    with open(plan.delta_path, encoding='utf-8') as delta:
+        findings = SensitiveDataMatcher().analyze_data(delta.read())['sensitive_data']
+
+    assert plan.rows_new < max(finding['row'] for finding in findings)
+    with pytest.raises(DeltaRowMismatchError):
+        plan.remap_findings(findings)
+    with pytest.raises(DeltaRowMismatchError):
+        plan.original_row(0)
+
+def test_auditoria_volta_a_completa_quando_delta_diverge(tmp_path):
+    arquivo = tmp_path / 'clientes.csv'
+    arquivo.write_text(CSV_ASPAS_SOLTAS, encoding='utf-8')
+
+    result = run_local(str(arquivo), 'analista@exemplo.com')
+
+    assert result['response']['statusCode'] == 200
+    body = json.loads(result['response']['body'])
+    assert body['summary'] == {'cpf': 2}
+    assert 'incremental' not in body